@@ -55,6 +55,37 @@ def create_app(test_config=None):
         # Google OAuth configuration
         GOOGLE_CLIENT_ID=os.environ.get('GOOGLE_CLIENT_ID', ''),
         GOOGLE_CLIENT_SECRET=os.environ.get('GOOGLE_CLIENT_SECRET', ''),
+        # Ghostscript executable or installation directory (None = search the project, then PATH)
+        GHOSTSCRIPT_PATH=os.environ.get('GHOSTSCRIPT_PATH'),
+        # Background job configuration
+        JOB_QUEUE_PATH=os.path.join(app.instance_path, 'jobs', 'jobs.sqlite3'),
+        JOB_WORKERS=int(os.environ.get('JOB_WORKERS', 2)),
+        JOB_TOOL_CONCURRENCY={},  # Overrides for app.jobs.registry.DEFAULT_TOOL_CONCURRENCY
+        JOB_WAIT_FOR_RESULT=False,  # Make form posts wait for their job instead of redirecting
+        JOB_WAIT_TIMEOUT=300,  # 5 minutes, when waiting
+        JOB_LEASE_TIMEOUT=3600,  # 1 hour
+        # Upload blob store configuration
+        BLOB_STORE_ENABLED=True,
+        BLOB_STORE_DIR=os.path.join(app.instance_path, 'blobs'),  # Keep on the same filesystem as UPLOAD_FOLDER
+        # Upload folder lifecycle configuration
+        STORAGE_TTL=int(os.environ.get('STORAGE_TTL', 60 * 60)),  # 1 hour
+        STORAGE_HIGH_WATER=0.9,  # Evict least recently used artefacts above 90% disk use
+        STORAGE_LOW_WATER=0.8,  # ...until back under 80%
+        STORAGE_MAX_BYTES=None,  # Optional quota for the whole upload folder
+        STORAGE_SWEEP_INTERVAL=60,
+        # Editor preview cache configuration
+        PREVIEW_CACHE_DIR=os.path.join(app.instance_path, 'cache', 'previews'),
+        PREVIEW_CACHE_MEMORY_BYTES=64 * 1024 * 1024,  # 64MB per process
+        PREVIEW_CACHE_MAX_BYTES=512 * 1024 * 1024,  # 512MB
+        # Result cache configuration
+        RESULT_CACHE_ENABLED=True,
+        RESULT_CACHE_DIR=os.path.join(app.instance_path, 'cache', 'results'),
+        RESULT_CACHE_MAX_BYTES=1024 * 1024 * 1024,  # 1GB
+        RESULT_CACHE_TTL=24 * 60 * 60,  # 24 hours
+        # Process pool configuration
+        PROCESS_POOL_SIZE=int(os.environ.get('PROCESS_POOL_SIZE', 0)) or None,  # None = one per CPU
+        PROCESS_POOL_MAX_TASKS=50,  # Recycle each child after this many tasks
+        PROCESS_POOL_TOOL_LIMITS={},  # Overrides for app.security.process_pool.DEFAULT_TOOL_LIMITS
     )
 
     if test_config is None:
@@ -174,6 +205,10 @@ def create_app(test_config=None):
         from flask import request
         return dict(csp_nonce=lambda: request.csp_nonce)
 
+    # Resolve Ghostscript once, before tool processes are started
+    from tools.utils.ghostscript import init_ghostscript
+    init_ghostscript(app)
+
     # Initialize custom security features
     from app.security import init_app as init_security
     init_security(app)
@@ -182,9 +217,18 @@ def create_app(test_config=None):
     from app.auth import init_app as init_auth
     init_auth(app)
 
+    # Initialize upload storage
+    from app.storage import init_app as init_storage
+    init_storage(app)
+
+    # Initialize background jobs
+    from app.jobs import init_app as init_jobs
+    init_jobs(app)
+
     # Register blueprints
     from app.routes.main import main_bp
     from app.routes.security_api import security_api_bp
+    from app.routes.jobs_api import jobs_api_bp
 
     # Import blueprints directly from the original routes.py file
     from app.routes import main_bp as _  # Dummy import to avoid circular imports
@@ -212,6 +256,7 @@ def create_app(test_config=None):
     app.register_blueprint(convert_from_pdf_bp)
     app.register_blueprint(security_bp)
     app.register_blueprint(security_api_bp)
+    app.register_blueprint(jobs_api_bp)
 
     # Register authentication blueprint
     from app.auth.routes import auth_bp
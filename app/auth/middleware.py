@@ -4,11 +4,10 @@ This module provides middleware for authentication and file size validation.
 """
 
 import logging
-import os
 from functools import wraps
 from flask import request, flash, redirect, url_for, session, current_app
 from werkzeug.utils import secure_filename
-from .utils import get_current_user, check_file_size_limit, track_file_usage
+from .utils import get_current_user, check_file_size_limit
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -47,16 +46,8 @@ def validate_file_size(f):
                     else:
                         return redirect(url_for('auth.register'))
 
-                # Track file usage for logged-in users
-                if user_id:
-                    # Get actual file size from the file object
-                    file.seek(0, os.SEEK_END)
-                    actual_file_size = file.tell()
-                    file.seek(0)  # Reset file pointer
-
-                    # Use actual file size instead of content_length
-                    logger.info(f"Tracking file usage for user {user_id}: {actual_file_size} bytes")
-                    track_file_usage(user_id, actual_file_size)
+                # Usage is tracked from the bytes actually received when the
+                # upload is saved (see save_uploaded_file)
 
         return f(*args, **kwargs)
 
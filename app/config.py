@@ -25,9 +25,6 @@ class Config:
         'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'html', 'zip'
     }
 
-    # Ghostscript settings
-    GHOSTSCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'ghostscript')
-
     # OCR settings
     OCR_ENGINE_CMD = os.environ.get('TESSERACT_CMD', 'tesseract')  # Keep env var name for compatibility
 
@@ -81,7 +78,6 @@ class ProductionConfig(Config):
     SECRET_KEY = os.environ.get('SECRET_KEY')
 
     # In production, we might use different paths for external tools
-    GHOSTSCRIPT_PATH = os.environ.get('GHOSTSCRIPT_PATH', Config.GHOSTSCRIPT_PATH)
     OCR_ENGINE_CMD = os.environ.get('TESSERACT_CMD', 'tesseract')  # Keep env var name for compatibility
     LIBREOFFICE_CMD = os.environ.get('LIBREOFFICE_CMD', 'libreoffice')
 
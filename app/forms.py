@@ -262,6 +262,7 @@ class SplitForm(PDFUploadForm):
         Optional(),
         NumberRange(min=1, message='Size must be at least 1 MB')
     ])
+    manifest = BooleanField('Include a manifest listing the pages and size of each file', default=False)
     submit = SubmitField('Split PDF')
 
 
@@ -0,0 +1,208 @@
+"""
+Background jobs package for the application.
+This package runs PDF tools on a bounded worker pool fed by a local job queue,
+so that web workers are not tied up for the length of a tool run.
+"""
+
+import os
+import logging
+from flask import current_app
+from app.errors import PDFProcessingError
+from .queue import JobQueue, STATUS_FINISHED, STATUS_FAILED
+from .registry import TOOLS, DEFAULT_TOOL_CONCURRENCY
+from .cache import ResultCache
+from .worker import WorkerPool, DEFAULT_POOL_SIZE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default time in seconds a request waits for its job when JOB_WAIT_FOR_RESULT is set
+DEFAULT_WAIT_TIMEOUT = 300
+
+
+def init_app(app):
+    """
+    Initialize the job queue and worker pool for the application.
+
+    Args:
+        app: The Flask application.
+    """
+    db_path = app.config.get('JOB_QUEUE_PATH', os.path.join(app.instance_path, 'jobs', 'jobs.sqlite3'))
+    lease_timeout = app.config.get('JOB_LEASE_TIMEOUT', 3600)
+
+    tool_limits = dict(DEFAULT_TOOL_CONCURRENCY)
+    tool_limits.update(app.config.get('JOB_TOOL_CONCURRENCY', {}))
+
+    cache = None
+    if app.config.get('RESULT_CACHE_ENABLED', True):
+        cache = ResultCache(
+            app.config.get('RESULT_CACHE_DIR', os.path.join(app.instance_path, 'cache', 'results')),
+            max_bytes=app.config.get('RESULT_CACHE_MAX_BYTES', 1024 * 1024 * 1024),
+            ttl=app.config.get('RESULT_CACHE_TTL', 24 * 60 * 60)
+        )
+
+    queue = JobQueue(db_path, lease_timeout=lease_timeout)
+    pool = WorkerPool(queue, size=app.config.get('JOB_WORKERS', DEFAULT_POOL_SIZE),
+                      tool_limits=tool_limits, cache=cache,
+                      artefacts=getattr(app, 'storage_manager', None))
+    pool.start()
+
+    app.job_queue = queue
+    app.job_workers = pool
+    app.result_cache = cache
+
+    logger.info("Background jobs initialized")
+
+    return app
+
+
+def submit_job(tool, kwargs, meta=None, secret_kwargs=None):
+    """
+    Queue a tool job for the current user.
+
+    Args:
+        tool: Name of the registered tool to run.
+        kwargs: JSON-serializable keyword arguments for the tool.
+        meta: Extra JSON-serializable data to keep with the job,
+            e.g. the output filename to offer for download.
+        secret_kwargs: Keyword arguments that must not be written to disk.
+
+    Returns:
+        str: The job ID.
+    """
+    if tool not in TOOLS:
+        raise PDFProcessingError(f"Unknown tool: {tool}")
+
+    owner = None
+    try:
+        from app.auth.utils import get_current_user
+        user = get_current_user()
+        if user:
+            owner = user.get('id')
+    except ImportError:
+        # Auth module not available, jobs have no owner
+        pass
+
+    # Outputs are expired with the rest of the upload folder
+    from app.storage import register_artefact
+    for name in ('output_path', 'output_dir'):
+        if kwargs.get(name):
+            register_artefact(kwargs[name], owner=owner)
+
+    # Pass on the hash worked out while the input was uploaded, so the
+    # result cache doesn't have to read the file again
+    from app.security.file_validation import get_ingested_upload
+    upload = get_ingested_upload(kwargs.get('input_path'))
+    if upload:
+        meta = dict(meta or {}, input_sha256=upload['sha256'])
+
+    return current_app.job_queue.enqueue(tool, kwargs, owner=owner, meta=meta,
+                                         secret_kwargs=secret_kwargs)
+
+
+def get_visible_job(job_id):
+    """
+    Get a job if the current user is allowed to see it.
+
+    Args:
+        job_id: The job ID.
+
+    Returns:
+        dict: The job, or None if it doesn't exist or belongs to another user.
+    """
+    job = current_app.job_queue.get(job_id)
+    if job is None:
+        return None
+
+    if job['owner']:
+        from app.auth.utils import get_current_user
+        user = get_current_user()
+        if not user or user.get('id') != job['owner']:
+            return None
+
+    return job
+
+
+def get_finished_job(job_id):
+    """
+    Get a job to show its result on a tool page.
+
+    The job is only looked up, so the web worker isn't tied up while the
+    tool runs. If JOB_WAIT_FOR_RESULT is set, the request instead waits up
+    to JOB_WAIT_TIMEOUT seconds for the job to finish.
+
+    Args:
+        job_id: The job ID.
+
+    Returns:
+        dict: The finished job, or None if it is still queued or running.
+
+    Raises:
+        PDFProcessingError: If the job doesn't exist, belongs to another user
+            or failed with a processing error.
+        Exception: If the tool failed with any other error.
+    """
+    job = get_visible_job(job_id)
+
+    if job is not None and current_app.config.get('JOB_WAIT_FOR_RESULT', False):
+        timeout = current_app.config.get('JOB_WAIT_TIMEOUT', DEFAULT_WAIT_TIMEOUT)
+        job = current_app.job_queue.wait(job_id, timeout)
+
+    if job is None:
+        raise PDFProcessingError(f"Job not found: {job_id}", 404)
+
+    if job['status'] == STATUS_FINISHED:
+        return job
+
+    if job['status'] == STATUS_FAILED:
+        if job['error_type'] == 'PDFProcessingError':
+            raise PDFProcessingError(job['error'])
+        raise Exception(job['error'])
+
+    return None
+
+
+def job_to_dict(job):
+    """
+    Get the public view of a job for API responses.
+
+    Args:
+        job: The job.
+
+    Returns:
+        dict: The job fields that are safe to return to the client.
+    """
+    return {
+        'id': job['id'],
+        'tool': job['tool'],
+        'status': job['status'],
+        'meta': job['meta'],
+        'error': job['error'],
+        'progress': job['progress'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at'],
+    }
+
+
+def result_to_dict(result):
+    """
+    Get the public view of a tool result for API responses.
+
+    Tools return absolute paths to the files they wrote. Those are reduced
+    to the file names, which is all a client needs to pick its download and
+    doesn't reveal the server's directory layout.
+
+    Args:
+        result: The tool result.
+
+    Returns:
+        The result with every absolute path replaced by its file name.
+    """
+    if isinstance(result, dict):
+        return {key: result_to_dict(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [result_to_dict(value) for value in result]
+    if isinstance(result, str) and os.path.isabs(result):
+        return os.path.basename(result)
+    return result
@@ -0,0 +1,362 @@
+"""
+Result cache module.
+This module provides a local disk cache of tool outputs, keyed by the content
+of the input file, so repeated runs of the same tool on the same file with the
+same options are served without running the tool again.
+
+Entries are indexed in SQLite, which lets every web worker process on the host
+share the cache, its LRU order and its hit/miss counters.
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+from .registry import CACHEABLE_TOOLS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default maximum total size of cached outputs
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1GB
+
+# Default time in seconds an entry is kept
+DEFAULT_TTL = 24 * 60 * 60  # 24 hours
+
+# Size of the chunks read when hashing input files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Keyword arguments that name files rather than options
+PATH_KWARGS = {'input_path', 'output_path', 'output_dir'}
+
+# Result keys set by tools that fell back to returning the input unchanged
+DEGRADED_RESULT_KEYS = ('error_occurred', 'tesseract_missing')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def hash_file(path):
+    """
+    Get the SHA-256 of a file.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalise_params(kwargs, enums=()):
+    """
+    Get the options of a tool call in a canonical form.
+
+    File paths are dropped, and enum options are lower-cased and stripped, so
+    that e.g. compression_level=' Medium' and compression_level='medium'
+    match. Other options are kept as given, since their case can matter.
+
+    Args:
+        kwargs: The tool keyword arguments.
+        enums: Names of the options that are enums.
+
+    Returns:
+        str: The options as canonical JSON.
+    """
+    params = {}
+    for name, value in kwargs.items():
+        if name in PATH_KWARGS:
+            continue
+        if name in enums and isinstance(value, str):
+            value = value.strip().lower()
+        params[name] = value
+    return json.dumps(params, sort_keys=True)
+
+
+def _map_strings(value, func):
+    """Apply a function to every string in a JSON-like value."""
+    if isinstance(value, str):
+        return func(value)
+    if isinstance(value, list):
+        return [_map_strings(item, func) for item in value]
+    if isinstance(value, dict):
+        return {key: _map_strings(item, func) for key, item in value.items()}
+    return value
+
+
+class ResultCache:
+    """Class for storing and reusing tool outputs on local disk."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        """
+        Initialize the result cache.
+
+        Args:
+            cache_dir: Directory to keep cached outputs and the index in.
+            max_bytes: Maximum total size of cached outputs.
+            ttl: Time in seconds an entry is kept.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = os.path.join(cache_dir, 'index.sqlite3')
+
+        os.makedirs(cache_dir, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        """Open a new connection to the index database."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Context manager that opens a connection and always closes it."""
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _entry_dir(self, key):
+        """Get the directory holding an entry."""
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _count(self, conn, name, amount=1):
+        """Increment a counter."""
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def _remove(self, conn, key):
+        """Remove an entry from the index and the disk."""
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def make_key(self, tool, kwargs, input_hash=None):
+        """
+        Get the cache key of a tool call.
+
+        Args:
+            tool: The tool name.
+            kwargs: The tool keyword arguments.
+            input_hash: SHA-256 of the input file, if already known.
+
+        Returns:
+            str: The cache key, or None if the call can't be cached.
+        """
+        spec = CACHEABLE_TOOLS.get(tool)
+        if spec is None or spec['output'] not in kwargs:
+            return None
+
+        input_path = kwargs.get('input_path')
+        if not input_path or not os.path.isfile(input_path):
+            return None
+
+        if input_hash is None:
+            input_hash = hash_file(input_path)
+
+        material = '\n'.join([input_hash, tool, spec['version'],
+                              normalise_params(kwargs, spec.get('enums', ()))])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def get(self, key, tool, kwargs):
+        """
+        Restore a cached output for a tool call.
+
+        The cached files are placed where the call's own output would go, and
+        any paths in the cached result are rewritten to match.
+
+        Args:
+            key: The cache key.
+            tool: The tool name.
+            kwargs: The tool keyword arguments.
+
+        Returns:
+            dict: The tool result, or None on a cache miss.
+        """
+        now = time.time()
+        output_kwarg = CACHEABLE_TOOLS[tool]['output']
+
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row['created_at'] + self.ttl < now:
+                if row is not None:
+                    self._remove(conn, key)
+                self._count(conn, 'misses')
+                return None
+
+            entry_dir = self._entry_dir(key)
+            try:
+                with open(os.path.join(entry_dir, 'result.json'), 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+
+                files_dir = os.path.join(entry_dir, 'files')
+                new_stem = os.path.splitext(os.path.basename(kwargs['input_path']))[0]
+                target = kwargs[output_kwarg]
+
+                if output_kwarg == 'output_dir':
+                    os.makedirs(target, exist_ok=True)
+                    for name in os.listdir(files_dir):
+                        shutil.copyfile(os.path.join(files_dir, name),
+                                        os.path.join(target, name.replace('{stem}', new_stem, 1)))
+                else:
+                    shutil.copyfile(os.path.join(files_dir, 'output'), target)
+
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable cache entry {key}: {str(e)}")
+                self._remove(conn, key)
+                self._count(conn, 'misses')
+                return None
+
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            self._count(conn, 'hits')
+
+        def restore_path(value):
+            if value == '{output}':
+                return target
+            if value.startswith('{output_dir}/'):
+                return os.path.join(target, value[len('{output_dir}/'):].replace('{stem}', new_stem, 1))
+            return value
+
+        return _map_strings(stored['result'], restore_path)
+
+    def put(self, key, tool, kwargs, result):
+        """
+        Store the output of a finished tool call.
+
+        Args:
+            key: The cache key.
+            tool: The tool name.
+            kwargs: The tool keyword arguments.
+            result: The JSON-serializable tool result.
+        """
+        if not isinstance(result, dict) or any(result.get(name) for name in DEGRADED_RESULT_KEYS):
+            return
+
+        output_kwarg = CACHEABLE_TOOLS[tool]['output']
+        source = kwargs[output_kwarg]
+        stem = os.path.splitext(os.path.basename(kwargs['input_path']))[0]
+
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+
+        temp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+        files_dir = os.path.join(temp_dir, 'files')
+
+        try:
+            os.makedirs(files_dir)
+
+            if output_kwarg == 'output_dir':
+                prefix = os.path.join(source, '')
+
+                def store_path(value):
+                    if value.startswith(prefix):
+                        return '{output_dir}/' + value[len(prefix):].replace(stem, '{stem}', 1)
+                    return value
+
+                for name in os.listdir(source):
+                    shutil.copyfile(os.path.join(source, name),
+                                    os.path.join(files_dir, name.replace(stem, '{stem}', 1)))
+            else:
+                def store_path(value):
+                    return '{output}' if value == source else value
+
+                shutil.copyfile(source, os.path.join(files_dir, 'output'))
+
+            with open(os.path.join(temp_dir, 'result.json'), 'w', encoding='utf-8') as f:
+                json.dump({'tool': tool, 'result': _map_strings(result, store_path)}, f)
+
+            size = sum(os.path.getsize(os.path.join(files_dir, name)) for name in os.listdir(files_dir))
+            if size > self.max_bytes:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                return
+
+            os.rename(temp_dir, entry_dir)
+
+        except OSError as e:
+            # Another worker may have stored the same entry first
+            logger.warning(f"Could not cache result for {tool}: {str(e)}")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, tool, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, tool, size, now, now)
+            )
+            self._count(conn, 'stores')
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """
+        Remove expired entries, then the least recently used ones until the
+        cache fits in its size limit.
+        """
+        expired = conn.execute("SELECT key FROM entries WHERE created_at < ?", (now - self.ttl,)).fetchall()
+        for row in expired:
+            self._remove(conn, row['key'])
+        if expired:
+            self._count(conn, 'expirations', len(expired))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for row in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._remove(conn, row['key'])
+            total -= row['size']
+            evicted += 1
+        self._count(conn, 'evictions', evicted)
+
+    def stats(self):
+        """
+        Get the cache counters and current size.
+
+        Returns:
+            dict: 'hits', 'misses', 'stores', 'evictions', 'expirations',
+                'entries', 'bytes' and 'hit_rate'.
+        """
+        with self._connection() as conn:
+            counters = {row['name']: row['value'] for row in conn.execute("SELECT name, value FROM counters")}
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+        stats = {name: counters.get(name, 0) for name in ('hits', 'misses', 'stores', 'evictions', 'expirations')}
+        lookups = stats['hits'] + stats['misses']
+        stats.update({
+            'entries': entries,
+            'bytes': size,
+            'hit_rate': stats['hits'] / lookups if lookups else 0.0
+        })
+        return stats
@@ -0,0 +1,372 @@
+"""
+Job queue module.
+This module provides a SQLite-backed queue for PDF tool jobs.
+
+The queue lives on the local filesystem so it needs no outside service, and
+it is shared by every web worker process on the host. Claiming a job happens
+inside an IMMEDIATE transaction, which is what lets the per-tool concurrency
+limits hold across processes.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Job states
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_FINISHED = 'finished'
+STATUS_FAILED = 'failed'
+
+# How many queued jobs to inspect when looking for one that may run
+CLAIM_WINDOW = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    status TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    owner TEXT,
+    pid INTEGER,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    error_type TEXT,
+    progress TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+
+class JobQueue:
+    """Class for storing and claiming tool jobs in a local SQLite database."""
+
+    def __init__(self, db_path, lease_timeout=3600):
+        """
+        Initialize the job queue.
+
+        Args:
+            db_path: Path to the SQLite database file.
+            lease_timeout: Time in seconds after which a running job whose
+                worker has gone away is put back in the queue.
+        """
+        self.db_path = db_path
+        self.lease_timeout = lease_timeout
+
+        # Keyword arguments that must never touch the disk (e.g. passwords).
+        # Jobs that carry them are pinned to the process that submitted them.
+        self._secrets = {}
+        self._secrets_lock = threading.Lock()
+
+        # Set whenever a job is submitted so idle workers wake up immediately
+        self.wakeup = threading.Event()
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            self._migrate(conn)
+
+    def _connect(self):
+        """Open a new connection to the queue database."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @staticmethod
+    def _migrate(conn):
+        """Add the columns that queue databases created by older versions lack."""
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+        if 'progress' not in columns:
+            try:
+                conn.execute('ALTER TABLE jobs ADD COLUMN progress TEXT')
+            except sqlite3.OperationalError:
+                # Another process added it first
+                pass
+
+    @contextmanager
+    def _connection(self):
+        """Context manager that opens a connection and always closes it."""
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, tool, kwargs, owner=None, meta=None, secret_kwargs=None):
+        """
+        Add a job to the queue.
+
+        Args:
+            tool: Name of the registered tool to run.
+            kwargs: JSON-serializable keyword arguments for the tool.
+            owner: ID of the user who submitted the job, if any.
+            meta: Extra JSON-serializable data to keep with the job.
+            secret_kwargs: Keyword arguments kept in memory only.
+
+        Returns:
+            str: The job ID.
+        """
+        job_id = uuid.uuid4().hex
+        pid = None
+
+        if secret_kwargs:
+            pid = os.getpid()
+            with self._secrets_lock:
+                self._secrets[job_id] = dict(secret_kwargs)
+
+        with self._connection() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, tool, status, kwargs, meta, owner, pid, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (job_id, tool, STATUS_QUEUED, json.dumps(kwargs), json.dumps(meta or {}),
+                 owner, pid, time.time())
+            )
+
+        logger.info(f"Job {job_id} queued for tool {tool}")
+        self.wakeup.set()
+        return job_id
+
+    def claim(self, worker_id, tool_limits=None):
+        """
+        Claim the oldest queued job that is allowed to run.
+
+        Args:
+            worker_id: Identifier of the claiming worker.
+            tool_limits: Dictionary mapping tool names to the maximum number
+                of jobs of that tool allowed to run at once.
+
+        Returns:
+            dict: The claimed job, or None if no job can run right now.
+        """
+        tool_limits = tool_limits or {}
+        conn = self._connect()
+
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+
+            running = dict(conn.execute(
+                'SELECT tool, COUNT(*) FROM jobs WHERE status = ? GROUP BY tool',
+                (STATUS_RUNNING,)
+            ).fetchall())
+
+            candidates = conn.execute(
+                'SELECT * FROM jobs WHERE status = ? AND (pid IS NULL OR pid = ?) '
+                'ORDER BY created_at LIMIT ?',
+                (STATUS_QUEUED, os.getpid(), CLAIM_WINDOW)
+            ).fetchall()
+
+            for row in candidates:
+                limit = tool_limits.get(row['tool'])
+                if limit is not None and running.get(row['tool'], 0) >= limit:
+                    continue
+
+                conn.execute(
+                    'UPDATE jobs SET status = ?, worker = ?, started_at = ? WHERE id = ?',
+                    (STATUS_RUNNING, worker_id, time.time(), row['id'])
+                )
+                conn.execute('COMMIT')
+
+                job = self._row_to_job(row)
+                job['status'] = STATUS_RUNNING
+                with self._secrets_lock:
+                    job['kwargs'].update(self._secrets.pop(job['id'], {}))
+                return job
+
+            conn.execute('COMMIT')
+            return None
+
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        finally:
+            conn.close()
+
+    def set_progress(self, job_id, progress):
+        """
+        Record the progress of a running job.
+
+        Args:
+            job_id: The job ID.
+            progress: JSON-serializable progress reported by the tool.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                'UPDATE jobs SET progress = ? WHERE id = ? AND status = ?',
+                (json.dumps(progress, default=str), job_id, STATUS_RUNNING)
+            )
+
+    def complete(self, job_id, result):
+        """
+        Mark a job as finished and store its result.
+
+        Args:
+            job_id: The job ID.
+            result: JSON-serializable result returned by the tool.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ?',
+                (STATUS_FINISHED, json.dumps(result, default=str), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error, error_type='Exception'):
+        """
+        Mark a job as failed.
+
+        Args:
+            job_id: The job ID.
+            error: The error message.
+            error_type: Name of the exception class that was raised.
+        """
+        with self._connection() as conn:
+            conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, error_type = ?, finished_at = ? WHERE id = ?',
+                (STATUS_FAILED, error, error_type, time.time(), job_id)
+            )
+
+    def get(self, job_id):
+        """
+        Get a job by its ID.
+
+        Args:
+            job_id: The job ID.
+
+        Returns:
+            dict: The job, or None if it doesn't exist.
+        """
+        with self._connection() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+        return self._row_to_job(row) if row else None
+
+    def wait(self, job_id, timeout, poll_interval=0.2):
+        """
+        Wait for a job to finish or fail.
+
+        Args:
+            job_id: The job ID.
+            timeout: Maximum time to wait in seconds.
+            poll_interval: Time between status checks in seconds.
+
+        Returns:
+            dict: The job in its latest state.
+        """
+        deadline = time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in (STATUS_FINISHED, STATUS_FAILED):
+                return job
+            if time.time() >= deadline:
+                return job
+            time.sleep(poll_interval)
+
+    def requeue_stale(self):
+        """
+        Recover jobs left behind by workers or web processes that went away.
+
+        Running jobs whose lease has expired are put back in the queue.
+        Jobs pinned to a process (because they carry secret keyword
+        arguments) are failed instead: their secrets only ever lived in the
+        memory of that process, so running them anywhere else would run the
+        tool without them. This covers stale running pinned jobs and queued
+        ones whose process has died.
+
+        Returns:
+            int: Number of jobs requeued.
+        """
+        cutoff = time.time() - self.lease_timeout
+        with self._connection() as conn:
+            pinned = conn.execute(
+                'SELECT id, pid, status, started_at FROM jobs '
+                'WHERE pid IS NOT NULL AND status IN (?, ?)',
+                (STATUS_QUEUED, STATUS_RUNNING)
+            ).fetchall()
+
+            stranded = [
+                row['id'] for row in pinned
+                if not _pid_alive(row['pid'])
+                or (row['status'] == STATUS_RUNNING and row['started_at'] < cutoff)
+            ]
+            for job_id in stranded:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, error_type = ?, finished_at = ? '
+                    'WHERE id = ? AND status IN (?, ?)',
+                    (STATUS_FAILED, 'The job was interrupted before it finished. '
+                     'Please submit the file again.', 'PDFProcessingError', time.time(),
+                     job_id, STATUS_QUEUED, STATUS_RUNNING)
+                )
+
+            cursor = conn.execute(
+                'UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, progress = NULL '
+                'WHERE status = ? AND started_at < ? AND pid IS NULL',
+                (STATUS_QUEUED, STATUS_RUNNING, cutoff)
+            )
+
+        if stranded:
+            with self._secrets_lock:
+                for job_id in stranded:
+                    self._secrets.pop(job_id, None)
+            logger.warning(f"Failed {len(stranded)} interrupted jobs pinned to a process")
+        if cursor.rowcount:
+            logger.warning(f"Requeued {cursor.rowcount} stale jobs")
+        return cursor.rowcount
+
+    @staticmethod
+    def _row_to_job(row):
+        """Convert a database row to a job dictionary."""
+        return {
+            'id': row['id'],
+            'tool': row['tool'],
+            'status': row['status'],
+            'kwargs': json.loads(row['kwargs']),
+            'meta': json.loads(row['meta']),
+            'owner': row['owner'],
+            'result': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'error_type': row['error_type'],
+            'progress': json.loads(row['progress']) if row['progress'] else None,
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+        }
+
+
+def _pid_alive(pid):
+    """
+    Check whether a process on this host is still running.
+
+    Args:
+        pid: The process ID.
+
+    Returns:
+        bool: False if the process is known to have exited.
+    """
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # os.kill() terminates processes on Windows, so assume it is alive
+        # and rely on the lease timeout there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists but belongs to another user
+        return True
+    return True
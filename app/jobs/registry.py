@@ -0,0 +1,92 @@
+"""
+Job tool registry module.
+This module maps job tool names to the functions in the tools package.
+
+Jobs are stored by tool name rather than by reference so that any worker
+process can pick them up. Functions are imported lazily, the first time a job
+for that tool runs.
+"""
+
+import importlib
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tool name -> "module:function"
+TOOLS = {
+    'compress_pdf': 'tools.optimize.compress:compress_pdf',
+    'repair_pdf': 'tools.optimize.repair:repair_pdf',
+    'perform_ocr': 'tools.optimize.ocr:perform_ocr',
+    'convert_image_to_pdf': 'tools.convert_to_pdf.image_to_pdf:convert_image_to_pdf',
+    'add_page_numbers': 'tools.edit.page_numbers:add_page_numbers',
+    'add_watermark': 'tools.edit.watermark:add_watermark',
+    'merge_pdfs': 'tools.organize.merge:merge_pdfs',
+    'split_pdf': 'tools.organize.split:split_pdf',
+    'extract_pages': 'tools.organize.extract:extract_pages',
+    'rotate_pages': 'tools.organize.rotate:rotate_pages',
+    'convert_pdf_to_images': 'tools.convert_from_pdf.pdf_to_image:convert_pdf_to_images',
+    'create_panoramic_image': 'tools.convert_from_pdf.pdf_to_panoramic:create_panoramic_image',
+    'convert_to_pdfa': 'tools.convert_from_pdf.pdf_to_pdfa:convert_to_pdfa',
+    'extract_text_from_pdf': 'tools.convert_from_pdf.pdf_to_text:extract_text_from_pdf',
+    'unlock_pdf': 'tools.security.unlock:unlock_pdf',
+    'protect_pdf': 'tools.security.protect:protect_pdf',
+    'redact_pdf': 'tools.security.redact:redact_pdf',
+    'redact_pattern': 'tools.security.redact:redact_pattern',
+    'flatten_pdf': 'tools.security.flatten:flatten_pdf',
+}
+
+# Default number of jobs of each tool allowed to run at once on a host.
+# Tools that are not listed are only bounded by the size of the worker pool.
+DEFAULT_TOOL_CONCURRENCY = {
+    'perform_ocr': 2,
+    'compress_pdf': 4,
+    'repair_pdf': 2,
+    'convert_pdf_to_images': 2,
+    'create_panoramic_image': 1,
+    'split_pdf': 2,
+}
+
+# Tools whose output depends only on the input file and their options, so a
+# finished run can be reused. 'version' must be bumped whenever the tool's
+# output changes; 'output' names the keyword argument the tool writes to;
+# 'enums' names options the tool reads without regard to case or surrounding
+# whitespace, which the cache key folds the same way.
+CACHEABLE_TOOLS = {
+    'compress_pdf': {'version': '1', 'output': 'output_path', 'enums': ('compression_level',)},
+    'repair_pdf': {'version': '1', 'output': 'output_path'},
+    'perform_ocr': {'version': '2', 'output': 'output_path'},
+    'convert_to_pdfa': {'version': '1', 'output': 'output_path'},
+    'convert_pdf_to_images': {'version': '2', 'output': 'output_dir', 'enums': ('image_format',)},
+    'extract_text_from_pdf': {'version': '1', 'output': 'output_path'},
+}
+
+_resolved = {}
+_resolved_lock = threading.Lock()
+
+
+def resolve_tool(name):
+    """
+    Get the function registered for a tool name.
+
+    Args:
+        name: The tool name.
+
+    Returns:
+        callable: The tool function.
+
+    Raises:
+        KeyError: If no tool is registered under that name.
+    """
+    with _resolved_lock:
+        if name in _resolved:
+            return _resolved[name]
+
+    module_name, func_name = TOOLS[name].split(':')
+    func = getattr(importlib.import_module(module_name), func_name)
+
+    with _resolved_lock:
+        _resolved[name] = func
+
+    return func
@@ -0,0 +1,211 @@
+"""
+Job worker module.
+This module provides a bounded pool of worker threads that run queued tool jobs.
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from app.errors import PDFProcessingError
+from app.security.process_pool import get_process_pool, SandboxError
+from .registry import resolve_tool
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default number of worker threads per process
+DEFAULT_POOL_SIZE = 2
+
+# Default time in seconds an idle worker waits before polling the queue again
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Time in seconds between checks for jobs left behind by processes that died
+RECOVERY_INTERVAL = 60
+
+
+class WorkerPool:
+    """
+    Class for running queued jobs on a fixed number of worker threads.
+
+    The threads only coordinate; each tool call itself runs in a child of
+    the process pool.
+    """
+
+    def __init__(self, queue, size=DEFAULT_POOL_SIZE, tool_limits=None,
+                 poll_interval=DEFAULT_POLL_INTERVAL, cache=None, artefacts=None):
+        """
+        Initialize the worker pool.
+
+        Args:
+            queue: The JobQueue to take jobs from.
+            size: Number of worker threads.
+            tool_limits: Dictionary mapping tool names to the maximum number
+                of jobs of that tool allowed to run at once.
+            poll_interval: Time in seconds an idle worker waits between polls.
+            cache: Optional ResultCache for reusing outputs of cacheable tools.
+            artefacts: Optional StorageManager to record the files of
+                multi-output jobs in, so they can be downloaded by job ID.
+        """
+        self.queue = queue
+        self.size = size
+        self.tool_limits = tool_limits or {}
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.artefacts = artefacts
+        self.threads = []
+        self._stopping = threading.Event()
+        self._recovery_lock = threading.Lock()
+        self._last_recovery = 0
+
+    def start(self):
+        """Start the worker threads."""
+        # Recover jobs left running by a worker that died
+        self._recover_stale()
+
+        for index in range(self.size):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+            thread = threading.Thread(target=self._run, args=(worker_id,),
+                                      name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        logger.info(f"Started {self.size} job workers")
+
+    def stop(self):
+        """Ask the worker threads to stop after their current job."""
+        self._stopping.set()
+        self.queue.wakeup.set()
+
+    def _run(self, worker_id):
+        """Main loop of a worker thread."""
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim(worker_id, self.tool_limits)
+            except Exception as e:
+                logger.error(f"Error claiming job: {str(e)}")
+                job = None
+
+            if job is None:
+                self._recover_stale()
+
+                # Sleep until a job is submitted or the poll interval elapses
+                self.queue.wakeup.wait(self.poll_interval)
+                self.queue.wakeup.clear()
+                continue
+
+            self._execute(job)
+
+    def _recover_stale(self):
+        """Recover stale jobs, at most once per RECOVERY_INTERVAL."""
+        with self._recovery_lock:
+            if time.time() - self._last_recovery < RECOVERY_INTERVAL:
+                return
+            self._last_recovery = time.time()
+
+        try:
+            self.queue.requeue_stale()
+        except Exception as e:
+            logger.error(f"Error recovering stale jobs: {str(e)}")
+
+    def _execute(self, job):
+        """
+        Run a single job and record its outcome.
+
+        Args:
+            job: The claimed job.
+        """
+        start_time = time.time()
+        logger.info(f"Running job {job['id']} ({job['tool']})")
+
+        try:
+            cache_key = self._cache_key(job)
+            if cache_key:
+                result = self.cache.get(cache_key, job['tool'], job['kwargs'])
+                if result is not None:
+                    self._record_artefacts(job, result)
+                    self.queue.complete(job['id'], result)
+                    logger.info(f"Job {job['id']} served from the result cache")
+                    return
+
+            func = resolve_tool(job['tool'])
+            result = get_process_pool().run(
+                func, kwargs=job['kwargs'], tool=job['tool'],
+                on_progress=lambda progress: self.queue.set_progress(job['id'], progress)
+            )
+            self._record_artefacts(job, result)
+            self.queue.complete(job['id'], result)
+            logger.info(f"Job {job['id']} finished in {time.time() - start_time:.2f}s")
+
+            if cache_key:
+                self._cache_result(job, cache_key, result)
+
+        except PDFProcessingError as e:
+            logger.error(f"Job {job['id']} failed: {e.message}")
+            self.queue.fail(job['id'], e.message, 'PDFProcessingError')
+
+        except SandboxError as e:
+            # Timeouts and resource limits are reported to the user like tool errors
+            logger.error(f"Job {job['id']} was stopped: {str(e)}")
+            self.queue.fail(job['id'], str(e), 'PDFProcessingError')
+
+        except Exception as e:
+            logger.error(f"Unexpected error in job {job['id']}: {str(e)}")
+            self.queue.fail(job['id'], str(e), type(e).__name__)
+
+    def _record_artefacts(self, job, result):
+        """
+        Record the output files of a multi-output job before it is reported
+        as finished, so its download links work as soon as they are shown.
+
+        Args:
+            job: The job.
+            result: The tool result.
+        """
+        artefact_id = job['meta'].get('artefact_id')
+        if self.artefacts is None or not artefact_id or not isinstance(result, dict):
+            return
+
+        try:
+            files = list(result.get('output_files') or [])
+            if result.get('manifest_file'):
+                files.append(result['manifest_file'])
+            self.artefacts.record_files(artefact_id, files)
+        except Exception as e:
+            # Downloads fall back to the job's output directory
+            logger.warning(f"Could not record output files of job {job['id']}: {str(e)}")
+
+    def _cache_key(self, job):
+        """
+        Get the result cache key of a job.
+
+        Args:
+            job: The job.
+
+        Returns:
+            str: The cache key, or None if the job can't use the cache.
+        """
+        if self.cache is None:
+            return None
+
+        try:
+            return self.cache.make_key(job['tool'], job['kwargs'], job['meta'].get('input_sha256'))
+        except OSError as e:
+            logger.warning(f"Could not compute cache key for job {job['id']}: {str(e)}")
+            return None
+
+    def _cache_result(self, job, cache_key, result):
+        """
+        Store the result of a finished job in the result cache.
+
+        Args:
+            job: The job.
+            cache_key: The job's cache key.
+            result: The tool result.
+        """
+        try:
+            self.cache.put(cache_key, job['tool'], job['kwargs'], result)
+        except Exception as e:
+            # The job has already finished; a cache failure must not fail it
+            logger.warning(f"Could not cache result of job {job['id']}: {str(e)}")
@@ -5,39 +5,39 @@ This module defines the routes for the RevisePDF application.
 It includes blueprints for different sections of the application.
 """
 
-from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, send_from_directory, jsonify, send_file
+from flask import Blueprint, render_template, current_app, request, redirect, url_for, flash, send_from_directory, jsonify, send_file, g, abort, Response
 import os
 import uuid
 import datetime
 import logging
-import zipfile
-import io
 import json
 from werkzeug.utils import secure_filename
 from app.forms import CompressForm, RepairForm, OCRForm, ImageToPDFForm, MergeForm, SplitForm, ExtractForm, RotateForm, PDFToImageForm, PDFToTextForm, PDFToPDFAForm, PDFToPanoramicForm, PageNumbersForm, WatermarkForm, ProtectForm, UnlockForm, FlattenForm, RedactForm, ContentEditForm, SignatureForm
-from tools.optimize.compress import compress_pdf
-from tools.optimize.repair import repair_pdf, check_pdf_structure
-from tools.optimize.ocr import perform_ocr, get_language_name
-from tools.convert_to_pdf.image_to_pdf import convert_image_to_pdf
-from tools.organize.merge import merge_pdfs
-from tools.organize.split import split_pdf
-from tools.organize.extract import extract_pages, format_page_list
-from tools.organize.rotate import rotate_pages, get_rotation_description
-from tools.convert_from_pdf.pdf_to_image import convert_pdf_to_images, create_images_zip
-from tools.convert_from_pdf.pdf_to_text import extract_text_from_pdf
-from tools.convert_from_pdf.pdf_to_pdfa import convert_to_pdfa, get_conformance_description
-from tools.convert_from_pdf.pdf_to_panoramic import create_panoramic_image
-from tools.edit.page_numbers import add_page_numbers, get_position_name, get_font_name
-from tools.edit.watermark import add_watermark, get_position_name as get_watermark_position_name
-from tools.edit.content import add_text_to_pdf, add_image_to_pdf, remove_content_from_pdf, get_pdf_dimensions, get_pdf_preview, get_available_fonts, extract_text_with_attributes, replace_text_preserving_attributes, get_all_text_with_positions
-from tools.edit.text_editor import extract_text_blocks, replace_text_in_pdf, get_pdf_dimensions as get_text_editor_pdf_dimensions, get_pdf_preview as get_text_editor_pdf_preview
+from tools.optimize.repair import check_pdf_structure
+from tools.optimize.ocr import get_language_name
+from tools.organize.extract import format_page_list
+from tools.organize.rotate import get_rotation_description
+from tools.utils.zip_stream import stream_zip
+from tools.utils.document_cache import open_document
+from tools.convert_from_pdf.pdf_to_pdfa import get_conformance_description
+from tools.utils.ghostscript import has_ghostscript_capability
+from tools.edit.page_numbers import get_position_name, get_font_name
+from tools.edit.watermark import get_position_name as get_watermark_position_name
+from tools.edit.content import add_text_to_pdf, add_image_to_pdf, remove_content_from_pdf, apply_operations, get_pdf_dimensions, get_available_fonts, extract_text_with_attributes, replace_text_preserving_attributes, get_all_text_with_positions
+from tools.edit.text_editor import extract_text_blocks, replace_text_in_pdf, get_pdf_dimensions as get_text_editor_pdf_dimensions
 from tools.edit.wysiwyg_editor import modify_pdf_text
-from tools.edit.signature import add_signature_to_pdf, add_signature_from_data_url, get_pdf_dimensions as get_signature_pdf_dimensions, get_pdf_preview as get_signature_pdf_preview
-from tools.security.protect import protect_pdf, check_pdf_encryption
-from tools.security.unlock import unlock_pdf, is_pdf_encrypted
-from tools.security.flatten import flatten_pdf, has_form_fields_or_annotations
-from tools.security.redact import redact_pdf, redact_pattern, get_common_patterns
+from tools.edit.journal import EditJournal
+from tools.edit.preview import (render_page_png, render_tile_png, get_tile_info, get_tile_scale, needs_tiles,
+                                PREVIEW_DPI, MIN_PREVIEW_DPI)
+from tools.edit.signature import add_signature_to_pdf, add_signature_from_data_url, get_pdf_dimensions as get_signature_pdf_dimensions
+from tools.security.protect import check_pdf_encryption
+from tools.security.unlock import is_pdf_encrypted
+from tools.security.flatten import has_form_fields_or_annotations
+from tools.security.redact import get_common_patterns
 from app.errors import PDFProcessingError
+from app.jobs import submit_job, get_finished_job
+from app.security.file_validation import ingest_upload, PDF_MIME_TYPES, IMAGE_MIME_TYPES
+from app.storage import register_artefact, get_job_file, list_job_files
 
 # Configure logging
 logging.basicConfig(
@@ -92,15 +92,26 @@ def get_unique_filename(filename):
     # Return the unique filename with the original extension
     return f"{unique_name}.{ext}" if ext else unique_name
 
-def save_uploaded_file(file):
+def save_uploaded_file(file, allowed_types=PDF_MIME_TYPES):
     """
     Save an uploaded file to the upload folder.
 
+    The upload is streamed to disk once, with its size checked against the
+    user's limit, its hash recorded and its type checked on the way.
+    Identical uploads share one copy on disk, so the saved file must not be
+    modified in place.
+
     Args:
         file (FileStorage): The uploaded file.
+        allowed_types (tuple, optional): MIME types the content may have.
+            Defaults to PDF.
 
     Returns:
         str: The path to the saved file.
+
+    Raises:
+        PDFProcessingError: If the file is larger than the user's limit or
+            its content isn't of an allowed type.
     """
     # Secure the filename to prevent directory traversal attacks
     filename = secure_filename(file.filename)
@@ -111,24 +122,128 @@ def save_uploaded_file(file):
     # Create the full path to save the file
     file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename)
 
+    # Look up the current user and their file size limit once per request
+    if 'upload_user' not in g:
+        g.upload_user = None
+        g.upload_limit = current_app.config.get('MAX_CONTENT_LENGTH')
+        try:
+            from app.auth.utils import get_current_user, get_file_size_limit
+            g.upload_user = get_current_user()
+            g.upload_limit = get_file_size_limit(g.upload_user.get('id') if g.upload_user else None)
+        except ImportError:
+            # Auth module not available, only the global limit applies
+            pass
+        except Exception as e:
+            logger.error(f"Error getting file size limit: {str(e)}")
+
     # Save the file
-    file.save(file_path)
+    upload = ingest_upload(file, file_path, max_size=g.upload_limit,
+                           store=getattr(current_app, 'blob_store', None), allowed_types=allowed_types)
+
+    register_artefact(file_path, owner=g.upload_user.get('id') if g.upload_user else None)
 
     # Track file usage for authenticated users
-    try:
-        from app.auth.utils import get_current_user, track_file_usage
-        user = get_current_user()
-        if user:
-            file_size = os.path.getsize(file_path)
-            track_file_usage(user.get('id'), file_size)
-    except ImportError:
-        # Auth module not available, skip tracking
-        pass
-    except Exception as e:
-        logger.error(f"Error tracking file usage: {str(e)}")
+    if g.upload_user:
+        try:
+            from app.auth.utils import track_file_usage
+            track_file_usage(g.upload_user.get('id'), upload['size'])
+        except Exception as e:
+            logger.error(f"Error tracking file usage: {str(e)}")
 
     return file_path
 
+def zip_response(file_paths, download_name):
+    """
+    Send files as a ZIP archive that is built while it is being sent.
+
+    Args:
+        file_paths (list): Paths of the files to include.
+        download_name (str): Filename offered for the archive.
+
+    Returns:
+        Response: A streamed response with the archive.
+    """
+    return Response(
+        stream_zip(file_paths),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename="{secure_filename(download_name)}"'}
+    )
+
+def wants_async_response():
+    """
+    Check whether the client asked to get the job ID back instead of waiting.
+
+    Returns:
+        bool: True for XHR requests and requests with ?async=1.
+    """
+    return request.args.get('async') == '1' or request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+def job_accepted_response(job_id):
+    """
+    Build the response returned when a tool job is queued asynchronously.
+
+    Args:
+        job_id (str): The job ID.
+
+    Returns:
+        tuple: JSON response with the job ID and status URL, and status code 202.
+    """
+    return jsonify({
+        'job_id': job_id,
+        'status_url': url_for('jobs_api.job_status', job_id=job_id)
+    }), 202
+
+def job_started_response(job_id):
+    """
+    Build the response to a form post once its tool job has been queued.
+
+    API clients get the job ID back. Browsers are sent to the tool page for
+    the job, which waits for it without tying up a web worker and then shows
+    the result. If JOB_WAIT_FOR_RESULT is set, nothing is returned and the
+    request waits for the result itself.
+
+    Args:
+        job_id (str): The job ID.
+
+    Returns:
+        The response to return, or None to go on and show the result.
+    """
+    if wants_async_response():
+        return job_accepted_response(job_id)
+
+    if current_app.config.get('JOB_WAIT_FOR_RESULT', False):
+        return None
+
+    return redirect(url_for(request.endpoint, job=job_id))
+
+def get_requested_job_id():
+    """
+    Get the job a tool page was asked to show the result of.
+
+    Only GET requests name a job; a form posted from a result page starts a
+    new one.
+
+    Returns:
+        str: The job ID, or None.
+    """
+    if request.method != 'GET':
+        return None
+    return request.args.get('job')
+
+def job_pending_response(job_id):
+    """
+    Render a page that waits for a tool job and then shows its result.
+
+    Args:
+        job_id (str): The job ID.
+
+    Returns:
+        str: The rendered page.
+    """
+    return render_template('jobs/pending.html',
+                           status_url=url_for('jobs_api.job_status', job_id=job_id),
+                           result_url=url_for(request.endpoint, job=job_id))
+
 # Main routes
 @main_bp.route('/')
 def index():
@@ -182,20 +297,36 @@ def compress():
     form = CompressForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('compressed_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Compress the PDF
-            compression_level = form.compression_level.data
-            result = compress_pdf(input_path, output_path, compression_level)
+            if tool_job_id is None:
+                # Fail fast before saving the upload if compression can't run here
+                if not has_ghostscript_capability('pdfwrite'):
+                    raise PDFProcessingError("Ghostscript is not available on this server")
+
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('compressed_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Compress the PDF
+                compression_level = form.compression_level.data
+                tool_job_id = submit_job('compress_pdf', {'input_path': input_path, 'output_path': output_path, 'compression_level': compression_level},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('PDF compressed successfully!', 'success')
 
@@ -220,22 +351,35 @@ def repair():
     result = None
     structure = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Check the PDF structure
-            structure = check_pdf_structure(input_path)
-
-            # Generate output filename
-            output_filename = get_unique_filename('repaired_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Repair the PDF
-            result = repair_pdf(input_path, output_path)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Check the PDF structure
+                structure = check_pdf_structure(input_path)
+
+                # Generate output filename
+                output_filename = get_unique_filename('repaired_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Repair the PDF
+                tool_job_id = submit_job('repair_pdf', {'input_path': input_path, 'output_path': output_path},
+                                         meta={'output_filename': output_filename, 'structure': structure})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
+            structure = job['meta'].get('structure')
 
             flash('PDF repaired successfully!', 'success')
 
@@ -259,20 +403,32 @@ def ocr():
     form = OCRForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('ocr_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Perform OCR on the PDF
-            language = form.language.data
-            result = perform_ocr(input_path, output_path, language)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('ocr_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Perform OCR on the PDF
+                language = form.language.data
+                tool_job_id = submit_job('perform_ocr', {'input_path': input_path, 'output_path': output_path, 'language': language},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             if result.get('tesseract_missing'):
                 flash("OCR engine is not available. The PDF has been returned unchanged.", 'warning')
@@ -311,21 +467,34 @@ def image_to_pdf():
     form = ImageToPDFForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename(secure_filename(input_file.filename).rsplit('.', 1)[0] + '.pdf')
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Convert the image to PDF
-            page_size = form.page_size.data
-            orientation = form.orientation.data
-            result = convert_image_to_pdf(input_path, output_path, page_size, orientation)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file, IMAGE_MIME_TYPES)
+
+                # Generate output filename
+                output_filename = get_unique_filename(secure_filename(input_file.filename).rsplit('.', 1)[0] + '.pdf')
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Convert the image to PDF
+                page_size = form.page_size.data
+                orientation = form.orientation.data
+                tool_job_id = submit_job('convert_image_to_pdf', {'input_path': input_path, 'output_path': output_path,
+                                          'page_size': page_size, 'orientation': orientation},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('Image converted to PDF successfully!', 'success')
 
@@ -372,36 +541,49 @@ def page_numbers():
     output_filename = None
     position_name = ""
     font_name = ""
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('numbered_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get form data
-            position = form.position.data
-            start_number = form.start_number.data
-            font = form.font.data
-            font_size = form.font_size.data
-            prefix = form.prefix.data
-            suffix = form.suffix.data
-            margin = form.margin.data
-            pages = form.pages.data
-
-            # Add page numbers to the PDF
-            result = add_page_numbers(
-                input_path, output_path, start_number, position, font, font_size,
-                (0, 0, 0), margin, prefix, suffix, pages
-            )
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('numbered_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get form data
+                position = form.position.data
+                start_number = form.start_number.data
+                font = form.font.data
+                font_size = form.font_size.data
+                prefix = form.prefix.data
+                suffix = form.suffix.data
+                margin = form.margin.data
+                pages = form.pages.data
+
+                # Add page numbers to the PDF
+                tool_job_id = submit_job('add_page_numbers', {
+                    'input_path': input_path, 'output_path': output_path,
+                    'start_number': start_number, 'position': position, 'font_name': font,
+                    'font_size': font_size, 'margin': margin,
+                    'prefix': prefix, 'suffix': suffix, 'pages': pages
+                }, meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             # Get human-readable names for display
-            position_name = get_position_name(position)
-            font_name = get_font_name(font)
+            position_name = get_position_name(job['kwargs']['position'])
+            font_name = get_font_name(job['kwargs']['font_name'])
 
             flash('Page numbers added successfully!', 'success')
 
@@ -428,34 +610,46 @@ def watermark():
     result = None
     output_filename = None
     position_name = ""
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('watermarked_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get form data
-            text = form.text.data
-            position = form.position.data
-            font = form.font.data
-            font_size = form.font_size.data
-            opacity = form.opacity.data / 100.0  # Convert from percentage to decimal
-            rotation = form.rotation.data
-            pages = form.pages.data
-
-            # Add watermark to the PDF
-            result = add_watermark(
-                input_path, output_path, text, position, font, font_size,
-                opacity, rotation, (128, 128, 128), pages
-            )
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('watermarked_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get form data
+                text = form.text.data
+                position = form.position.data
+                font = form.font.data
+                font_size = form.font_size.data
+                opacity = form.opacity.data / 100.0  # Convert from percentage to decimal
+                rotation = form.rotation.data
+                pages = form.pages.data
+
+                # Add watermark to the PDF
+                tool_job_id = submit_job('add_watermark', {
+                    'input_path': input_path, 'output_path': output_path, 'text': text,
+                    'position': position, 'font_name': font, 'font_size': font_size,
+                    'opacity': opacity, 'rotation': rotation, 'pages': pages
+                }, meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             # Get human-readable position name for display
-            position_name = get_watermark_position_name(position)
+            position_name = get_watermark_position_name(job['kwargs']['position'])
 
             flash('Watermark added successfully!', 'success')
 
@@ -524,15 +718,6 @@ def update_text_blocks():
             current_app.logger.info(f"Using existing output file as input: {output_path}")
             input_path = output_path
 
-        # Create a simple copy first to ensure we have a valid output file
-        try:
-            import shutil
-            shutil.copy2(input_path, output_path)
-            current_app.logger.info(f"Created initial copy of PDF: {input_path} -> {output_path}")
-        except Exception as copy_error:
-            current_app.logger.error(f"Error creating initial copy: {str(copy_error)}")
-            return jsonify({'error': f"Error creating initial copy: {str(copy_error)}"}), 500
-
         # Replace text in the PDF
         try:
             # Debug: Log first few text blocks
@@ -565,18 +750,153 @@ def update_text_blocks():
         current_app.logger.error(f"Unexpected error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def get_preview_url(filename, pdf_path, page_number, dpi=None):
+    """
+    Get the URL of a page preview.
+
+    The URL carries a version taken from the file's content, so browsers can
+    cache the image for as long as the file is unchanged.
+
+    Args:
+        filename (str): Name of the PDF in the upload folder.
+        pdf_path (str): Path to the PDF.
+        page_number (int): 1-based page number.
+        dpi (int, optional): Resolution of the preview. Defaults to PREVIEW_DPI.
+
+    Returns:
+        str: The preview URL.
+    """
+    file_hash = current_app.preview_cache.file_hash(pdf_path)
+    return url_for('edit.page_preview', filename=filename, page_number=page_number, dpi=dpi, v=file_hash[:16])
+
+def get_preview_urls(filename, pdf_path, page_number, width, height):
+    """
+    Get the URLs an editor shows a page with.
+
+    Large pages get a low-resolution preview and the URL of their tile
+    grid, so the viewer only loads the detail at the size it shows the page.
+
+    Args:
+        filename (str): Name of the PDF in the upload folder.
+        pdf_path (str): Path to the PDF.
+        page_number (int): 1-based page number.
+        width (float): Page width in points.
+        height (float): Page height in points.
+
+    Returns:
+        tuple: The preview URL and the tile info URL, or None if the page
+            is small enough to show as one image.
+    """
+    if not needs_tiles(width, height):
+        return get_preview_url(filename, pdf_path, page_number), None
+
+    return (get_preview_url(filename, pdf_path, page_number, dpi=MIN_PREVIEW_DPI),
+            url_for('edit.page_tile_info', filename=filename, page_number=page_number))
+
+@edit_bp.route('/preview/<filename>/<int:page_number>')
+def page_preview(filename, page_number):
+    """Serve a rendered PDF page for the editors."""
+    pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.isfile(pdf_path):
+        abort(404)
+
+    dpi = request.args.get('dpi', PREVIEW_DPI, type=int)
+    rotation = request.args.get('rotation', 0, type=int)
+
+    cache = current_app.preview_cache
+    file_hash = cache.file_hash(pdf_path)
+    key = cache.make_key(file_hash, page_number, dpi, rotation)
+
+    # Answer revalidation without loading or rendering the image
+    if key in request.if_none_match:
+        response = Response(status=304)
+    else:
+        try:
+            data = cache.get_or_render(key, lambda: render_page_png(pdf_path, page_number, dpi, rotation))
+        except PDFProcessingError as e:
+            logger.warning(f"Could not render preview of {filename} page {page_number}: {str(e)}")
+            abort(404)
+        response = Response(data, mimetype='image/png')
+
+    return set_preview_cache_headers(response, key, file_hash)
+
+def set_preview_cache_headers(response, etag, file_hash):
+    """
+    Set the caching headers of a rendered page image.
+
+    Args:
+        response (Response): The response.
+        etag (str): The image's cache key.
+        file_hash (str): SHA-256 of the PDF it was rendered from.
+
+    Returns:
+        Response: The response.
+    """
+    response.set_etag(etag)
+    response.cache_control.private = True
+    if request.args.get('v') == file_hash[:16]:
+        # The URL changes whenever the file does
+        response.cache_control.max_age = 24 * 60 * 60
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+@edit_bp.route('/tiles/<filename>/<int:page_number>')
+def page_tile_info(filename, page_number):
+    """Describe the zoom levels and tile grid of a PDF page."""
+    pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.isfile(pdf_path):
+        return jsonify({'error': 'File not found'}), 404
+
+    try:
+        info = get_tile_info(pdf_path, page_number)
+    except PDFProcessingError as e:
+        return jsonify({'error': str(e)}), 404
+
+    file_hash = current_app.preview_cache.file_hash(pdf_path)
+    # Tile URLs sit under this one; the client fills in the placeholders
+    info['tile_url'] = (url_for('edit.page_tile_info', filename=filename, page_number=page_number)
+                        + f'/{{level}}/{{column}}/{{row}}.png?v={file_hash[:16]}')
+    return jsonify(info)
+
+@edit_bp.route('/tiles/<filename>/<int:page_number>/<int:level>/<int:column>/<int:row>.png')
+def page_tile(filename, page_number, level, column, row):
+    """Serve one tile of a rendered PDF page."""
+    pdf_path = os.path.join(current_app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.isfile(pdf_path):
+        abort(404)
+
+    cache = current_app.preview_cache
+    file_hash = cache.file_hash(pdf_path)
+    key = cache.make_key(file_hash, page_number, 72 * get_tile_scale(level), 0, kind=f'tile:{level}:{column}:{row}')
+
+    # Answer revalidation without loading or rendering the tile
+    if key in request.if_none_match:
+        response = Response(status=304)
+    else:
+        try:
+            data = cache.get_or_render(key, lambda: render_tile_png(pdf_path, page_number, level, column, row))
+        except PDFProcessingError as e:
+            logger.warning(f"Could not render tile of {filename} page {page_number}: {str(e)}")
+            abort(404)
+        response = Response(data, mimetype='image/png')
+
+    return set_preview_cache_headers(response, key, file_hash)
+
 @edit_bp.route('/content', methods=['GET', 'POST'])
 def content():
     """Render the content editing page and handle form submission."""
     form = ContentEditForm()
     pdf_uploaded = False
-    preview_image = None
+    preview_url = None
+    tile_info_url = None
     filename = None
     output_filename = None
     current_page = 1
     total_pages = 1
     pdf_width = 595  # Default A4 width in points
     pdf_height = 842  # Default A4 height in points
+    edit_history = []
     available_fonts = get_available_fonts()
 
     # Check if we're viewing an already uploaded PDF
@@ -597,23 +917,30 @@ def content():
                 current_page = 1
 
             try:
+                # Set output filename
+                if not request.args.get('output'):
+                    output_filename = get_unique_filename('edited_' + filename)
+                else:
+                    output_filename = secure_filename(request.args.get('output'))
+
+                # Show the edits made so far, if any
+                preview_filename = filename
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+                if os.path.exists(output_path):
+                    preview_filename = output_filename
+                    pdf_path = output_path
+                    edit_history = EditJournal(output_path).history()
+
                 # Get PDF dimensions
                 pdf_width, pdf_height = get_pdf_dimensions(pdf_path, current_page)
 
-                # Get PDF preview
-                preview_image = get_pdf_preview(pdf_path, current_page)
+                # Get the URLs of the PDF preview
+                preview_url, tile_info_url = get_preview_urls(preview_filename, pdf_path, current_page,
+                                                              pdf_width, pdf_height)
 
                 # Get total pages
-                import fitz
-                doc = fitz.open(pdf_path)
-                total_pages = doc.page_count
-                doc.close()
-
-                # Set output filename
-                if not request.args.get('output'):
-                    output_filename = get_unique_filename('edited_' + filename)
-                else:
-                    output_filename = request.args.get('output')
+                with open_document(pdf_path) as doc:
+                    total_pages = doc.page_count
             except Exception as e:
                 flash(f'Error processing PDF: {str(e)}', 'danger')
                 pdf_uploaded = False
@@ -623,11 +950,8 @@ def content():
         try:
             # Save the uploaded file
             input_file = form.file.data
-            filename = get_unique_filename(secure_filename(input_file.filename))
-            input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-
-            # Save the file
-            input_file.save(input_path)
+            input_path = save_uploaded_file(input_file)
+            filename = os.path.basename(input_path)
 
             # Redirect to the same page with the filename in the query string
             return redirect(url_for('edit.content', filename=filename))
@@ -636,10 +960,11 @@ def content():
             flash(f'Error uploading PDF: {str(e)}', 'danger')
 
     return render_template('edit/content.html', form=form, pdf_uploaded=pdf_uploaded,
-                           preview_image=preview_image, filename=filename,
+                           preview_url=preview_url, tile_info_url=tile_info_url, filename=filename,
                            output_filename=output_filename, current_page=current_page,
                            total_pages=total_pages, pdf_width=pdf_width,
-                           pdf_height=pdf_height, available_fonts=available_fonts)
+                           pdf_height=pdf_height, available_fonts=available_fonts,
+                           edit_history=edit_history)
 
 @edit_bp.route('/add-text', methods=['POST'])
 def add_text():
@@ -712,9 +1037,7 @@ def add_image():
             flash('No image file provided.', 'danger')
             return redirect(url_for('edit.content', filename=filename, page=page_number))
 
-        image_filename = get_unique_filename(secure_filename(image_file.filename))
-        image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename)
-        image_file.save(image_path)
+        image_path = save_uploaded_file(image_file, IMAGE_MIME_TYPES)
 
         # Get input and output paths
         input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
@@ -784,6 +1107,99 @@ def remove_content():
         flash(f'Error removing content: {str(e)}', 'danger')
         return redirect(url_for('edit.content', filename=filename, page=page_number))
 
+@edit_bp.route('/apply-operations', methods=['POST'])
+def apply_edit_operations():
+    """Apply a batch of edit operations to a PDF in one save."""
+    # Operations come as JSON, either as the request body or as a form field
+    # next to the image files they refer to
+    if request.is_json:
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        filename = data.get('filename')
+    else:
+        filename = request.form.get('filename')
+        try:
+            operations = json.loads(request.form.get('operations') or 'null')
+        except json.JSONDecodeError as json_error:
+            return jsonify({'error': f"Invalid JSON data: {str(json_error)}"}), 400
+
+    if not filename or not isinstance(operations, list):
+        return jsonify({'error': 'A filename and a list of operations are required.'}), 400
+
+    input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], secure_filename(filename))
+    if not os.path.exists(input_path):
+        return jsonify({'error': f"Input file not found: {filename}"}), 404
+
+    # Check if there's already an output file
+    output_filename = request.args.get('output')
+    if not output_filename:
+        output_filename = get_unique_filename('edited_' + filename)
+    output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], secure_filename(output_filename))
+
+    image_paths = []
+    try:
+        # Save the images of image operations, named by their file field
+        for operation in operations:
+            if isinstance(operation, dict) and operation.get('type') == 'image':
+                image_file = request.files.get(operation.get('image') or '')
+                if image_file:
+                    operation['image_path'] = save_uploaded_file(image_file, IMAGE_MIME_TYPES)
+                    image_paths.append(operation['image_path'])
+                else:
+                    operation['image_path'] = None
+
+        result = apply_operations(input_path, output_path, operations)
+        result['success'] = result['applied'] > 0
+        result['output_filename'] = output_filename
+        return jsonify(result)
+
+    except PDFProcessingError as e:
+        return jsonify({'error': str(e)}), 400
+
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        # Clean up the uploaded images
+        for image_path in image_paths:
+            if os.path.exists(image_path):
+                os.remove(image_path)
+
+@edit_bp.route('/undo', methods=['POST'])
+def undo_edit():
+    """Undo the last edit made to an edited PDF."""
+    filename = request.form.get('filename')
+    output_filename = secure_filename(request.form.get('output', ''))
+    page_number = int(request.form.get('page_number', 1))
+
+    try:
+        output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+        label = EditJournal(output_path).undo()
+        flash(f'Undone: {label}.', 'success')
+    except PDFProcessingError as e:
+        flash(str(e), 'warning')
+    except Exception as e:
+        flash(f'Error undoing edit: {str(e)}', 'danger')
+
+    return redirect(url_for('edit.content', filename=filename, page=page_number, output=output_filename))
+
+@edit_bp.route('/checkpoint', methods=['POST'])
+def checkpoint_edits():
+    """Compact an edited PDF, making its edits so far permanent."""
+    filename = request.form.get('filename')
+    output_filename = secure_filename(request.form.get('output', ''))
+    page_number = int(request.form.get('page_number', 1))
+
+    try:
+        output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+        result = EditJournal(output_path).checkpoint()
+        flash(f"Edits saved. The PDF is now {result['size_after'] / 1024 / 1024:.1f} MB.", 'success')
+    except Exception as e:
+        flash(f'Error saving edits: {str(e)}', 'danger')
+
+    return redirect(url_for('edit.content', filename=filename, page=page_number, output=output_filename))
+
 @edit_bp.route('/wysiwyg-editor', methods=['GET', 'POST'])
 def wysiwyg_editor():
     """Render the WYSIWYG editor page with Coming Soon message."""
@@ -942,7 +1358,8 @@ def signature():
     """Render the signature page and handle form submission."""
     form = SignatureForm()
     pdf_uploaded = False
-    preview_image = None
+    preview_url = None
+    tile_info_url = None
     filename = None
     output_filename = None
     current_page = 1
@@ -971,14 +1388,13 @@ def signature():
                 # Get PDF dimensions
                 pdf_width, pdf_height = get_signature_pdf_dimensions(pdf_path, current_page)
 
-                # Get PDF preview
-                preview_image = get_signature_pdf_preview(pdf_path, current_page)
+                # Get the URLs of the PDF preview
+                preview_url, tile_info_url = get_preview_urls(filename, pdf_path, current_page,
+                                                              pdf_width, pdf_height)
 
                 # Get total pages
-                import fitz
-                doc = fitz.open(pdf_path)
-                total_pages = doc.page_count
-                doc.close()
+                with open_document(pdf_path) as doc:
+                    total_pages = doc.page_count
 
                 # Set output filename
                 if not request.args.get('output'):
@@ -994,11 +1410,8 @@ def signature():
         try:
             # Save the uploaded file
             input_file = form.file.data
-            filename = get_unique_filename(secure_filename(input_file.filename))
-            input_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-
-            # Save the file
-            input_file.save(input_path)
+            input_path = save_uploaded_file(input_file)
+            filename = os.path.basename(input_path)
 
             # Redirect to the same page with the filename in the query string
             return redirect(url_for('edit.signature', filename=filename))
@@ -1007,7 +1420,7 @@ def signature():
             flash(f'Error uploading PDF: {str(e)}', 'danger')
 
     return render_template('edit/signature.html', form=form, pdf_uploaded=pdf_uploaded,
-                           preview_image=preview_image, filename=filename,
+                           preview_url=preview_url, tile_info_url=tile_info_url, filename=filename,
                            output_filename=output_filename, current_page=current_page,
                            total_pages=total_pages, pdf_width=pdf_width,
                            pdf_height=pdf_height)
@@ -1076,45 +1489,57 @@ def merge():
     """Render the merge page and handle form submission."""
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if request.method == 'POST':
+    if request.method == 'POST' or tool_job_id:
         try:
-            # Get files from the request
-            files = request.files.getlist('files[]')
-
-            # Check if files were provided
-            if not files or all(not f.filename for f in files):
-                flash('Please select at least one PDF file.', 'danger')
-                form = MergeForm()
-                return render_template('organise/merge.html', form=form)
-
-            # Save uploaded files
-            input_paths = []
-            for file in files:
-                if file and file.filename:
-                    # Check if the file is a PDF
-                    if not file.filename.lower().endswith('.pdf'):
-                        flash('Only PDF files are allowed.', 'danger')
-                        continue
-
-                    # Save the file
-                    file_path = save_uploaded_file(file)
-                    input_paths.append(file_path)
-
-            # Check if any valid files were uploaded
-            if not input_paths:
-                flash('No valid PDF files were uploaded.', 'danger')
-                return render_template('organise/merge.html')
-
-            # Generate output filename
-            output_filename = get_unique_filename('merged.pdf')
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get table of contents option
-            create_toc = 'create_toc' in request.form
-
-            # Merge the PDFs
-            result = merge_pdfs(input_paths, output_path, toc=create_toc)
+            if tool_job_id is None:
+                # Get files from the request
+                files = request.files.getlist('files[]')
+
+                # Check if files were provided
+                if not files or all(not f.filename for f in files):
+                    flash('Please select at least one PDF file.', 'danger')
+                    form = MergeForm()
+                    return render_template('organise/merge.html', form=form)
+
+                # Save uploaded files
+                input_paths = []
+                for file in files:
+                    if file and file.filename:
+                        # Check if the file is a PDF
+                        if not file.filename.lower().endswith('.pdf'):
+                            flash('Only PDF files are allowed.', 'danger')
+                            continue
+
+                        # Save the file
+                        file_path = save_uploaded_file(file)
+                        input_paths.append(file_path)
+
+                # Check if any valid files were uploaded
+                if not input_paths:
+                    flash('No valid PDF files were uploaded.', 'danger')
+                    return render_template('organise/merge.html')
+
+                # Generate output filename
+                output_filename = get_unique_filename('merged.pdf')
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get table of contents option
+                create_toc = 'create_toc' in request.form
+
+                # Merge the PDFs
+                tool_job_id = submit_job('merge_pdfs', {'input_paths': input_paths, 'output_path': output_path, 'toc': create_toc},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('PDFs merged successfully!', 'success')
 
@@ -1139,27 +1564,41 @@ def split():
     form = SplitForm()
     result = None
     job_id = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate a unique job ID for this split operation
-            job_id = uuid.uuid4().hex
-
-            # Create a directory for the split files
-            output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'split_{job_id}')
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Get split parameters
-            split_method = form.split_method.data
-            page_ranges = form.page_ranges.data if split_method == 'range' else None
-            max_size = form.max_size.data if split_method == 'size' else None
-
-            # Split the PDF
-            result = split_pdf(input_path, output_dir, split_method, page_ranges, max_size)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate a unique job ID for this split operation
+                job_id = uuid.uuid4().hex
+
+                # Create a directory for the split files
+                output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'split_{job_id}')
+                os.makedirs(output_dir, exist_ok=True)
+
+                # Get split parameters
+                split_method = form.split_method.data
+                page_ranges = form.page_ranges.data if split_method == 'range' else None
+                max_size = form.max_size.data if split_method == 'size' else None
+
+                # Split the PDF
+                tool_job_id = submit_job('split_pdf', {
+                    'input_path': input_path, 'output_dir': output_dir, 'split_method': split_method,
+                    'page_ranges': page_ranges, 'max_size': max_size, 'manifest': form.manifest.data
+                }, meta={'artefact_id': job_id})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            job_id = job['meta']['artefact_id']
 
             flash('PDF split successfully!', 'success')
 
@@ -1172,47 +1611,27 @@ def split():
 
     return render_template('organise/split.html', form=form, result=result, job_id=job_id)
 
-@organize_bp.route('/download_split/<filename>')
-def download_split(filename):
+@organize_bp.route('/download_split/<job_id>/<filename>')
+def download_split(job_id, filename):
     """Download a split PDF file."""
-    # Find the file in any of the split directories
-    for dir_name in os.listdir(current_app.config['UPLOAD_FOLDER']):
-        if dir_name.startswith('split_'):
-            dir_path = os.path.join(current_app.config['UPLOAD_FOLDER'], dir_name)
-            file_path = os.path.join(dir_path, filename)
-            if os.path.exists(file_path):
-                return send_from_directory(dir_path, filename, as_attachment=True)
-
-    # If file not found, return 404
-    flash('File not found.', 'danger')
-    return redirect(url_for('organize.split'))
+    split_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'split_{secure_filename(job_id)}')
+    file_path = get_job_file(job_id, filename, split_dir)
+    if file_path is None:
+        flash('File not found.', 'danger')
+        return redirect(url_for('organize.split'))
+
+    return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
 
 @organize_bp.route('/download_all_split/<job_id>')
 def download_all_split(job_id):
     """Download all split PDF files as a ZIP archive."""
-    # Check if the split directory exists
-    split_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'split_{job_id}')
-    if not os.path.exists(split_dir):
+    split_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'split_{secure_filename(job_id)}')
+    file_paths = list_job_files(job_id, split_dir)
+    if not file_paths:
         flash('Files not found.', 'danger')
         return redirect(url_for('organize.split'))
 
-    # Create a ZIP file in memory
-    memory_file = io.BytesIO()
-    with zipfile.ZipFile(memory_file, 'w') as zf:
-        for filename in os.listdir(split_dir):
-            file_path = os.path.join(split_dir, filename)
-            zf.write(file_path, filename)
-
-    # Seek to the beginning of the file
-    memory_file.seek(0)
-
-    # Return the ZIP file
-    return send_file(
-        memory_file,
-        mimetype='application/zip',
-        as_attachment=True,
-        download_name=f'split_pdfs_{job_id}.zip'
-    )
+    return zip_response(file_paths, f'split_pdfs_{job_id}.zip')
 
 @organize_bp.route('/extract', methods=['GET', 'POST'])
 def extract():
@@ -1221,20 +1640,32 @@ def extract():
     result = None
     output_filename = None
     formatted_pages = ""
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('extracted_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Extract the pages
-            pages = form.pages.data
-            result = extract_pages(input_path, output_path, pages)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('extracted_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Extract the pages
+                pages = form.pages.data
+                tool_job_id = submit_job('extract_pages', {'input_path': input_path, 'output_path': output_path, 'pages': pages},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             # Format the extracted pages for display
             formatted_pages = format_page_list(result['extracted_pages'])
@@ -1263,24 +1694,37 @@ def rotate():
     output_filename = None
     rotation_description = ""
     formatted_pages = ""
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('rotated_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Rotate the pages
-            rotation = int(form.rotation.data)
-            pages = form.pages.data
-            result = rotate_pages(input_path, output_path, rotation, pages)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('rotated_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Rotate the pages
+                rotation = int(form.rotation.data)
+                pages = form.pages.data
+                tool_job_id = submit_job('rotate_pages', {'input_path': input_path, 'output_path': output_path,
+                                          'rotation': rotation, 'pages': pages},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             # Get rotation description
-            rotation_description = get_rotation_description(rotation)
+            rotation_description = get_rotation_description(job['kwargs']['rotation'])
 
             # Format the rotated pages for display
             formatted_pages = format_page_list(result['rotated_pages'])
@@ -1314,32 +1758,41 @@ def pdf_to_image():
     form = PDFToImageForm()
     result = None
     job_id = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate a unique job ID for this conversion
-            job_id = uuid.uuid4().hex
-
-            # Create a directory for the output images
-            output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{job_id}')
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Get conversion parameters
-            image_format = form.format.data
-            dpi = form.dpi.data
-            pages = form.pages.data
-
-            # Convert the PDF to images
-            result = convert_pdf_to_images(input_path, output_dir, image_format, dpi, pages)
-
-            # Create a ZIP file of all images
-            zip_filename = f"images_{job_id}.zip"
-            zip_path = os.path.join(current_app.config['UPLOAD_FOLDER'], zip_filename)
-            create_images_zip(result['output_files'], zip_path)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate a unique job ID for this conversion
+                job_id = uuid.uuid4().hex
+
+                # Create a directory for the output images
+                output_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{job_id}')
+                os.makedirs(output_dir, exist_ok=True)
+
+                # Get conversion parameters
+                image_format = form.format.data
+                dpi = form.dpi.data
+                pages = form.pages.data
+
+                # Convert the PDF to images
+                tool_job_id = submit_job('convert_pdf_to_images', {
+                    'input_path': input_path, 'output_dir': output_dir, 'image_format': image_format,
+                    'dpi': dpi, 'pages': pages
+                }, meta={'artefact_id': job_id})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            job_id = job['meta']['artefact_id']
 
             flash('PDF converted to images successfully!', 'success')
 
@@ -1355,20 +1808,30 @@ def pdf_to_image():
 @convert_from_pdf_bp.route('/get_image/<job_id>/<filename>')
 def get_image(job_id, filename):
     """Get an image for display in the browser."""
-    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{job_id}')
-    return send_from_directory(directory, filename)
+    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{secure_filename(job_id)}')
+    file_path = get_job_file(job_id, filename, directory)
+    if file_path is None:
+        abort(404)
+    return send_file(file_path)
 
 @convert_from_pdf_bp.route('/download_image/<job_id>/<filename>')
 def download_image(job_id, filename):
     """Download a single image."""
-    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{job_id}')
-    return send_from_directory(directory, filename, as_attachment=True)
+    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{secure_filename(job_id)}')
+    file_path = get_job_file(job_id, filename, directory)
+    if file_path is None:
+        abort(404)
+    return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
 
 @convert_from_pdf_bp.route('/download_images_zip/<job_id>')
 def download_images_zip(job_id):
     """Download all images as a ZIP archive."""
-    zip_filename = f"images_{job_id}.zip"
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], zip_filename, as_attachment=True)
+    directory = os.path.join(current_app.config['UPLOAD_FOLDER'], f'pdf_to_image_{secure_filename(job_id)}')
+    file_paths = list_job_files(job_id, directory)
+    if not file_paths:
+        abort(404)
+
+    return zip_response(file_paths, f'images_{job_id}.zip')
 
 @convert_from_pdf_bp.route('/pdf-to-panoramic', methods=['GET', 'POST'])
 def pdf_to_panoramic():
@@ -1376,29 +1839,41 @@ def pdf_to_panoramic():
     form = PDFToPanoramicForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Get form data
-            image_format = form.format.data
-            dpi = form.dpi.data
-            direction = form.direction.data
-            spacing = form.spacing.data
-            pages = form.pages.data
-
-            # Generate output filename with appropriate extension
-            base_filename = os.path.splitext(secure_filename(input_file.filename))[0]
-            output_filename = get_unique_filename(f'panoramic_{base_filename}.{image_format}')
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Create panoramic image
-            result = create_panoramic_image(
-                input_path, output_path, image_format, dpi, direction, pages, spacing
-            )
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Get form data
+                image_format = form.format.data
+                dpi = form.dpi.data
+                direction = form.direction.data
+                spacing = form.spacing.data
+                pages = form.pages.data
+
+                # Generate output filename with appropriate extension
+                base_filename = os.path.splitext(secure_filename(input_file.filename))[0]
+                output_filename = get_unique_filename(f'panoramic_{base_filename}.{image_format}')
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Create panoramic image
+                tool_job_id = submit_job('create_panoramic_image', {
+                    'input_path': input_path, 'output_path': output_path, 'image_format': image_format,
+                    'dpi': dpi, 'direction': direction, 'pages': pages, 'spacing': spacing
+                }, meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('Panoramic image created successfully!', 'success')
 
@@ -1428,25 +1903,37 @@ def pdf_to_pdfa():
     result = None
     output_filename = None
     conformance_description = ""
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('pdfa_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get conformance level
-            conformance = form.conformance.data
-
-            # Convert to PDF/A
-            result = convert_to_pdfa(input_path, output_path, conformance)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('pdfa_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get conformance level
+                conformance = form.conformance.data
+
+                # Convert to PDF/A
+                tool_job_id = submit_job('convert_to_pdfa', {'input_path': input_path, 'output_path': output_path, 'conformance': conformance},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             # Get human-readable conformance description
-            conformance_description = get_conformance_description(conformance)
+            conformance_description = get_conformance_description(job['kwargs']['conformance'])
 
             flash('PDF converted to PDF/A successfully!', 'success')
 
@@ -1472,26 +1959,39 @@ def pdf_to_text():
     result = None
     output_filename = None
     text_preview = ""
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('text_' + os.path.splitext(secure_filename(input_file.filename))[0] + '.txt')
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get extraction parameters
-            pages = form.pages.data
-            include_page_numbers = form.include_page_numbers.data
-
-            # Extract text from the PDF
-            result = extract_text_from_pdf(input_path, output_path, pages, include_page_numbers)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('text_' + os.path.splitext(secure_filename(input_file.filename))[0] + '.txt')
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get extraction parameters
+                pages = form.pages.data
+                include_page_numbers = form.include_page_numbers.data
+
+                # Extract text from the PDF
+                tool_job_id = submit_job('extract_text_from_pdf', {'input_path': input_path, 'output_path': output_path,
+                                          'pages': pages, 'include_page_numbers': include_page_numbers},
+                                         meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             # Get a preview of the extracted text
-            with open(output_path, 'r', encoding='utf-8') as f:
+            with open(job['kwargs']['output_path'], 'r', encoding='utf-8') as f:
                 text = f.read()
                 # Limit preview to first 1000 characters
                 text_preview = text[:1000]
@@ -1527,27 +2027,39 @@ def unlock():
     form = UnlockForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Check if the PDF is encrypted
-            if not is_pdf_encrypted(input_path):
-                flash('The PDF is not encrypted and does not need to be unlocked.', 'warning')
-                return render_template('security/unlock.html', form=form)
-
-            # Generate output filename
-            output_filename = get_unique_filename('unlocked_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get the password
-            password = form.password.data
-
-            # Unlock the PDF
-            result = unlock_pdf(input_path, output_path, password)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Check if the PDF is encrypted
+                if not is_pdf_encrypted(input_path):
+                    flash('The PDF is not encrypted and does not need to be unlocked.', 'warning')
+                    return render_template('security/unlock.html', form=form)
+
+                # Generate output filename
+                output_filename = get_unique_filename('unlocked_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get the password
+                password = form.password.data
+
+                # Unlock the PDF
+                tool_job_id = submit_job('unlock_pdf', {'input_path': input_path, 'output_path': output_path},
+                                         meta={'output_filename': output_filename}, secret_kwargs={'password': password})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('PDF unlocked successfully!', 'success')
 
@@ -1571,46 +2083,59 @@ def protect():
     form = ProtectForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Validate passwords
-            user_password = form.user_password.data
-            owner_password = form.owner_password.data
-            confirm_password = form.confirm_password.data
-
-            if not user_password and not owner_password:
-                flash('Please provide at least one password (user or owner).', 'danger')
-                return render_template('security/protect.html', form=form)
-
-            if user_password and user_password != confirm_password:
-                flash('Passwords do not match.', 'danger')
-                return render_template('security/protect.html', form=form)
-
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('protected_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get permission settings
-            allow_print = form.allow_print.data
-            allow_modify = form.allow_modify.data
-            allow_copy = form.allow_copy.data
-            allow_annotate = form.allow_annotate.data
-            allow_forms = form.allow_forms.data
-            allow_accessibility = form.allow_accessibility.data
-            allow_assemble = form.allow_assemble.data
-            allow_print_hq = form.allow_print_hq.data
-
-            # Protect the PDF
-            result = protect_pdf(
-                input_path, output_path, user_password, owner_password,
-                allow_print, allow_modify, allow_copy, allow_annotate,
-                allow_forms, allow_accessibility, allow_assemble, allow_print_hq
-            )
+            if tool_job_id is None:
+                # Validate passwords
+                user_password = form.user_password.data
+                owner_password = form.owner_password.data
+                confirm_password = form.confirm_password.data
+
+                if not user_password and not owner_password:
+                    flash('Please provide at least one password (user or owner).', 'danger')
+                    return render_template('security/protect.html', form=form)
+
+                if user_password and user_password != confirm_password:
+                    flash('Passwords do not match.', 'danger')
+                    return render_template('security/protect.html', form=form)
+
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('protected_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get permission settings
+                allow_print = form.allow_print.data
+                allow_modify = form.allow_modify.data
+                allow_copy = form.allow_copy.data
+                allow_annotate = form.allow_annotate.data
+                allow_forms = form.allow_forms.data
+                allow_accessibility = form.allow_accessibility.data
+                allow_assemble = form.allow_assemble.data
+                allow_print_hq = form.allow_print_hq.data
+
+                # Protect the PDF
+                tool_job_id = submit_job('protect_pdf', {
+                    'input_path': input_path, 'output_path': output_path,
+                    'allow_print': allow_print, 'allow_modify': allow_modify,
+                    'allow_copy': allow_copy, 'allow_annotate': allow_annotate,
+                    'allow_forms': allow_forms, 'allow_accessibility': allow_accessibility,
+                    'allow_assemble': allow_assemble, 'allow_print_hq': allow_print_hq
+                }, meta={'output_filename': output_filename}, secret_kwargs={'user_password': user_password, 'owner_password': owner_password})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('PDF protected successfully!', 'success')
 
@@ -1634,52 +2159,73 @@ def redact():
     form = RedactForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Generate output filename
-            output_filename = get_unique_filename('redacted_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get form data
-            redaction_type = form.redaction_type.data
-            case_sensitive = form.case_sensitive.data
-            whole_words = form.whole_words.data
-
-            # Process based on redaction type
-            if redaction_type == 'text':
-                # Text search redaction
-                search_text = form.search_text.data
-                if not search_text:
-                    flash('Please enter text to redact.', 'danger')
-                    return render_template('security/redact.html', form=form)
-
-                result = redact_pdf(input_path, output_path, search_text, case_sensitive, whole_words)
-
-            elif redaction_type == 'pattern':
-                # Pattern redaction
-                pattern = form.pattern.data
-                if not pattern:
-                    flash('Please enter a regular expression pattern.', 'danger')
-                    return render_template('security/redact.html', form=form)
-
-                result = redact_pattern(input_path, output_path, pattern, case_sensitive)
-
-            elif redaction_type == 'common_pattern':
-                # Common pattern redaction
-                pattern_name = form.common_pattern.data
-                patterns = get_common_patterns()
-
-                if pattern_name not in patterns:
-                    flash('Invalid pattern selected.', 'danger')
-                    return render_template('security/redact.html', form=form)
-
-                pattern = patterns[pattern_name]
-                result = redact_pattern(input_path, output_path, pattern, case_sensitive)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Generate output filename
+                output_filename = get_unique_filename('redacted_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get form data
+                redaction_type = form.redaction_type.data
+                case_sensitive = form.case_sensitive.data
+                whole_words = form.whole_words.data
+
+                # Process based on redaction type
+                if redaction_type == 'text':
+                    # Text search redaction
+                    search_text = form.search_text.data
+                    if not search_text:
+                        flash('Please enter text to redact.', 'danger')
+                        return render_template('security/redact.html', form=form)
+
+                    tool_job_id = submit_job('redact_pdf', {
+                        'input_path': input_path, 'output_path': output_path, 'search_text': search_text,
+                        'case_sensitive': case_sensitive, 'whole_words': whole_words
+                    }, meta={'output_filename': output_filename})
+
+                elif redaction_type == 'pattern':
+                    # Pattern redaction
+                    pattern = form.pattern.data
+                    if not pattern:
+                        flash('Please enter a regular expression pattern.', 'danger')
+                        return render_template('security/redact.html', form=form)
+
+                    tool_job_id = submit_job('redact_pattern', {
+                        'input_path': input_path, 'output_path': output_path,
+                        'pattern': pattern, 'case_sensitive': case_sensitive
+                    }, meta={'output_filename': output_filename})
+
+                elif redaction_type == 'common_pattern':
+                    # Common pattern redaction
+                    pattern_name = form.common_pattern.data
+                    patterns = get_common_patterns()
+
+                    if pattern_name not in patterns:
+                        flash('Invalid pattern selected.', 'danger')
+                        return render_template('security/redact.html', form=form)
+
+                    pattern = patterns[pattern_name]
+                    tool_job_id = submit_job('redact_pattern', {
+                        'input_path': input_path, 'output_path': output_path,
+                        'pattern': pattern, 'case_sensitive': case_sensitive
+                    }, meta={'output_filename': output_filename})
+
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             if result['redacted_count'] == 0:
                 flash('No matching text found to redact.', 'warning')
@@ -1706,30 +2252,44 @@ def flatten():
     form = FlattenForm()
     result = None
     output_filename = None
+    tool_job_id = get_requested_job_id()
 
-    if form.validate_on_submit():
+    if form.validate_on_submit() or tool_job_id:
         try:
-            # Save the uploaded file
-            input_file = form.file.data
-            input_path = save_uploaded_file(input_file)
-
-            # Check if the PDF has form fields or annotations
-            pdf_info = has_form_fields_or_annotations(input_path)
-
-            if not pdf_info['has_form_fields'] and not pdf_info['has_annotations']:
-                flash('The PDF does not have any form fields or annotations to flatten.', 'warning')
-                return render_template('security/flatten.html', form=form)
-
-            # Generate output filename
-            output_filename = get_unique_filename('flattened_' + secure_filename(input_file.filename))
-            output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
-
-            # Get flattening options
-            flatten_form_fields = form.flatten_form_fields.data
-            flatten_annotations = form.flatten_annotations.data
-
-            # Flatten the PDF
-            result = flatten_pdf(input_path, output_path, flatten_annotations, flatten_form_fields)
+            if tool_job_id is None:
+                # Save the uploaded file
+                input_file = form.file.data
+                input_path = save_uploaded_file(input_file)
+
+                # Check if the PDF has form fields or annotations
+                pdf_info = has_form_fields_or_annotations(input_path)
+
+                if not pdf_info['has_form_fields'] and not pdf_info['has_annotations']:
+                    flash('The PDF does not have any form fields or annotations to flatten.', 'warning')
+                    return render_template('security/flatten.html', form=form)
+
+                # Generate output filename
+                output_filename = get_unique_filename('flattened_' + secure_filename(input_file.filename))
+                output_path = os.path.join(current_app.config['UPLOAD_FOLDER'], output_filename)
+
+                # Get flattening options
+                flatten_form_fields = form.flatten_form_fields.data
+                flatten_annotations = form.flatten_annotations.data
+
+                # Flatten the PDF
+                tool_job_id = submit_job('flatten_pdf', {
+                    'input_path': input_path, 'output_path': output_path,
+                    'flatten_annotations': flatten_annotations, 'flatten_form_fields': flatten_form_fields
+                }, meta={'output_filename': output_filename})
+                response = job_started_response(tool_job_id)
+                if response is not None:
+                    return response
+
+            job = get_finished_job(tool_job_id)
+            if job is None:
+                return job_pending_response(tool_job_id)
+            result = job['result']
+            output_filename = job['meta']['output_filename']
 
             flash('PDF flattened successfully!', 'success')
 
@@ -6,9 +6,11 @@ This package contains all the route blueprints for the application.
 # Import the original routes.py file to make its blueprints available
 from app.routes.main import main_bp
 from app.routes.security_api import security_api_bp
+from app.routes.jobs_api import jobs_api_bp
 
 # Export blueprints
 __all__ = [
     'main_bp',
-    'security_api_bp'
+    'security_api_bp',
+    'jobs_api_bp'
 ]
@@ -0,0 +1,100 @@
+"""
+Jobs API routes.
+This module provides API routes for checking on background tool jobs.
+"""
+
+import logging
+from flask import Blueprint, jsonify, current_app, send_from_directory, url_for
+from app.jobs import job_to_dict, result_to_dict, get_visible_job, STATUS_FINISHED, STATUS_FAILED
+from app.security.auth import api_token_required
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+jobs_api_bp = Blueprint('jobs_api', __name__, url_prefix='/api/jobs')
+
+
+@jobs_api_bp.route('/cache/stats', methods=['GET'])
+@api_token_required
+def cache_stats():
+    """
+    Get the result cache hit/miss counters for monitoring.
+
+    Returns:
+        JSON response with the cache statistics.
+    """
+    cache = getattr(current_app, 'result_cache', None)
+    if cache is None:
+        return jsonify({'enabled': False})
+
+    stats = cache.stats()
+    stats['enabled'] = True
+    return jsonify(stats)
+
+
+@jobs_api_bp.route('/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Get the status of a job.
+
+    Args:
+        job_id: The job ID.
+
+    Returns:
+        JSON response with the job status.
+    """
+    job = get_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    data = job_to_dict(job)
+    data['result_url'] = url_for('jobs_api.job_result', job_id=job_id)
+    return jsonify(data)
+
+
+@jobs_api_bp.route('/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Get the result of a finished job.
+
+    Args:
+        job_id: The job ID.
+
+    Returns:
+        JSON response with the tool result, with file names in place of
+        server paths, or the job status if the job has not finished yet.
+    """
+    job = get_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if job['status'] == STATUS_FAILED:
+        return jsonify({'status': job['status'], 'error': job['error']}), 422
+
+    if job['status'] != STATUS_FINISHED:
+        return jsonify({'status': job['status']}), 202
+
+    data = {'status': job['status'], 'result': result_to_dict(job['result'])}
+    if job['meta'].get('output_filename'):
+        data['download_url'] = url_for('jobs_api.job_download', job_id=job_id)
+    return jsonify(data)
+
+
+@jobs_api_bp.route('/<job_id>/download', methods=['GET'])
+def job_download(job_id):
+    """
+    Download the output file of a finished job.
+
+    Args:
+        job_id: The job ID.
+
+    Returns:
+        The output file.
+    """
+    job = get_visible_job(job_id)
+    if job is None or job['status'] != STATUS_FINISHED or not job['meta'].get('output_filename'):
+        return jsonify({'error': 'File not found'}), 404
+
+    return send_from_directory(current_app.config['UPLOAD_FOLDER'], job['meta']['output_filename'],
+                               as_attachment=True)
@@ -10,6 +10,7 @@ from .middleware import SecurityMiddleware
 from .data_protection import initialize_secure_storage
 from .auth import generate_csrf_token
 from .monitoring import SecurityMonitor
+from .process_pool import init_process_pool
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +37,9 @@ def init_app(app):
     # Initialize secure storage
     initialize_secure_storage(app)
 
+    # Initialize the process pool for sandboxed tool runs
+    init_process_pool(app)
+
     # Initialize security monitoring
     SecurityMonitor(app)
 
@@ -8,8 +8,9 @@ import magic
 import hashlib
 import logging
 from werkzeug.utils import secure_filename
-from flask import current_app
+from flask import current_app, g
 import fitz  # PyMuPDF
+from app.errors import PDFProcessingError
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -17,6 +18,12 @@ logger = logging.getLogger(__name__)
 # Maximum file size (50MB)
 MAX_FILE_SIZE = 50 * 1024 * 1024
 
+# Size of the chunks copied when ingesting an upload
+INGEST_CHUNK_SIZE = 64 * 1024
+
+# Number of leading bytes used to sniff the MIME type
+SNIFF_BYTES = 2048
+
 # Allowed file types and their corresponding MIME types
 ALLOWED_MIME_TYPES = {
     'application/pdf': '.pdf',
@@ -30,6 +37,12 @@ ALLOWED_MIME_TYPES = {
     'text/html': '.html',
 }
 
+# MIME types accepted for uploads the tools read as PDFs
+PDF_MIME_TYPES = ('application/pdf',)
+
+# MIME types accepted for uploads the tools read as images
+IMAGE_MIME_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/bmp', 'image/x-ms-bmp', 'image/tiff')
+
 def is_valid_file_size(file_stream):
     """
     Check if the file size is within the allowed limit.
@@ -182,3 +195,99 @@ def validate_and_secure_file(file_stream, original_filename):
     secure_name = generate_secure_filename(original_filename)
     
     return True, secure_name, None
+
+def ingest_upload(file_storage, dest_path, max_size=None, store=None, allowed_types=None):
+    """
+    Copy an upload to disk in a single pass.
+
+    The upload stream is read once, in chunks; the SHA-256, byte count and
+    MIME type are worked out from the same chunks as they are written, and
+    the copy stops as soon as the upload goes over max_size. Uploads whose
+    MIME type isn't one of allowed_types are removed again.
+
+    With a blob store, the content is kept in the store and dest_path is
+    created as a handle to it, so identical uploads share one copy on disk.
+
+    Args:
+        file_storage: The uploaded file (werkzeug FileStorage).
+        dest_path: Path to write the file to.
+        max_size: Maximum allowed size in bytes, or None for no limit.
+        store (BlobStore, optional): Blob store to keep the content in.
+        allowed_types (tuple, optional): MIME types the content may have, or
+            None to accept any type.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'path': Path of the saved file.
+            - 'size': Size in bytes.
+            - 'sha256': Hex SHA-256 of the content.
+            - 'mime_type': MIME type sniffed from the content.
+            - 'deduplicated': True if the content was already stored.
+
+    Raises:
+        PDFProcessingError: If the upload is larger than max_size or its
+            content isn't of an allowed type.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    write_path = store.temp_path() if store else dest_path
+
+    try:
+        with open(write_path, 'wb') as out:
+            while True:
+                chunk = file_storage.stream.read(INGEST_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if max_size is not None and size > max_size:
+                    limit_mb = max_size / (1024 * 1024)
+                    raise PDFProcessingError(f"File size exceeds your limit of {limit_mb:.1f} MB.", 413)
+
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        # Don't leave partial uploads behind
+        if os.path.exists(write_path):
+            os.remove(write_path)
+        raise
+
+    mime_type = magic.from_buffer(head, mime=True) if head else 'application/x-empty'
+    if allowed_types is not None and mime_type not in allowed_types:
+        os.remove(write_path)
+        logger.warning(f"Rejected upload with MIME type {mime_type}")
+        raise PDFProcessingError(f"Unsupported file type: {mime_type}.", 415)
+
+    deduplicated = False
+    if store:
+        deduplicated = store.store(write_path, digest.hexdigest())
+        store.link(digest.hexdigest(), dest_path)
+
+    info = {
+        'path': dest_path,
+        'size': size,
+        'sha256': digest.hexdigest(),
+        'mime_type': mime_type,
+        'deduplicated': deduplicated
+    }
+
+    # Remember the upload for the rest of the request, e.g. for the result cache
+    g.setdefault('ingested_uploads', {})[dest_path] = info
+
+    return info
+
+def get_ingested_upload(path):
+    """
+    Get what was recorded about a file ingested during the current request.
+
+    Args:
+        path: Path the upload was saved to.
+
+    Returns:
+        dict: The ingest_upload() result, or None if the file wasn't
+        ingested during this request.
+    """
+    return g.get('ingested_uploads', {}).get(path)
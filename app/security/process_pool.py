@@ -0,0 +1,403 @@
+"""
+Process pool module.
+This module provides a pool of reusable worker processes for running PDF
+tools in isolation from the web worker.
+
+Each task runs in a child process with its own resource limits, so a
+malicious or oversized PDF can exhaust only that child. Tasks that overrun
+their timeout are killed outright, and children are recycled after a fixed
+number of tasks to cap memory fragmentation. Children are started the first
+time a task needs them, so processes that never run tools never start any.
+
+Resource limits need the Unix-only resource module. Where it is missing the
+limits are skipped and only the timeout applies.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where tasks only get a timeout
+    resource = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default number of tasks a child runs before it is replaced
+DEFAULT_MAX_TASKS_PER_CHILD = 50
+
+# Default limits for tasks that don't name a tool
+DEFAULT_TASK_LIMITS = {
+    'CPU_TIME': 120,  # 2 minutes of CPU time
+    'MEMORY': 1024 * 1024 * 1024,  # 1GB of memory
+    'FILES': 256,  # Maximum number of open files
+    'TIMEOUT': 300,  # 5 minutes of wall-clock time
+}
+
+# Per-tool limits, merged over DEFAULT_TASK_LIMITS
+DEFAULT_TOOL_LIMITS = {
+    'perform_ocr': {'CPU_TIME': 900, 'MEMORY': 2048 * 1024 * 1024, 'TIMEOUT': 1200},
+    'compress_pdf': {'CPU_TIME': 300, 'TIMEOUT': 600},
+    'repair_pdf': {'CPU_TIME': 300, 'TIMEOUT': 600},
+    'convert_pdf_to_images': {'MEMORY': 2048 * 1024 * 1024, 'TIMEOUT': 600},
+    'create_panoramic_image': {'MEMORY': 2048 * 1024 * 1024, 'TIMEOUT': 600},
+    'merge_pdfs': {'TIMEOUT': 600},
+}
+
+
+# Pipe to the parent while this process is a pool child
+_parent_conn = None
+
+
+class SandboxError(Exception):
+    """Exception raised when a sandboxed task dies or cannot report its error."""
+    pass
+
+
+class SandboxTimeoutError(SandboxError):
+    """Exception raised when a sandboxed task is killed for running too long."""
+    pass
+
+
+def _apply_task_limits(limits):
+    """
+    Apply resource limits for the next task in a child process.
+
+    Only soft limits are changed, so a later task may be given a higher limit.
+    The CPU limit is relative to the CPU time the child has used so far.
+
+    Args:
+        limits: Dictionary of resource limits to set.
+    """
+    if resource is None:
+        return
+
+    def set_soft(res, value):
+        _, hard = resource.getrlimit(res)
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        resource.setrlimit(res, (value, hard))
+
+    if 'CPU_TIME' in limits:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        set_soft(resource.RLIMIT_CPU, used + limits['CPU_TIME'])
+
+    if 'MEMORY' in limits:
+        set_soft(resource.RLIMIT_AS, limits['MEMORY'])
+
+    if 'FILES' in limits:
+        set_soft(resource.RLIMIT_NOFILE, limits['FILES'])
+
+
+def _child_main(conn):
+    """
+    Main loop of a pool child process.
+
+    Args:
+        conn: The child end of the pipe to the parent.
+    """
+    global _parent_conn
+    _parent_conn = conn
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+
+        if task is None:
+            break
+
+        func, args, kwargs, limits = task
+
+        try:
+            _apply_task_limits(limits)
+            reply = ('ok', func(*args, **kwargs))
+        except MemoryError:
+            reply = ('error', SandboxError("Task exceeded its memory limit"))
+        except Exception as e:
+            reply = ('error', e)
+
+        try:
+            conn.send(reply)
+        except Exception as e:
+            conn.send(('error', SandboxError(f"{type(reply[1]).__name__}: {str(reply[1]) or str(e)}")))
+
+
+def report_progress(progress):
+    """
+    Report the progress of the running task to the process waiting for it.
+
+    Tools can call this freely: outside a pool child it does nothing.
+
+    Args:
+        progress: JSON-serializable description of the progress so far.
+    """
+    if _parent_conn is None:
+        return
+
+    try:
+        _parent_conn.send(('progress', progress))
+    except Exception as e:
+        logger.warning(f"Could not report task progress: {str(e)}")
+
+
+class _Child:
+    """A single pool child process and its pipe."""
+
+    def __init__(self, context):
+        parent_conn, child_conn = context.Pipe()
+        self.conn = parent_conn
+        self.process = context.Process(target=_child_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+
+    def kill(self):
+        """Kill the child immediately."""
+        try:
+            self.process.kill()
+            self.process.join(5)
+        finally:
+            self.conn.close()
+
+    def shutdown(self):
+        """Ask the child to exit once it is idle."""
+        try:
+            self.conn.send(None)
+            self.process.join(5)
+        except (OSError, EOFError):
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class ProcessPool:
+    """Class for running functions in reusable, resource-limited child processes."""
+
+    def __init__(self, size=None, max_tasks_per_child=DEFAULT_MAX_TASKS_PER_CHILD,
+                 default_limits=None, tool_limits=None):
+        """
+        Initialize the process pool. Children are started as tasks need
+        them, up to size at once.
+
+        Args:
+            size: Number of child processes. Defaults to the number of CPUs.
+            max_tasks_per_child: Number of tasks a child runs before it is replaced.
+            default_limits: Limits for tasks that don't name a tool.
+            tool_limits: Dictionary mapping tool names to their limits.
+        """
+        self.size = size or os.cpu_count() or 1
+        self.max_tasks_per_child = max_tasks_per_child
+        self.default_limits = dict(DEFAULT_TASK_LIMITS)
+        self.default_limits.update(default_limits or {})
+        self.tool_limits = tool_limits if tool_limits is not None else DEFAULT_TOOL_LIMITS
+
+        # Spawn rather than fork: the web worker has threads of its own
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._closed = False
+        self._started = 0
+        self._start_lock = threading.Lock()
+
+        logger.info(f"Process pool ready for up to {self.size} children")
+
+    def _acquire_child(self):
+        """
+        Get an idle child, starting a new one if the pool isn't full yet.
+
+        The idle queue holds None for a slot whose child could not be
+        replaced; a child is started for it here.
+
+        Returns:
+            _Child: The child, which the caller must give back.
+        """
+        try:
+            child = self._idle.get_nowait()
+        except queue.Empty:
+            with self._start_lock:
+                start = self._started < self.size
+                if start:
+                    self._started += 1
+
+            if not start:
+                child = self._idle.get()
+            else:
+                try:
+                    return _Child(self._context)
+                except Exception:
+                    with self._start_lock:
+                        self._started -= 1
+                    raise
+
+        if child is not None:
+            return child
+
+        try:
+            return _Child(self._context)
+        except Exception:
+            self._idle.put(None)
+            raise
+
+    def limits_for(self, tool=None):
+        """
+        Get the resource limits for a tool.
+
+        Args:
+            tool: The tool name, or None for the default limits.
+
+        Returns:
+            dict: The resource limits, including 'TIMEOUT'.
+        """
+        limits = dict(self.default_limits)
+        limits.update(self.tool_limits.get(tool, {}))
+        return limits
+
+    def run(self, func, args=(), kwargs=None, tool=None, limits=None, on_progress=None):
+        """
+        Run a function in a child process and return its result.
+
+        Args:
+            func: A picklable, module-level function.
+            args: Positional arguments for the function.
+            kwargs: Keyword arguments for the function.
+            tool: Tool name used to look up resource limits.
+            limits: Explicit resource limits, overriding the tool limits.
+            on_progress: Optional function called with each progress report
+                of the task.
+
+        Returns:
+            The return value of the function.
+
+        Raises:
+            SandboxTimeoutError: If the task ran past its timeout.
+            SandboxError: If the child died, e.g. on hitting its CPU limit.
+            Exception: Whatever the function raised.
+        """
+        if self._closed:
+            raise SandboxError("Process pool is closed")
+
+        task_limits = self.limits_for(tool)
+        task_limits.update(limits or {})
+        timeout = task_limits.pop('TIMEOUT', None)
+
+        child = self._acquire_child()
+        replace = False
+
+        try:
+            try:
+                child.conn.send((func, tuple(args), kwargs or {}, task_limits))
+            except (OSError, EOFError):
+                replace = True
+                raise SandboxError("Worker process is not available")
+
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            while True:
+                remaining = max(0, deadline - time.monotonic()) if deadline is not None else None
+                if not child.conn.poll(remaining):
+                    replace = True
+                    name = getattr(func, '__name__', 'task')
+                    logger.error(f"Task {name} timed out after {timeout} seconds, killing child {child.process.pid}")
+                    raise SandboxTimeoutError(f"Operation timed out after {timeout} seconds")
+
+                try:
+                    status, value = child.conn.recv()
+                except (EOFError, OSError):
+                    replace = True
+                    raise SandboxError("Worker process died while processing the file (resource limit exceeded)")
+
+                if status != 'progress':
+                    break
+                if on_progress is not None:
+                    try:
+                        on_progress(value)
+                    except Exception as e:
+                        logger.warning(f"Error handling task progress: {str(e)}")
+
+            child.tasks_done += 1
+            if child.tasks_done >= self.max_tasks_per_child:
+                replace = True
+
+            if status == 'error':
+                if isinstance(value, SandboxError):
+                    replace = True
+                raise value
+
+            return value
+
+        finally:
+            if replace:
+                child.kill()
+                try:
+                    child = _Child(self._context)
+                except Exception as e:
+                    # Keep the slot as an empty one that the next task starts
+                    logger.error(f"Could not start a replacement child: {str(e)}")
+                    child = None
+            self._idle.put(child)
+
+    def close(self):
+        """Shut down all idle children."""
+        self._closed = True
+        while True:
+            try:
+                child = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if child is not None:
+                child.shutdown()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """
+    Get the process-wide pool, starting one with default settings if needed.
+
+    Returns:
+        ProcessPool: The process pool.
+    """
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool()
+        return _pool
+
+
+def init_process_pool(app):
+    """
+    Initialize the process pool for the application.
+
+    Args:
+        app: The Flask application.
+
+    Returns:
+        ProcessPool: The process pool.
+    """
+    global _pool
+
+    tool_limits = {tool: dict(limits) for tool, limits in DEFAULT_TOOL_LIMITS.items()}
+    for tool, limits in app.config.get('PROCESS_POOL_TOOL_LIMITS', {}).items():
+        tool_limits.setdefault(tool, {}).update(limits)
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPool(
+                size=app.config.get('PROCESS_POOL_SIZE'),
+                max_tasks_per_child=app.config.get('PROCESS_POOL_MAX_TASKS', DEFAULT_MAX_TASKS_PER_CHILD),
+                tool_limits=tool_limits
+            )
+
+    app.process_pool = _pool
+    return _pool
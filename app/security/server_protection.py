@@ -6,7 +6,6 @@ This module provides functions to protect the server from various attacks.
 import os
 import time
 import logging
-import threading
 import signal
 import resource
 from functools import wraps
@@ -69,6 +68,9 @@ def set_resource_limits(limits=None):
     """
     Set resource limits for the current process.
     
+    This applies to the whole process it is called in. To limit a single
+    task, use run_in_sandbox or the process pool instead.
+    
     Args:
         limits: Dictionary of resource limits to set.
         
@@ -92,49 +94,36 @@ def set_resource_limits(limits=None):
 
 def run_in_sandbox(func, *args, **kwargs):
     """
-    Run a function in a sandboxed environment with resource limits.
+    Run a function in a sandboxed child process with resource limits.
+    
+    The function runs in a worker of the shared process pool, so the limits
+    apply to that child only and never to the web worker itself.
     
     Args:
-        func: The function to run.
+        func: The function to run. Must be a picklable, module-level function.
         *args: Arguments to pass to the function.
         **kwargs: Keyword arguments to pass to the function.
         
     Returns:
         The result of the function.
+        
+    Raises:
+        TimeoutError: If the function runs longer than DEFAULT_TIMEOUT. The
+            child running it is killed.
     """
-    # Create a new process to run the function
-    result = [None]
-    error = [None]
-    
-    def target():
-        try:
-            # Set resource limits
-            set_resource_limits()
-            
-            # Run the function
-            result[0] = func(*args, **kwargs)
-        except Exception as e:
-            error[0] = e
-    
-    # Start the process
-    thread = threading.Thread(target=target)
-    thread.daemon = True
-    thread.start()
-    
-    # Wait for the process to finish
-    start_time = time.time()
-    while thread.is_alive():
-        if time.time() - start_time > DEFAULT_TIMEOUT:
-            logger.error(f"Function {func.__name__} timed out after {DEFAULT_TIMEOUT} seconds")
-            return None
-        time.sleep(0.1)
+    from .process_pool import get_process_pool, SandboxTimeoutError
     
-    # Check for errors
-    if error[0] is not None:
-        logger.error(f"Error in sandboxed function: {str(error[0])}")
-        raise error[0]
+    limits = dict(DEFAULT_RESOURCE_LIMITS)
+    limits['TIMEOUT'] = DEFAULT_TIMEOUT
     
-    return result[0]
+    try:
+        return get_process_pool().run(func, args, kwargs, limits=limits)
+    except SandboxTimeoutError:
+        logger.error(f"Function {func.__name__} timed out after {DEFAULT_TIMEOUT} seconds")
+        raise TimeoutError(f"Operation timed out after {DEFAULT_TIMEOUT} seconds")
+    except Exception as e:
+        logger.error(f"Error in sandboxed function: {str(e)}")
+        raise
 
 def rate_limit(max_requests, time_window):
     """
@@ -0,0 +1,148 @@
+/**
+ * Tiled page previews for the editors.
+ * Large pages are sent as a low-resolution image with a data-tile-info-url
+ * attribute. This module lays the tiles of the zoom level that matches the
+ * size the image is shown at over it, so only that much detail is rendered
+ * and loaded. The tiles don't take pointer events; the editors keep working
+ * with the image underneath.
+ */
+
+(function() {
+    'use strict';
+
+    const TiledPreview = {
+        /**
+         * Initialize every tiled preview on the page.
+         */
+        init: function() {
+            document.querySelectorAll('img[data-tile-info-url]').forEach(function(img) {
+                fetch(img.dataset.tileInfoUrl, { credentials: 'same-origin' })
+                    .then(function(response) {
+                        if (!response.ok) {
+                            throw new Error('Tile info request failed: ' + response.status);
+                        }
+                        return response.json();
+                    })
+                    .then(function(info) {
+                        TiledPreview.attach(img, info);
+                    })
+                    .catch(function(error) {
+                        // The low-resolution image stays in place
+                        console.warn(error);
+                    });
+            });
+        },
+
+        /**
+         * Add a tile layer over an image and keep it matched to the image's size.
+         *
+         * @param {HTMLImageElement} img - The preview image.
+         * @param {Object} info - The page's tile info.
+         */
+        attach: function(img, info) {
+            const layer = document.createElement('div');
+            layer.className = 'pdf-tile-layer';
+            layer.style.position = 'absolute';
+            layer.style.overflow = 'hidden';
+            layer.style.pointerEvents = 'none';
+            img.insertAdjacentElement('afterend', layer);
+
+            let timer = null;
+            let level = null;
+            const update = function() {
+                level = TiledPreview.layout(img, layer, info, level);
+            };
+
+            if (img.complete) {
+                update();
+            } else {
+                img.addEventListener('load', update);
+            }
+            window.addEventListener('resize', function() {
+                clearTimeout(timer);
+                timer = setTimeout(update, 150);
+            });
+        },
+
+        /**
+         * Get the lowest zoom level at least as sharp as the image is shown.
+         *
+         * @param {Object} info - The page's tile info.
+         * @param {number} displayWidth - Width the image is shown at in CSS pixels.
+         * @returns {number} The zoom level.
+         */
+        chooseLevel: function(info, displayWidth) {
+            const wanted = displayWidth * (window.devicePixelRatio || 1) / info.width;
+            for (let level = info.min_level; level <= info.max_level; level++) {
+                if (info.levels[level].scale >= wanted) {
+                    return level;
+                }
+            }
+            return info.max_level;
+        },
+
+        /**
+         * Place the layer over the image and fill it with tiles.
+         *
+         * @param {HTMLImageElement} img - The preview image.
+         * @param {HTMLElement} layer - The tile layer.
+         * @param {Object} info - The page's tile info.
+         * @param {number|null} currentLevel - Level the layer shows now.
+         * @returns {number|null} Level the layer shows after the update.
+         */
+        layout: function(img, layer, info, currentLevel) {
+            const width = img.clientWidth;
+            const height = img.clientHeight;
+            if (!width || !height) {
+                return currentLevel;
+            }
+
+            layer.style.left = img.offsetLeft + 'px';
+            layer.style.top = img.offsetTop + 'px';
+            layer.style.width = width + 'px';
+            layer.style.height = height + 'px';
+
+            const level = this.chooseLevel(info, width);
+            const grid = info.levels[level];
+            // Page points covered by one tile, and CSS pixels per point
+            const span = info.tile_size / grid.scale;
+            const pixels = width / info.width;
+
+            if (level !== currentLevel) {
+                layer.innerHTML = '';
+                for (let row = 0; row < grid.rows; row++) {
+                    for (let column = 0; column < grid.columns; column++) {
+                        const tile = document.createElement('img');
+                        tile.alt = '';
+                        tile.loading = 'lazy';
+                        tile.style.position = 'absolute';
+                        tile.dataset.column = column;
+                        tile.dataset.row = row;
+                        tile.src = info.tile_url
+                            .replace('{level}', level)
+                            .replace('{column}', column)
+                            .replace('{row}', row);
+                        layer.appendChild(tile);
+                    }
+                }
+            }
+
+            layer.querySelectorAll('img').forEach(function(tile) {
+                const x = tile.dataset.column * span;
+                const y = tile.dataset.row * span;
+                tile.style.left = (x * pixels) + 'px';
+                tile.style.top = (y * pixels) + 'px';
+                tile.style.width = (Math.min(span, info.width - x) * pixels) + 'px';
+                tile.style.height = (Math.min(span, info.height - y) * pixels) + 'px';
+            });
+
+            return level;
+        }
+    };
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', TiledPreview.init);
+    } else {
+        TiledPreview.init();
+    }
+})();
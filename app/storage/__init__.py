@@ -0,0 +1,156 @@
+"""
+Storage package for the application.
+This package manages the files kept on local disk for uploads and tool outputs.
+"""
+
+import os
+import logging
+from flask import current_app, request, has_app_context
+from werkzeug.utils import secure_filename
+from .blobs import BlobStore
+from .lifecycle import StorageManager, JOB_ARTEFACT_NAMES
+from .previews import PreviewCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def init_app(app):
+    """
+    Initialize storage for the application.
+
+    Args:
+        app: The Flask application.
+    """
+    store = None
+    if app.config.get('BLOB_STORE_ENABLED', True):
+        store = BlobStore(app.config.get('BLOB_STORE_DIR', os.path.join(app.instance_path, 'blobs')))
+        store.collect_garbage()
+
+    manager = StorageManager(
+        app.config['UPLOAD_FOLDER'],
+        app.config.get('STORAGE_INDEX_PATH', os.path.join(app.instance_path, 'storage', 'artefacts.sqlite3')),
+        ttl=app.config.get('STORAGE_TTL', 60 * 60),
+        high_water=app.config.get('STORAGE_HIGH_WATER', 0.9),
+        low_water=app.config.get('STORAGE_LOW_WATER', 0.8),
+        max_bytes=app.config.get('STORAGE_MAX_BYTES'),
+        sweep_interval=app.config.get('STORAGE_SWEEP_INTERVAL', 60),
+        blob_store=store
+    )
+    manager.start()
+
+    @app.after_request
+    def touch_downloaded_artefacts(response):
+        # Keep artefacts that are still being downloaded or previewed from
+        # expiring; revalidated previews count too
+        if request.method == 'GET' and response.status_code in (200, 304) and request.view_args:
+            names = [request.view_args.get('filename')]
+            job_id = request.view_args.get('job_id')
+            if job_id:
+                names.extend(pattern.format(job_id=job_id) for pattern in JOB_ARTEFACT_NAMES)
+            if any(names):
+                try:
+                    manager.touch(names)
+                except Exception as e:
+                    logger.error(f"Error recording artefact access: {str(e)}")
+        return response
+
+    app.blob_store = store
+    app.storage_manager = manager
+    app.preview_cache = PreviewCache(
+        app.config.get('PREVIEW_CACHE_DIR', os.path.join(app.instance_path, 'cache', 'previews')),
+        memory_bytes=app.config.get('PREVIEW_CACHE_MEMORY_BYTES', 64 * 1024 * 1024),
+        max_bytes=app.config.get('PREVIEW_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    )
+
+    logger.info("Storage initialized")
+
+    return app
+
+
+def register_artefact(path, owner=None):
+    """
+    Record a file or directory in the upload folder so it is expired with
+    the rest, if storage management is set up.
+
+    Args:
+        path: Path to the artefact.
+        owner: ID of the user it belongs to, if any.
+    """
+    manager = getattr(current_app, 'storage_manager', None)
+    if manager is None:
+        return
+
+    try:
+        manager.register(path, owner=owner)
+    except Exception as e:
+        logger.error(f"Error registering artefact {path}: {str(e)}")
+
+
+def touch_artefacts(*paths):
+    """
+    Mark files in the upload folder as just used, so they aren't expired
+    while someone is still working on them. Does nothing outside the app or
+    if storage management isn't set up.
+
+    Args:
+        *paths: Paths to the files.
+    """
+    if not has_app_context():
+        return
+
+    manager = getattr(current_app, 'storage_manager', None)
+    if manager is None:
+        return
+
+    try:
+        manager.touch_paths(paths)
+    except Exception as e:
+        logger.error(f"Error recording artefact access: {str(e)}")
+
+
+def get_job_file(job_id, filename, directory):
+    """
+    Find a file written by a multi-output job.
+
+    Files are looked up in the artefact index; files from before the index
+    existed are looked for in the job's output directory.
+
+    Args:
+        job_id: ID the job's files are downloaded under.
+        filename: Name of the file.
+        directory: The job's output directory.
+
+    Returns:
+        str: Path to the file, or None if there is no such file.
+    """
+    manager = getattr(current_app, 'storage_manager', None)
+    if manager is not None:
+        path = manager.get_file(job_id, filename)
+        if path:
+            return path
+
+    path = os.path.join(directory, secure_filename(filename))
+    return path if os.path.isfile(path) else None
+
+
+def list_job_files(job_id, directory):
+    """
+    List the files written by a multi-output job.
+
+    Args:
+        job_id: ID the job's files are downloaded under.
+        directory: The job's output directory.
+
+    Returns:
+        list: Paths to the job's files.
+    """
+    manager = getattr(current_app, 'storage_manager', None)
+    if manager is not None:
+        paths = manager.list_files(job_id)
+        if paths:
+            return paths
+
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
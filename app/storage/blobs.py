@@ -0,0 +1,163 @@
+"""
+Blob store module.
+This module provides a content-addressed store for uploaded files, so that the
+same bytes are kept on disk once however many times they are uploaded.
+
+Each blob is named after its SHA-256. The files tools work with in
+UPLOAD_FOLDER are hard links to a blob, so they are handles rather than
+copies, and the link count of a blob is its reference count: once every
+handle has been deleted the blob can be collected.
+
+Handles share their bytes with every other upload of the same content, so
+they must not be modified in place. Tools always write to a new output path.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import logging
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Time in seconds an unreferenced blob is kept before it can be collected,
+# so a blob is not removed between being stored and being linked
+DEFAULT_GRACE_PERIOD = 10 * 60  # 10 minutes
+
+
+class BlobStore:
+    """Class for storing files once by content and handing out hard links to them."""
+
+    def __init__(self, root, grace_period=DEFAULT_GRACE_PERIOD):
+        """
+        Initialize the blob store.
+
+        Args:
+            root: Directory to keep blobs in. It should be on the same
+                filesystem as UPLOAD_FOLDER, otherwise handles are copies.
+            grace_period: Time in seconds an unreferenced blob is kept.
+        """
+        self.root = root
+        self.grace_period = grace_period
+        self.temp_dir = os.path.join(root, 'tmp')
+
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def blob_path(self, digest):
+        """Get the path of the blob with the given SHA-256."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    def temp_path(self):
+        """Get a new path to write incoming content to before it is stored."""
+        return os.path.join(self.temp_dir, uuid.uuid4().hex)
+
+    def store(self, temp_path, digest):
+        """
+        Move a fully written file into the store.
+
+        If the content is already stored the new file is discarded.
+
+        Args:
+            temp_path: Path of the file, from temp_path().
+            digest: SHA-256 of the file.
+
+        Returns:
+            bool: True if the content was already stored.
+        """
+        blob_path = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+        try:
+            # Linking never overwrites, so concurrent uploads of the same
+            # content all end up sharing the first blob
+            os.link(temp_path, blob_path)
+            existed = False
+        except FileExistsError:
+            existed = True
+        finally:
+            os.remove(temp_path)
+
+        if existed:
+            # Keep recently reused blobs out of garbage collection
+            os.utime(blob_path)
+
+        return existed
+
+    def link(self, digest, dest_path):
+        """
+        Create a handle to a stored blob.
+
+        Args:
+            digest: SHA-256 of the blob.
+            dest_path: Path to create the handle at.
+
+        Returns:
+            str: dest_path.
+        """
+        blob_path = self.blob_path(digest)
+        try:
+            os.link(blob_path, dest_path)
+        except OSError as e:
+            # Hard links aren't possible across filesystems, or on some
+            # platforms; the handle is then a plain copy
+            logger.warning(f"Could not link blob {digest}, copying instead: {str(e)}")
+            shutil.copyfile(blob_path, dest_path)
+        return dest_path
+
+    def collect_garbage(self):
+        """
+        Remove blobs that no handle refers to any more, and abandoned
+        temporary files.
+
+        Returns:
+            dict: 'blobs' and 'bytes' removed.
+        """
+        cutoff = time.time() - self.grace_period
+        removed = 0
+        freed = 0
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    info = os.stat(path)
+                    in_temp = dirpath == self.temp_dir
+                    # A link count of one means only the store refers to it
+                    if info.st_mtime < cutoff and (in_temp or info.st_nlink <= 1):
+                        os.remove(path)
+                        removed += 1
+                        freed += info.st_size
+                except OSError:
+                    # Removed or relinked by another process
+                    continue
+
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blobs ({freed} bytes)")
+
+        return {'blobs': removed, 'bytes': freed}
+
+    def stats(self):
+        """
+        Get the number and total size of stored blobs.
+
+        Returns:
+            dict: 'blobs', 'bytes' and 'references' (handles pointing at the blobs).
+        """
+        blobs = 0
+        size = 0
+        references = 0
+
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.temp_dir:
+                continue
+            for name in filenames:
+                try:
+                    info = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                blobs += 1
+                size += info.st_size
+                references += info.st_nlink - 1
+
+        return {'blobs': blobs, 'bytes': size, 'references': references}
@@ -0,0 +1,432 @@
+"""
+Storage lifecycle module.
+This module keeps UPLOAD_FOLDER from filling the disk. Every upload and tool
+output kept there (files, and split_<job_id>/ and pdf_to_image_<job_id>/
+directories) is an artefact, recorded in a SQLite index with its owner,
+size, creation time and last access.
+
+A sweeper removes artefacts once they have gone unused for the TTL, and
+removes the least recently used ones whenever the disk goes over its
+high-water mark. Downloads, previews and editor changes mark an artefact as
+used, so a file someone is still working on isn't expired under them.
+Every web worker process starts a sweeper thread, but they share a lock file
+so only one of them sweeps a host at a time; if that process exits another
+one takes over at its next interval.
+
+The index also records the files multi-output jobs write (job_id and
+filename to path), so downloads find a file with one lookup instead of
+searching the output directories.
+"""
+
+import os
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where every process sweeps
+    fcntl = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default time in seconds an artefact is kept
+DEFAULT_TTL = 60 * 60  # 1 hour
+
+# Default fraction of the disk in use above which artefacts are evicted
+DEFAULT_HIGH_WATER = 0.9
+
+# Default fraction of the disk in use that eviction brings usage back down to
+DEFAULT_LOW_WATER = 0.8
+
+# Default time in seconds between sweeps
+DEFAULT_SWEEP_INTERVAL = 60
+
+# Artefacts used more recently than this are never evicted for space,
+# so files belonging to a running job or an open download are left alone
+MIN_EVICTION_AGE = 5 * 60  # 5 minutes
+
+# Names of the artefacts a multi-output job leaves in UPLOAD_FOLDER
+JOB_ARTEFACT_NAMES = ('split_{job_id}', 'pdf_to_image_{job_id}')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artefacts (
+    name TEXT PRIMARY KEY,
+    owner TEXT,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artefacts_created_at ON artefacts (created_at);
+CREATE INDEX IF NOT EXISTS idx_artefacts_last_access ON artefacts (last_access);
+CREATE TABLE IF NOT EXISTS artefact_files (
+    job_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    artefact TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (job_id, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_artefact_files_artefact ON artefact_files (artefact);
+"""
+
+
+def get_path_size(path):
+    """
+    Get the size of a file, or the total size of the files in a directory.
+
+    Args:
+        path: Path to the file or directory.
+
+    Returns:
+        int: The size in bytes.
+    """
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+
+    size = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                size += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                continue
+    return size
+
+
+class StorageManager:
+    """Class for tracking, expiring and evicting artefacts in the upload folder."""
+
+    def __init__(self, upload_dir, db_path, ttl=DEFAULT_TTL, high_water=DEFAULT_HIGH_WATER,
+                 low_water=DEFAULT_LOW_WATER, max_bytes=None, sweep_interval=DEFAULT_SWEEP_INTERVAL,
+                 blob_store=None):
+        """
+        Initialize the storage manager.
+
+        Args:
+            upload_dir: The upload folder.
+            db_path: Path to the SQLite index file.
+            ttl: Time in seconds an unused artefact is kept.
+            high_water: Fraction of the disk in use that triggers eviction.
+            low_water: Fraction of the disk in use that eviction stops at.
+            max_bytes: Maximum total size of the upload folder, or None for
+                no limit beyond the high-water mark. Eviction brings the
+                folder back down to low_water of this.
+            sweep_interval: Time in seconds between sweeps.
+            blob_store (BlobStore, optional): Store whose unreferenced blobs
+                are collected after each sweep.
+        """
+        self.upload_dir = upload_dir
+        self.db_path = db_path
+        self.ttl = ttl
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.blob_store = blob_store
+        self.lock_path = os.path.join(os.path.dirname(db_path), 'sweeper.lock')
+
+        self._lock_file = None
+        self._stopping = threading.Event()
+        self.thread = None
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        """Open a new connection to the index database."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Context manager that opens a connection and always closes it."""
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _name(self, path):
+        """Get the name of the top-level artefact a path belongs to."""
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.upload_dir))
+        return relative.split(os.sep, 1)[0]
+
+    def register(self, path, owner=None):
+        """
+        Record an artefact in the upload folder.
+
+        Outputs may be registered before the tool has written them; their
+        size is filled in by the next sweep.
+
+        Args:
+            path: Path to the artefact, or to a file inside it.
+            owner: ID of the user the artefact belongs to, if any.
+        """
+        name = self._name(path)
+        if name.startswith('..'):
+            return
+
+        full_path = os.path.join(self.upload_dir, name)
+        size = get_path_size(full_path) if os.path.exists(full_path) else 0
+        now = time.time()
+
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO artefacts (name, owner, size, created_at, last_access) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = COALESCE(excluded.owner, owner), "
+                "size = excluded.size, last_access = excluded.last_access",
+                (name, owner, size, now, now)
+            )
+
+    def touch(self, names):
+        """
+        Mark artefacts as just used.
+
+        Args:
+            names: Names of artefacts in the upload folder. Unknown names
+                are ignored.
+        """
+        names = [name for name in names if name]
+        if not names:
+            return
+
+        placeholders = ', '.join('?' * len(names))
+        with self._connection() as conn:
+            conn.execute(f"UPDATE artefacts SET last_access = ? WHERE name IN ({placeholders})",
+                         [time.time()] + names)
+
+    def touch_paths(self, paths):
+        """
+        Mark the artefacts that paths belong to as just used.
+
+        Args:
+            paths: Paths to artefacts in the upload folder, or to files
+                inside them. Paths outside the folder are ignored.
+        """
+        names = {self._name(path) for path in paths if path}
+        self.touch([name for name in names if not name.startswith('..')])
+
+    def record_files(self, job_id, paths):
+        """
+        Record the files a job wrote to the upload folder.
+
+        Args:
+            job_id: ID the job's files are downloaded under.
+            paths: Paths of the files.
+        """
+        rows = []
+        for path in paths:
+            name = self._name(path)
+            if name.startswith('..'):
+                continue
+            relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.upload_dir))
+            rows.append((job_id, os.path.basename(path), name, relative))
+
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO artefact_files (job_id, filename, artefact, path) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def get_file(self, job_id, filename):
+        """
+        Find a file written by a job.
+
+        Args:
+            job_id: ID the job's files are downloaded under.
+            filename: Name of the file.
+
+        Returns:
+            str: Path to the file, or None if there is no such file.
+        """
+        with self._connection() as conn:
+            row = conn.execute("SELECT path FROM artefact_files WHERE job_id = ? AND filename = ?",
+                               (job_id, filename)).fetchone()
+
+        if row is None:
+            return None
+
+        path = os.path.join(self.upload_dir, row['path'])
+        return path if os.path.isfile(path) else None
+
+    def list_files(self, job_id):
+        """
+        List the files written by a job.
+
+        Args:
+            job_id: ID the job's files are downloaded under.
+
+        Returns:
+            list: Paths to the job's files that still exist, in the order
+                they were recorded.
+        """
+        with self._connection() as conn:
+            rows = conn.execute("SELECT path FROM artefact_files WHERE job_id = ? ORDER BY rowid",
+                                (job_id,)).fetchall()
+
+        paths = [os.path.join(self.upload_dir, row['path']) for row in rows]
+        return [path for path in paths if os.path.isfile(path)]
+
+    def _remove(self, conn, name):
+        """Remove an artefact from the index and the disk."""
+        conn.execute("DELETE FROM artefacts WHERE name = ?", (name,))
+        conn.execute("DELETE FROM artefact_files WHERE artefact = ?", (name,))
+        path = os.path.join(self.upload_dir, name)
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            elif os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove artefact {name}: {str(e)}")
+
+    def _reconcile(self, conn):
+        """
+        Bring the index in line with the upload folder: record artefacts
+        nobody registered and refresh the size of the rest.
+        """
+        known = {row['name']: row['size'] for row in conn.execute("SELECT name, size FROM artefacts")}
+
+        for entry in os.scandir(self.upload_dir):
+            try:
+                size = get_path_size(entry.path)
+                mtime = entry.stat().st_mtime
+            except OSError:
+                # Removed while we were looking
+                continue
+
+            if entry.name not in known:
+                conn.execute(
+                    "INSERT OR IGNORE INTO artefacts (name, owner, size, created_at, last_access) "
+                    "VALUES (?, NULL, ?, ?, ?)",
+                    (entry.name, size, mtime, mtime)
+                )
+            elif known[entry.name] != size:
+                conn.execute("UPDATE artefacts SET size = ? WHERE name = ?", (size, entry.name))
+
+    def _bytes_over(self, conn):
+        """Get how many bytes need to be freed to get back under the limits."""
+        usage = shutil.disk_usage(self.upload_dir)
+        over = 0
+        if usage.used > usage.total * self.high_water:
+            over = usage.used - usage.total * self.low_water
+
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artefacts").fetchone()[0]
+            if total > self.max_bytes:
+                over = max(over, total - self.max_bytes * self.low_water)
+
+        return over
+
+    def sweep(self):
+        """
+        Expire artefacts that haven't been used for the TTL, then evict the
+        least recently used ones if the disk is over its high-water mark.
+
+        Returns:
+            dict: 'expired' and 'evicted' artefact counts, and 'bytes' freed.
+        """
+        now = time.time()
+        expired = 0
+        evicted = 0
+        freed = 0
+
+        with self._connection() as conn:
+            self._reconcile(conn)
+
+            for row in conn.execute("SELECT name, size FROM artefacts WHERE last_access < ?",
+                                    (now - self.ttl,)).fetchall():
+                self._remove(conn, row['name'])
+                expired += 1
+                freed += row['size']
+
+            over = self._bytes_over(conn)
+            if over > 0:
+                logger.warning(f"Upload storage over its limit by {int(over)} bytes, evicting artefacts")
+                for row in conn.execute("SELECT name, size FROM artefacts WHERE last_access < ? ORDER BY last_access",
+                                        (now - MIN_EVICTION_AGE,)).fetchall():
+                    if over <= 0:
+                        break
+                    self._remove(conn, row['name'])
+                    evicted += 1
+                    freed += row['size']
+                    over -= row['size']
+
+        # Uploads are handles to blobs, so their space is only given back
+        # once the blobs nothing refers to any more are collected
+        if self.blob_store and (expired or evicted):
+            self.blob_store.collect_garbage()
+
+        if expired or evicted:
+            logger.info(f"Storage sweep removed {expired} expired and {evicted} evicted artefacts ({freed} bytes)")
+
+        return {'expired': expired, 'evicted': evicted, 'bytes': freed}
+
+    def _is_sweeper(self):
+        """
+        Check whether this process is the host's sweeper, taking the role
+        if no other process holds it.
+        """
+        if fcntl is None:
+            return True
+        if self._lock_file is not None:
+            return True
+
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        # Held until the process exits, which releases it for another process
+        self._lock_file = lock_file
+        logger.info(f"Process {os.getpid()} is sweeping {self.upload_dir}")
+        return True
+
+    def _run(self):
+        """Background thread that sweeps while this process holds the sweeper lock."""
+        while not self._stopping.is_set():
+            try:
+                if self._is_sweeper():
+                    self.sweep()
+            except Exception as e:
+                logger.error(f"Error in storage sweeper: {str(e)}")
+
+            self._stopping.wait(self.sweep_interval)
+
+    def start(self):
+        """Start the sweeper thread."""
+        self.thread = threading.Thread(target=self._run, name='storage-sweeper', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Ask the sweeper thread to stop."""
+        self._stopping.set()
+
+    def stats(self):
+        """
+        Get the size of the upload folder and of the disk it is on.
+
+        Returns:
+            dict: 'artefacts', 'bytes', 'disk_total', 'disk_used' and 'disk_used_fraction'.
+        """
+        with self._connection() as conn:
+            artefacts, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artefacts").fetchone()
+
+        usage = shutil.disk_usage(self.upload_dir)
+        return {
+            'artefacts': artefacts,
+            'bytes': size,
+            'disk_total': usage.total,
+            'disk_used': usage.used,
+            'disk_used_fraction': usage.used / usage.total if usage.total else 0.0
+        }
@@ -0,0 +1,226 @@
+"""
+Preview cache module.
+This module keeps rendered page previews so that paging back and forth in
+the editors doesn't render the same page again.
+
+Previews are keyed by the SHA-256 of the PDF, the page, the resolution and
+the rotation, so an edited file never gets a stale preview. Recently used
+previews are kept in memory in each process, and all previews on local disk
+so every process on the host can use them.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from app.jobs.cache import hash_file
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default total size of the previews kept in memory per process
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024  # 64MB
+
+# Default total size of the previews kept on disk
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512MB
+
+# Number of file hashes remembered per process
+FILE_HASH_ENTRIES = 1024
+
+
+class PreviewCache:
+    """Class for caching rendered page images in memory and on local disk."""
+
+    def __init__(self, cache_dir, memory_bytes=DEFAULT_MEMORY_BYTES, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize the preview cache.
+
+        Args:
+            cache_dir: Directory to keep previews in.
+            memory_bytes: Maximum total size of the previews kept in memory.
+            max_bytes: Maximum total size of the previews kept on disk.
+        """
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.max_bytes = max_bytes
+
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_size = self._scan_disk_size()
+
+    def _scan_disk_size(self):
+        """Get the total size of the previews on disk."""
+        size = 0
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                try:
+                    size += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+        return size
+
+    def file_hash(self, path):
+        """
+        Get the SHA-256 of a file, remembering it while the file is unchanged.
+
+        Args:
+            path: Path to the file.
+
+        Returns:
+            str: The hex digest.
+        """
+        info = os.stat(path)
+        memo_key = (os.path.abspath(path), info.st_mtime_ns, info.st_size)
+
+        with self._lock:
+            digest = self._hashes.get(memo_key)
+            if digest is not None:
+                self._hashes.move_to_end(memo_key)
+                return digest
+
+        digest = hash_file(path)
+
+        with self._lock:
+            self._hashes[memo_key] = digest
+            while len(self._hashes) > FILE_HASH_ENTRIES:
+                self._hashes.popitem(last=False)
+
+        return digest
+
+    def make_key(self, file_hash, page_number, dpi, rotation, kind='page'):
+        """
+        Get the cache key of a rendered image.
+
+        Args:
+            file_hash: SHA-256 of the PDF.
+            page_number: 1-based page number.
+            dpi: Resolution.
+            rotation: Rotation in degrees.
+            kind: What was rendered, e.g. 'page' or a tile description.
+
+        Returns:
+            str: The cache key, also usable as an ETag.
+        """
+        material = f"{file_hash}:{kind}:{page_number}:{dpi}:{rotation}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _disk_path(self, key):
+        """Get the path of a cached image on disk."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def _remember(self, key, data):
+        """Keep an image in memory, dropping the least recently used ones."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes and self._memory:
+                old_key, old_data = self._memory.popitem(last=False)
+                self._memory_size -= len(old_data)
+
+    def get(self, key):
+        """
+        Get a cached image.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            bytes: The image, or None on a cache miss.
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Mark as recently used for disk eviction
+            os.utime(path)
+        except OSError:
+            return None
+
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        """
+        Store an image.
+
+        Args:
+            key: The cache key.
+            data: The image.
+        """
+        self._remember(key, data)
+
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache preview {key}: {str(e)}")
+            return
+
+        with self._lock:
+            self._disk_size += len(data)
+            over = self._disk_size > self.max_bytes
+
+        if over:
+            self._evict()
+
+    def get_or_render(self, key, render):
+        """
+        Get a cached image, rendering and storing it on a miss.
+
+        Args:
+            key: The cache key.
+            render: Function that renders the image and returns its bytes.
+
+        Returns:
+            bytes: The image.
+        """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def _evict(self):
+        """Remove the least recently used previews from disk until under the size limit."""
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((info.st_mtime, info.st_size, path))
+
+        total = sum(size for mtime, size, path in entries)
+        # Evict down to 90% so we don't evict again on the next store
+        target = self.max_bytes * 0.9
+        for mtime, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+        with self._lock:
+            self._disk_size = total
@@ -0,0 +1,53 @@
+"""
+PDF factory for the tests.
+This module writes small PDFs for the test scripts to work on.
+"""
+
+import os
+import fitz  # PyMuPDF
+
+def make_pdf(path, page_count=1, text="Page {number}", image_size=None, rotation=0):
+    """
+    Write a PDF for a test.
+
+    Args:
+        path (str): Path to write the PDF to.
+        page_count (int, optional): Number of pages. Defaults to 1.
+        text (str, optional): Line of text put on each page, with {number}
+            replaced by the page number. None leaves the pages blank.
+        image_size (tuple, optional): Width and height in pixels of a noise
+            image put on each page. Every page gets its own image, which
+            doesn't compress, so the file grows by about width * height * 3
+            bytes per page.
+        rotation (int, optional): Rotation of every page in degrees.
+
+    Returns:
+        str: The path.
+    """
+    doc = fitz.open()
+    for index in range(page_count):
+        page = doc.new_page()
+        if image_size:
+            width, height = image_size
+            pixmap = fitz.Pixmap(fitz.csRGB, width, height, os.urandom(width * height * 3), False)
+            page.insert_image(fitz.Rect(72, 144, 72 + width, 144 + height), pixmap=pixmap)
+        if text:
+            page.insert_text((72, 72), text.format(number=index + 1))
+        if rotation:
+            page.set_rotation(rotation)
+    doc.save(path)
+    doc.close()
+    return path
+
+def read_page_texts(path):
+    """
+    Get the text of each page of a PDF.
+
+    Args:
+        path (str): Path to the PDF.
+
+    Returns:
+        list: The stripped text of each page.
+    """
+    with fitz.open(path) as doc:
+        return [page.get_text().strip() for page in doc]
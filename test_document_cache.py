@@ -0,0 +1,75 @@
+"""
+Test the open document cache.
+This script checks that cached documents are reused while a file is unchanged,
+that an edit saved to another file never writes to its input, and that
+in-place edits are appended one after the other.
+"""
+
+import os
+import fitz  # PyMuPDF
+import pytest
+from tools.utils.document_cache import DocumentCache
+from pdf_factory import make_pdf
+
+@pytest.fixture
+def cache():
+    """
+    Get an empty document cache, closed again after the test.
+    """
+    cache = DocumentCache()
+    yield cache
+    cache.clear()
+
+def test_reuse_until_changed(tmp_path, cache):
+    """
+    Test that a document is reused until its file changes.
+    """
+    path = make_pdf(str(tmp_path / 'input.pdf'), text=None)
+
+    with cache.open(path) as doc:
+        first = doc
+    with cache.open(path) as doc:
+        assert doc is first
+
+    make_pdf(path, 2, text=None)
+    with cache.open(path) as doc:
+        assert doc is not first
+        assert doc.page_count == 2
+
+def test_edit_to_other_file_leaves_input_alone(tmp_path, cache):
+    """
+    Test that an edit saved to another file isn't cached as that file, so
+    later in-place edits of the output don't append to the input.
+    """
+    input_path = make_pdf(str(tmp_path / 'input.pdf'), text=None)
+    output_path = str(tmp_path / 'output.pdf')
+    input_size = os.path.getsize(input_path)
+
+    with cache.edit(input_path, output_path) as doc:
+        doc[0].insert_text((72, 72), "first")
+        doc.save(output_path)
+
+    with cache.edit(output_path, output_path) as doc:
+        doc[0].insert_text((72, 144), "second")
+        doc.saveIncr()
+
+    assert os.path.getsize(input_path) == input_size
+    with fitz.open(output_path) as doc:
+        assert doc[0].get_text().split() == ['first', 'second']
+
+def test_in_place_edits_append(tmp_path, cache):
+    """
+    Test that each in-place edit is appended after the one before it,
+    rather than written over it.
+    """
+    path = make_pdf(str(tmp_path / 'edited.pdf'), text=None)
+
+    with cache.edit(path, path) as doc:
+        doc[0].insert_text((72, 72), "first")
+        doc.saveIncr()
+    first_edit = (tmp_path / 'edited.pdf').read_bytes()
+
+    with cache.edit(path, path) as doc:
+        doc[0].insert_text((72, 144), "second")
+        doc.saveIncr()
+    assert (tmp_path / 'edited.pdf').read_bytes().startswith(first_edit)
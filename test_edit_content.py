@@ -0,0 +1,98 @@
+"""
+Test batches of editor operations.
+This script checks that a batch of operations is applied as one edit that can
+be undone as a whole, and that a batch with an invalid or failing operation
+changes nothing.
+"""
+
+import os
+import fitz  # PyMuPDF
+import pytest
+from app.errors import PDFProcessingError
+from tools.edit.content import apply_operations
+from tools.edit.journal import EditJournal
+from pdf_factory import make_pdf
+
+def text_operation(text, page_number=1, y=72):
+    """
+    Get an operation that adds a line of text.
+
+    Args:
+        text (str): The text.
+        page_number (int, optional): Page to add it to. Defaults to 1.
+        y (int, optional): Vertical position of the line. Defaults to 72.
+
+    Returns:
+        dict: The operation.
+    """
+    return {'type': 'text', 'page_number': page_number, 'text': text, 'x': 72, 'y': y}
+
+def read_texts(path):
+    """
+    Get the words on each page of a PDF.
+
+    Args:
+        path (str): Path to the PDF.
+
+    Returns:
+        list: The words of each page.
+    """
+    with fitz.open(path) as doc:
+        return [page.get_text().split() for page in doc]
+
+@pytest.fixture
+def paths(tmp_path):
+    """
+    Get a blank two-page input PDF and the path its edits are saved to.
+    """
+    return make_pdf(str(tmp_path / 'input.pdf'), 2, text=None), str(tmp_path / 'edited_input.pdf')
+
+def test_batch_is_one_edit(paths):
+    """
+    Test that a batch is applied in one edit, undone as a whole.
+    """
+    input_path, output_path = paths
+    apply_operations(input_path, output_path, [text_operation('first')])
+
+    result = apply_operations(input_path, output_path, [
+        text_operation('second', y=144), text_operation('other', page_number=2), text_operation('third', y=216)])
+
+    assert (result['applied'], result['failed']) == (3, 0)
+    assert [entry['success'] for entry in result['results']] == [True, True, True]
+    assert read_texts(output_path) == [['first', 'second', 'third'], ['other']]
+    assert EditJournal(output_path).history() == ['Apply 1 edits', 'Apply 3 edits']
+
+    EditJournal(output_path).undo()
+    assert read_texts(output_path) == [['first'], []]
+
+def test_invalid_operation_applies_nothing(paths):
+    """
+    Test that an invalid operation is reported before anything is applied.
+    """
+    input_path, output_path = paths
+
+    with pytest.raises(PDFProcessingError, match='operation 1 is invalid'):
+        apply_operations(input_path, output_path, [text_operation('first'), text_operation('lost', page_number=3)])
+
+    assert not os.path.exists(output_path)
+
+def test_failing_operation_applies_nothing(paths, tmp_path):
+    """
+    Test that an operation failing part way through the batch undoes the
+    operations applied before it.
+    """
+    input_path, output_path = paths
+    apply_operations(input_path, output_path, [text_operation('kept')])
+    size = os.path.getsize(output_path)
+
+    not_an_image = tmp_path / 'image.png'
+    not_an_image.write_bytes(b'not an image')
+    operations = [text_operation('lost', y=144),
+                  {'type': 'image', 'page_number': 2, 'image_path': str(not_an_image), 'x': 72, 'y': 72}]
+
+    with pytest.raises(PDFProcessingError, match='operation 1 failed'):
+        apply_operations(input_path, output_path, operations)
+
+    assert os.path.getsize(output_path) == size
+    assert read_texts(output_path) == [['kept'], []]
+    assert EditJournal(output_path).history() == ['Apply 1 edits']
@@ -0,0 +1,135 @@
+"""
+Test the edit journal.
+This script checks that editor changes are appended to the output file and
+can be undone, that a failed save leaves the file as it was, that a
+checkpoint compacts the file, and that edits never reach a hard-linked copy.
+"""
+
+import os
+import fitz  # PyMuPDF
+import pytest
+from tools.edit import journal
+from tools.edit.journal import EditJournal, get_journal_path
+from pdf_factory import make_pdf
+
+def add_text(text, y=72):
+    """
+    Get an edit that writes a line of text on the first page.
+
+    Args:
+        text (str): The text.
+        y (int, optional): Vertical position of the line. Defaults to 72.
+
+    Returns:
+        function: The edit.
+    """
+    def operation(doc):
+        doc[0].insert_text((72, y), text)
+        return text
+    return operation
+
+def read_words(path):
+    """
+    Get the words on the first page of a PDF.
+
+    Args:
+        path (str): Path to the PDF.
+
+    Returns:
+        list: The words.
+    """
+    with fitz.open(path) as doc:
+        return doc[0].get_text().split()
+
+@pytest.fixture
+def paths(tmp_path):
+    """
+    Get a blank input PDF and the path its edits are saved to.
+    """
+    return make_pdf(str(tmp_path / 'input.pdf'), text=None), str(tmp_path / 'edited_input.pdf')
+
+def test_apply_and_undo(paths):
+    """
+    Test that edits are appended in order and undone last first.
+    """
+    input_path, output_path = paths
+
+    assert EditJournal(output_path, input_path).apply(add_text('first'), 'Add first') == 'first'
+    size_after_first = os.path.getsize(output_path)
+    EditJournal(output_path).apply(add_text('second', 144), 'Add second')
+
+    assert os.path.getsize(output_path) > size_after_first
+    assert read_words(output_path) == ['first', 'second']
+    assert EditJournal(output_path).history() == ['Add first', 'Add second']
+
+    assert EditJournal(output_path).undo() == 'Add second'
+    assert os.path.getsize(output_path) == size_after_first
+    assert read_words(output_path) == ['first']
+
+    EditJournal(output_path).undo()
+    assert read_words(output_path) == []
+    assert EditJournal(output_path).history() == []
+
+def test_failed_save_is_cut_off(paths):
+    """
+    Test that anything a failed edit appended is removed again.
+    """
+    input_path, output_path = paths
+    EditJournal(output_path, input_path).apply(add_text('kept'), 'Add kept')
+    size = os.path.getsize(output_path)
+
+    def failing(doc):
+        doc[0].insert_text((72, 144), 'lost')
+        doc.saveIncr()
+        raise RuntimeError("save failed")
+
+    with pytest.raises(RuntimeError):
+        EditJournal(output_path).apply(failing, 'Add lost')
+
+    assert os.path.getsize(output_path) == size
+    assert read_words(output_path) == ['kept']
+    assert EditJournal(output_path).history() == ['Add kept']
+
+def test_checkpoint(paths):
+    """
+    Test that a checkpoint compacts the file and ends its undo history.
+    """
+    input_path, output_path = paths
+    for index in range(5):
+        EditJournal(output_path, input_path).apply(add_text(f"line{index}", 72 + index * 20),
+                                                   f"Add line {index}")
+
+    result = EditJournal(output_path).checkpoint()
+
+    assert result['size_after'] < result['size_before']
+    assert os.path.getsize(output_path) == result['size_after']
+    assert read_words(output_path) == [f"line{index}" for index in range(5)]
+    assert EditJournal(output_path).history() == []
+
+def test_hard_linked_output_is_copied(paths):
+    """
+    Test that editing a file hard-linked to another, such as a stored
+    upload, leaves the other file alone.
+    """
+    stored_path, output_path = paths
+    os.link(stored_path, output_path)
+    stored_size = os.path.getsize(stored_path)
+
+    EditJournal(output_path).apply(add_text('edited'), 'Add edited')
+
+    assert os.path.getsize(stored_path) == stored_size
+    assert os.stat(output_path).st_nlink == 1
+    assert read_words(stored_path) == []
+    assert read_words(output_path) == ['edited']
+
+def test_without_fcntl(paths, monkeypatch):
+    """
+    Test that the journal still works where fcntl isn't available.
+    """
+    input_path, output_path = paths
+    monkeypatch.setattr(journal, 'fcntl', None)
+
+    EditJournal(output_path, input_path).apply(add_text('first'), 'Add first')
+    assert os.path.exists(get_journal_path(output_path))
+    assert EditJournal(output_path).undo() == 'Add first'
+    assert read_words(output_path) == []
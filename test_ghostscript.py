@@ -2,30 +2,33 @@
 Test script to check if Ghostscript is properly set up.
 """
 
-import os
 import sys
-import subprocess
-from tools.optimize.compress import get_ghostscript_path
+from tools.utils.ghostscript import discover_ghostscript
 
 def main():
     """
     Test if Ghostscript is properly set up.
     """
     try:
-        # Get the Ghostscript path
-        gs_path = get_ghostscript_path()
-        print(f"Ghostscript found at: {gs_path}")
-        
-        # Test Ghostscript by running a simple command
-        result = subprocess.run([gs_path, "--version"], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"Ghostscript version: {result.stdout.strip()}")
-            print("Ghostscript is working correctly!")
-        else:
-            print(f"Error running Ghostscript: {result.stderr}")
+        # Resolve Ghostscript the same way the tools do
+        info = discover_ghostscript()
+
+        if not info['path'] and not info['library_path']:
+            print("Ghostscript not found. Please install Ghostscript or set GHOSTSCRIPT_PATH.")
+            return 1
+
+        print(f"Ghostscript found at: {info['path']}")
+        print(f"Ghostscript library: {info['library_path']}")
+        print(f"Ghostscript version: {info['version']}")
+
+        for name, available in info['capabilities'].items():
+            print(f"  {name}: {'yes' if available else 'no'}")
+
+        if not info['capabilities']['pdfwrite']:
+            print("Ghostscript is missing the pdfwrite device!")
             return 1
-        
+
+        print("Ghostscript is working correctly!")
         return 0
     
     except Exception as e:
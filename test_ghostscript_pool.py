@@ -0,0 +1,90 @@
+"""
+Test the Ghostscript worker pool.
+This script checks which command lines a worker can run on its reused gsapi
+instance and, where the Ghostscript library is installed, that pooled jobs
+on one worker each write a complete PDF.
+"""
+
+import pytest
+from tools.utils.ghostscript import GhostscriptPool, discover_ghostscript
+from tools.utils.gs_worker import is_complete_pdf, translate_args
+from pdf_factory import make_pdf, read_page_texts
+
+def compress_args(input_path, output_path, level='ebook'):
+    """
+    Get the command line the compress tool runs.
+
+    Args:
+        input_path (str): Path to the input PDF.
+        output_path (str): Path to write the output PDF to.
+        level (str, optional): PDFSETTINGS level. Defaults to 'ebook'.
+
+    Returns:
+        list: The Ghostscript arguments.
+    """
+    return ['-sDEVICE=pdfwrite', f'-dPDFSETTINGS=/{level}', '-dCompatibilityLevel=1.4',
+            '-dNOPAUSE', '-dQUIET', '-dBATCH', f'-sOutputFile={output_path}', input_path]
+
+def test_translate_pdfwrite_job():
+    """
+    Test that a pdfwrite command line becomes one job inside save/restore.
+    """
+    job = translate_args(compress_args('/in/a (1).pdf', '/out/b.pdf') + ['-sColorConversionStrategy=RGB'])
+
+    assert job['input_path'] == '/in/a (1).pdf'
+    assert job['output_path'] == '/out/b.pdf'
+    assert job['program'].startswith('save mark /OutputFile (/out/b.pdf) /PDFSETTINGS /ebook ')
+    assert '/CompatibilityLevel 1.4 /ColorConversionStrategy (RGB) ' in job['program']
+    assert '(/in/a \\(1\\).pdf) run ' in job['program']
+    assert job['program'].endswith('nulldevice restore')
+    assert '/NOPAUSE' not in job['program']
+
+@pytest.mark.parametrize('args', [
+    ['-sDEVICE=png16m', '-sOutputFile=/out/a.png', '/in/a.pdf'],
+    ['-sDEVICE=pdfwrite', '-sOutputFile=/out/a.pdf', '/in/a.pdf', '/in/b.pdf'],
+    ['-sDEVICE=pdfwrite', '-sOutputFile=/out/page%d.pdf', '/in/a.pdf'],
+    ['-sDEVICE=pdfwrite', '-sOutputFile=/out/a.pdf', '-c', 'quit', '/in/a.pdf'],
+    ['-sDEVICE=pdfwrite', '-dX=(a) run', '-sOutputFile=/out/a.pdf', '/in/a.pdf'],
+    ['-sDEVICE=pdfwrite', '/in/a.pdf'],
+])
+def test_translate_falls_back(args):
+    """
+    Test that command lines a session can't run get a new instance instead.
+    """
+    assert translate_args(args) is None
+
+def test_is_complete_pdf(tmp_path):
+    """
+    Test that a PDF cut off before its end is noticed.
+    """
+    path = make_pdf(str(tmp_path / 'input.pdf'))
+    assert is_complete_pdf(path)
+
+    data = (tmp_path / 'input.pdf').read_bytes()
+    (tmp_path / 'input.pdf').write_bytes(data[:len(data) // 2])
+    assert not is_complete_pdf(path)
+    assert not is_complete_pdf(str(tmp_path / 'missing.pdf'))
+
+@pytest.mark.skipif(not discover_ghostscript()['library_path'], reason="Ghostscript library not installed")
+def test_pool_reuses_worker(tmp_path):
+    """
+    Test that jobs run one after the other on the same worker each write a
+    complete PDF with the pages of their own input.
+    """
+    pool = GhostscriptPool(discover_ghostscript()['library_path'], size=1)
+    try:
+        for index, level in enumerate(['ebook', 'screen', 'ebook']):
+            input_path = make_pdf(str(tmp_path / f'input{index}.pdf'), index + 1,
+                                  text=f"Job {index} page {{number}}", image_size=(100, 100))
+            output_path = str(tmp_path / f'output{index}.pdf')
+            reply = pool.run(compress_args(input_path, output_path, level))
+
+            assert reply['returncode'] == 0, reply['stderr']
+            assert is_complete_pdf(output_path)
+            assert read_page_texts(output_path) == read_page_texts(input_path)
+
+        worker = pool._idle.get_nowait()
+        assert worker.jobs_done == 3
+        pool._idle.put(worker)
+    finally:
+        pool.close()
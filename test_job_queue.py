@@ -0,0 +1,133 @@
+"""
+Test the background job queue.
+This script checks that jobs are claimed within their tool limits, that jobs
+carrying secrets stay with the process that submitted them, and that jobs
+left behind by a process that died are recovered safely.
+"""
+
+import os
+import sys
+import sqlite3
+import subprocess
+from app.jobs import result_to_dict
+from app.jobs.queue import JobQueue, STATUS_QUEUED, STATUS_RUNNING, STATUS_FAILED
+
+def make_queue(directory, lease_timeout=3600):
+    """
+    Create a queue in a temporary directory.
+
+    Args:
+        directory (str): Directory to keep the queue database in.
+        lease_timeout (int, optional): Lease timeout in seconds.
+
+    Returns:
+        JobQueue: The queue.
+    """
+    return JobQueue(os.path.join(directory, 'jobs', 'jobs.sqlite3'), lease_timeout=lease_timeout)
+
+def set_columns(queue, job_id, **columns):
+    """
+    Change columns of a job directly in the database.
+
+    Args:
+        queue (JobQueue): The queue.
+        job_id (str): The job ID.
+        **columns: Column values to set.
+    """
+    assignments = ', '.join(f"{name} = ?" for name in columns)
+    conn = sqlite3.connect(queue.db_path)
+    try:
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+def dead_pid():
+    """
+    Get the ID of a process that has exited.
+
+    Returns:
+        int: The process ID.
+    """
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_claim_respects_tool_limits(tmp_path):
+    """
+    Test that jobs are claimed oldest first, skipping tools at their limit.
+    """
+    queue = make_queue(tmp_path)
+    first = queue.enqueue('ocr', {'input_path': 'a.pdf'})
+    second = queue.enqueue('ocr', {'input_path': 'b.pdf'})
+    third = queue.enqueue('compress', {'input_path': 'c.pdf'})
+
+    assert queue.claim('w1', {'ocr': 1})['id'] == first
+    assert queue.claim('w2', {'ocr': 1})['id'] == third
+    assert queue.claim('w3', {'ocr': 1}) is None
+
+    queue.complete(first, {'output_path': '/srv/uploads/a_ocr.pdf'})
+    assert queue.claim('w3', {'ocr': 1})['id'] == second
+    assert queue.get(first)['result'] == {'output_path': '/srv/uploads/a_ocr.pdf'}
+
+def test_secrets_stay_in_memory(tmp_path):
+    """
+    Test that secret arguments reach the worker but never the database.
+    """
+    queue = make_queue(tmp_path)
+    job_id = queue.enqueue('unlock', {'input_path': 'a.pdf'}, secret_kwargs={'password': 'hunter2'})
+
+    with open(queue.db_path, 'rb') as f:
+        assert b'hunter2' not in f.read()
+    assert 'password' not in queue.get(job_id)['kwargs']
+
+    job = queue.claim('w1')
+    assert job['kwargs'] == {'input_path': 'a.pdf', 'password': 'hunter2'}
+
+def test_requeue_stale(tmp_path):
+    """
+    Test that stale jobs are requeued, but jobs whose secrets were lost with
+    their process are failed instead of being run without them.
+    """
+    queue = make_queue(tmp_path, lease_timeout=60)
+    plain = queue.enqueue('compress', {'input_path': 'a.pdf'})
+    pinned = queue.enqueue('unlock', {'input_path': 'b.pdf'}, secret_kwargs={'password': 'x'})
+    orphan = queue.enqueue('protect', {'input_path': 'c.pdf'}, secret_kwargs={'password': 'y'})
+    waiting = queue.enqueue('unlock', {'input_path': 'd.pdf'}, secret_kwargs={'password': 'z'})
+
+    queue.claim('w1')
+    queue.claim('w2')
+    set_columns(queue, plain, started_at=0)
+    set_columns(queue, pinned, started_at=0)
+    set_columns(queue, orphan, pid=dead_pid())
+
+    assert queue.requeue_stale() == 1
+    assert queue.get(plain)['status'] == STATUS_QUEUED
+    assert queue.get(pinned)['status'] == STATUS_FAILED
+    assert queue.get(orphan)['status'] == STATUS_FAILED
+    assert queue.get(orphan)['error_type'] == 'PDFProcessingError'
+
+    # Queued jobs of this live process keep waiting for a worker
+    assert queue.get(waiting)['status'] == STATUS_QUEUED
+    assert queue.claim('w3')['id'] == plain
+    job = queue.claim('w4')
+    assert job['id'] == waiting
+    assert job['kwargs']['password'] == 'z'
+    assert job['status'] == STATUS_RUNNING
+
+def test_result_hides_server_paths():
+    """
+    Test that results returned by the API only name files.
+    """
+    result = result_to_dict({
+        'output_path': '/srv/uploads/a_compressed.pdf',
+        'output_files': ['/srv/uploads/job/page_1.png', '/srv/uploads/job/page_2.png'],
+        'compression_ratio': 42.0,
+        'mode': 'pages',
+    })
+    assert result == {
+        'output_path': 'a_compressed.pdf',
+        'output_files': ['page_1.png', 'page_2.png'],
+        'compression_ratio': 42.0,
+        'mode': 'pages',
+    }
@@ -0,0 +1,163 @@
+"""
+Test PDF merging.
+This script checks that merged pages keep their order and table of contents,
+that identical fonts and images are written once, including ones that refer
+back to themselves, that checkpoints leave no intermediate files behind, and
+that merge progress reaches the process waiting for the task.
+"""
+
+import os
+import fitz  # PyMuPDF
+import pikepdf
+import pytest
+from app.errors import PDFProcessingError
+from app.security.process_pool import ProcessPool
+from tools.organize import merge
+from tools.organize.merge import merge_pdfs
+from pdf_factory import read_page_texts
+
+# Pixels of the image every input shares
+IMAGE_SIZE = 50
+
+def make_inputs(directory, file_count, page_count=2):
+    """
+    Write PDFs whose pages all use the same font and image.
+
+    Each input uses one font and one image object on all of its pages, so
+    every reference on a later input is a duplicate of the first input's.
+
+    Args:
+        directory (str): Directory to write the PDFs to.
+        file_count (int): Number of PDFs.
+        page_count (int, optional): Number of pages per PDF. Defaults to 2.
+
+    Returns:
+        list: Paths to the PDFs.
+    """
+    samples = bytes(index % 256 for index in range(IMAGE_SIZE * IMAGE_SIZE * 3))
+    pixmap = fitz.Pixmap(fitz.csRGB, IMAGE_SIZE, IMAGE_SIZE, samples, False)
+
+    paths = []
+    for file_index in range(file_count):
+        doc = fitz.open()
+        for page_index in range(page_count):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"File {file_index} page {page_index + 1}")
+            page.insert_image(fitz.Rect(72, 144, 172, 244), pixmap=pixmap)
+        path = os.path.join(directory, f"file{file_index}.pdf")
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+def make_cyclic_input(path):
+    """
+    Write a PDF with an image whose dictionary refers back to the image.
+
+    Args:
+        path (str): Path to write the PDF to.
+
+    Returns:
+        str: The path.
+    """
+    pdf = pikepdf.Pdf.new()
+    pdf.add_blank_page()
+    image = pdf.make_indirect(pikepdf.Stream(pdf, b'\x00\xff' * 8, Type=pikepdf.Name.XObject,
+                                             Subtype=pikepdf.Name.Image, Width=4, Height=4,
+                                             ColorSpace=pikepdf.Name.DeviceGray, BitsPerComponent=8))
+    image.stream_dict.Holder = pdf.make_indirect(pikepdf.Dictionary(Image=image))
+    pdf.pages[0].Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=image))
+    pdf.save(path)
+    pdf.close()
+    return path
+
+def expected_texts(file_count, page_count=2):
+    """
+    Get the text of each merged page, in order.
+
+    Args:
+        file_count (int): Number of inputs.
+        page_count (int, optional): Number of pages per input. Defaults to 2.
+
+    Returns:
+        list: The text of each page.
+    """
+    return [f"File {file_index} page {page_index + 1}"
+            for file_index in range(file_count) for page_index in range(page_count)]
+
+@pytest.mark.parametrize('chunk_files', [64, 2])
+def test_merge(tmp_path, monkeypatch, chunk_files):
+    """
+    Test merging in one pass and with a checkpoint after every two files.
+    """
+    monkeypatch.setattr(merge, 'MERGE_CHUNK_FILES', chunk_files)
+    paths = make_inputs(str(tmp_path), 7)
+    output_path = str(tmp_path / 'merged.pdf')
+
+    result = merge_pdfs(paths, output_path)
+
+    assert result['total_pages'] == 14
+    # Two references on each page of the six later inputs
+    assert result['shared_resources'] == 24
+    assert read_page_texts(output_path) == expected_texts(7)
+    with fitz.open(output_path) as doc:
+        assert doc.get_toc() == [[1, f"file{index}", index * 2 + 1] for index in range(7)]
+        assert len({image[0] for page in doc for image in page.get_images()}) == 1
+        assert len({font[0] for page in doc for font in page.get_fonts()}) == 1
+
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(path) for path in paths] + ['merged.pdf'])
+
+def test_merge_without_toc(tmp_path):
+    """
+    Test that no outline is written when it isn't wanted.
+    """
+    paths = make_inputs(str(tmp_path), 2)
+    output_path = str(tmp_path / 'merged.pdf')
+
+    merge_pdfs(paths, output_path, toc=False)
+
+    with fitz.open(output_path) as doc:
+        assert doc.get_toc() == []
+
+def test_merge_shares_cyclic_resources(tmp_path, monkeypatch):
+    """
+    Test that resources referring back to themselves are compared and shared,
+    across a checkpoint too.
+    """
+    monkeypatch.setattr(merge, 'MERGE_CHUNK_FILES', 2)
+    paths = [make_cyclic_input(str(tmp_path / f"cyclic{index}.pdf")) for index in range(3)]
+
+    result = merge_pdfs(paths, str(tmp_path / 'merged.pdf'))
+
+    assert result['shared_resources'] == 2
+    with fitz.open(str(tmp_path / 'merged.pdf')) as doc:
+        assert len({image[0] for page in doc for image in page.get_images()}) == 1
+
+def test_merge_removes_checkpoints_on_error(tmp_path, monkeypatch):
+    """
+    Test that a failed merge leaves no intermediate files behind.
+    """
+    monkeypatch.setattr(merge, 'MERGE_CHUNK_FILES', 2)
+    paths = make_inputs(str(tmp_path), 3)
+    (tmp_path / 'broken.pdf').write_bytes(b'not a pdf')
+
+    with pytest.raises(PDFProcessingError):
+        merge_pdfs(paths + [str(tmp_path / 'broken.pdf')], str(tmp_path / 'merged.pdf'))
+
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+def test_progress_from_pool(tmp_path):
+    """
+    Test that the pool passes each progress report on before the result.
+    """
+    paths = make_inputs(str(tmp_path), 3, page_count=1)
+    reports = []
+    pool = ProcessPool(size=1)
+    try:
+        result = pool.run(merge_pdfs, args=(paths, str(tmp_path / 'merged.pdf')),
+                          tool='merge_pdfs', on_progress=reports.append)
+    finally:
+        pool.close()
+
+    assert result['total_pages'] == 3
+    assert reports == [{'files_done': done, 'files_total': 3, 'pages': done} for done in (1, 2, 3)]
@@ -0,0 +1,188 @@
+"""
+Test the OCR pipeline without an OCR engine.
+This script checks that pages are classified before recognition, that words
+already on a page aren't added twice, that recognised words are written where
+they were found, rotated pages included, and that the OCR backend is picked
+as configured.
+"""
+
+import fitz  # PyMuPDF
+import pytest
+from tools.optimize import ocr_backends
+from tools.optimize.ocr import (add_ocr_text, drop_existing_words, perform_ocr, plan_ocr,
+                                PAGE_MIXED, PAGE_SCANNED, PAGE_VECTOR_TEXT)
+from tools.optimize.ocr_backends import OCRBackend, get_ocr_backend
+from pdf_factory import make_pdf
+
+# Word boxes in pixels of a page rendered at the default zoom of 2
+WORDS = [(200, 200, 400, 240, 'hello'), (200, 400, 360, 440, 'world')]
+
+class FakeBackend(OCRBackend):
+    """OCR engine that finds the same words on every page."""
+
+    name = 'fake'
+
+    def is_available(self):
+        return True
+
+    def image_to_words(self, image, language='eng'):
+        return list(WORDS)
+
+class MissingBackend(FakeBackend):
+    """OCR engine that is never available."""
+
+    name = 'missing'
+
+    def is_available(self):
+        return False
+
+@pytest.fixture
+def backends(monkeypatch):
+    """
+    Register the fake OCR engines and start without any cached engines.
+    """
+    monkeypatch.setattr(ocr_backends, 'OCR_BACKENDS', {'fake': FakeBackend, 'missing': MissingBackend})
+    monkeypatch.setattr(ocr_backends, '_backends', {})
+    monkeypatch.delenv('OCR_BACKEND', raising=False)
+
+def read_words(page):
+    """
+    Get the words on a page with their boxes as displayed.
+
+    Args:
+        page (fitz.Page): The page.
+
+    Returns:
+        list: A list of (Rect, word) tuples.
+    """
+    return [(fitz.Rect(word[:4]) * page.rotation_matrix, word[4]) for word in page.get_text("words")]
+
+def test_plan_ocr(tmp_path):
+    """
+    Test that text, scanned, mixed and already searchable pages are told apart.
+    """
+    text_doc = fitz.open(make_pdf(str(tmp_path / 'text.pdf')))
+    scanned_doc = fitz.open(make_pdf(str(tmp_path / 'scanned.pdf'), 2, text=None, image_size=(300, 400)))
+    mixed_doc = fitz.open(make_pdf(str(tmp_path / 'mixed.pdf'), text="Caption", image_size=(300, 400)))
+
+    # An earlier OCR leaves a text layer over the whole image
+    searchable_doc = fitz.open(make_pdf(str(tmp_path / 'searchable.pdf'), text=None, image_size=(300, 400)))
+    for y in range(156, 544, 12):
+        searchable_doc[0].insert_text((72, y), "scanned words " * 4, fontsize=10)
+
+    assert [entry['class'] for entry in plan_ocr(text_doc)] == [PAGE_VECTOR_TEXT]
+    assert [entry['page'] for entry in plan_ocr(scanned_doc)] == [0, 1]
+    assert [entry['class'] for entry in plan_ocr(scanned_doc)] == [PAGE_SCANNED, PAGE_SCANNED]
+    assert [entry['class'] for entry in plan_ocr(mixed_doc)] == [PAGE_MIXED]
+    assert [entry['class'] for entry in plan_ocr(searchable_doc)] == [PAGE_VECTOR_TEXT]
+
+    image_coverage = plan_ocr(scanned_doc)[0]['image_coverage']
+    assert image_coverage == pytest.approx(300 * 400 / abs(scanned_doc[0].rect), abs=0.001)
+
+    for doc in (text_doc, scanned_doc, mixed_doc, searchable_doc):
+        doc.close()
+
+def test_plan_ocr_rotated_page(tmp_path):
+    """
+    Test that rotating a page doesn't change its class or coverage.
+    """
+    upright = fitz.open(make_pdf(str(tmp_path / 'upright.pdf'), text="Caption", image_size=(300, 400)))
+    rotated = fitz.open(make_pdf(str(tmp_path / 'rotated.pdf'), text="Caption", image_size=(300, 400),
+                                 rotation=90))
+
+    assert plan_ocr(rotated) == plan_ocr(upright)
+
+    upright.close()
+    rotated.close()
+
+def test_drop_existing_words():
+    """
+    Test that only words not already on the page are kept.
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((130, 114), "hello")
+
+    assert drop_existing_words(page, WORDS) == [WORDS[1]]
+    assert drop_existing_words(doc.new_page(), WORDS) == WORDS
+    doc.close()
+
+@pytest.mark.parametrize('rotation', [0, 90, 180, 270])
+@pytest.mark.parametrize('size', [(595, 842), (842, 595)])
+def test_add_ocr_text(rotation, size):
+    """
+    Test that words are written invisibly into the boxes they were found in.
+    """
+    doc = fitz.open()
+    page = doc.new_page(width=size[0], height=size[1])
+    page.set_rotation(rotation)
+
+    assert add_ocr_text(page, WORDS)
+
+    words = read_words(page)
+    assert [word for _, word in words] == ['hello', 'world']
+    for (rect, _), (x0, y0, x1, y1, _) in zip(words, WORDS):
+        # The word fills the width of its box and sits on its baseline
+        assert rect.x0 == pytest.approx(x0 / 2, abs=0.5)
+        assert rect.x1 <= x1 / 2 + 0.5
+        assert rect.y0 < y1 / 2 < rect.y1 + 0.5
+    assert b'3 Tr' in page.read_contents()
+    doc.close()
+
+def test_add_ocr_text_without_words():
+    """
+    Test that nothing is written when no usable words were found.
+    """
+    doc = fitz.open()
+    page = doc.new_page()
+
+    assert not add_ocr_text(page, [])
+    add_ocr_text(page, [(10, 10, 10, 20, 'flat'), (10, 10, 20, 20, '')])
+    assert page.get_text("words") == []
+    doc.close()
+
+def test_backend_selection(backends, monkeypatch):
+    """
+    Test that the named, configured or first available backend is used, and
+    reused after that.
+    """
+    monkeypatch.setattr(ocr_backends, 'DEFAULT_BACKEND_ORDER', ['missing', 'fake'])
+
+    backend = get_ocr_backend()
+    assert isinstance(backend, FakeBackend)
+    assert get_ocr_backend('fake') is backend
+    assert get_ocr_backend('missing') is None
+    assert get_ocr_backend('unknown') is None
+
+    monkeypatch.setenv('OCR_BACKEND', 'missing')
+    assert get_ocr_backend() is None
+    assert get_ocr_backend('fake') is backend
+
+def test_perform_ocr_only_recognises_planned_pages(tmp_path, backends):
+    """
+    Test that only scanned and mixed pages are recognised, and that their
+    words are added to the output.
+    """
+    input_path = str(tmp_path / 'input.pdf')
+    doc = fitz.open()
+    text_page = doc.new_page()
+    text_page.insert_text((72, 72), "Vector text")
+    scanned_page = doc.new_page()
+    pixmap = fitz.Pixmap(fitz.csRGB, 300, 400, bytes(300 * 400 * 3), False)
+    scanned_page.insert_image(fitz.Rect(72, 144, 372, 544), pixmap=pixmap)
+    scanned_page.set_rotation(90)
+    doc.save(input_path)
+    doc.close()
+
+    output_path = str(tmp_path / 'output.pdf')
+    result = perform_ocr(input_path, output_path, ocr_backend='fake')
+
+    assert result['ocr_backend'] == 'fake'
+    assert result['ocr_pages'] == [2]
+    assert result['page_classes'] == {PAGE_VECTOR_TEXT: 1, PAGE_SCANNED: 1, PAGE_MIXED: 0}
+    assert result['text_found']
+    with fitz.open(output_path) as output:
+        assert [word for _, word in read_words(output[0])] == ['Vector', 'text']
+        words = read_words(output[1])
+        assert [word for _, word in words] == ['hello', 'world']
+        assert words[0][0].x0 == pytest.approx(100, abs=0.5)
@@ -0,0 +1,37 @@
+"""
+Test PDF to image conversion.
+This script checks that long documents are rendered by the worker processes
+and that short ones are rendered in-process, with the same results.
+"""
+
+import os
+from tools.convert_from_pdf.pdf_to_image import convert_pdf_to_images
+from tools.utils.worker_reply import parse_worker_reply
+from pdf_factory import make_pdf
+
+def test_worker_reply_after_other_output():
+    """
+    Test that a worker reply is found after anything a library printed.
+    """
+    reply = parse_worker_reply('warning: something is deprecated\n{"output_files": ["a.png"]}\n', '', 0)
+    assert reply == {'output_files': ['a.png']}
+
+    reply = parse_worker_reply('', 'Traceback: boom\n', 1)
+    assert reply == {'error': 'Traceback: boom'}
+
+def test_convert_with_workers(tmp_path):
+    """
+    Test converting a document on several worker processes.
+    """
+    input_path = make_pdf(str(tmp_path / 'input.pdf'), 5)
+    (tmp_path / 'parallel').mkdir()
+    (tmp_path / 'serial').mkdir()
+
+    parallel = convert_pdf_to_images(input_path, str(tmp_path / 'parallel'), dpi=72, workers=3)
+    serial = convert_pdf_to_images(input_path, str(tmp_path / 'serial'), dpi=72, workers=1)
+
+    assert parallel['converted_pages'] == [1, 2, 3, 4, 5]
+    assert [os.path.basename(path) for path in parallel['output_files']] == \
+        [os.path.basename(path) for path in serial['output_files']]
+    for path in parallel['output_files']:
+        assert os.path.getsize(path) > 0
@@ -0,0 +1,106 @@
+"""
+Test the editor page previews.
+This script checks that large pages are shown as tiles over a low-resolution
+preview, that small pages are shown as one image, and that the tiles the
+viewer asks for are served at the right size.
+"""
+
+import io
+import fitz  # PyMuPDF
+import pytest
+from PIL import Image
+from app import create_app
+from tools.edit.preview import needs_tiles, MIN_PREVIEW_DPI, TILE_SIZE
+
+# Page sizes in points
+A4 = (595, 842)
+A0 = (2384, 3370)
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Get the app with its storage in a temporary directory.
+    """
+    return create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'JOB_QUEUE_PATH': str(tmp_path / 'jobs.sqlite3'),
+        'RESULT_CACHE_DIR': str(tmp_path / 'results'),
+        'BLOB_STORE_DIR': str(tmp_path / 'blobs'),
+        'PREVIEW_CACHE_DIR': str(tmp_path / 'previews'),
+        'SECURE_STORAGE_DIR': str(tmp_path / 'secure'),
+        'SESSION_COOKIE_SECURE': False,
+        'TALISMAN_FORCE_HTTPS': False,
+    })
+
+def upload(app, name, size):
+    """
+    Put a one-page PDF in the upload folder.
+
+    Args:
+        app (Flask): The app.
+        name (str): Name of the PDF.
+        size (tuple): Page width and height in points.
+    """
+    doc = fitz.open()
+    doc.new_page(width=size[0], height=size[1]).insert_text((72, 72), "Page 1")
+    doc.save(f"{app.config['UPLOAD_FOLDER']}/{name}")
+    doc.close()
+
+def get(client, url):
+    """
+    Get a URL from the app over HTTPS.
+
+    Args:
+        client (FlaskClient): The test client.
+        url (str): The URL.
+
+    Returns:
+        TestResponse: The response.
+    """
+    return client.get(url, base_url='https://localhost')
+
+def test_needs_tiles():
+    """
+    Test that only pages too large for one preview image are tiled.
+    """
+    assert not needs_tiles(*A4)
+    assert needs_tiles(*A0)
+
+@pytest.mark.parametrize('editor', ['content', 'signature'])
+def test_editor_tiles_large_pages(app, editor):
+    """
+    Test that the editors show a large page as tiles over a small preview.
+    """
+    upload(app, 'large.pdf', A0)
+    upload(app, 'small.pdf', A4)
+    client = app.test_client()
+
+    page = get(client, f'/edit/{editor}?filename=large.pdf').get_data(as_text=True)
+    assert 'data-tile-info-url="/edit/tiles/large.pdf/1"' in page
+    assert f'dpi={MIN_PREVIEW_DPI}' in page
+    assert 'js/tiled-preview.js' in page
+
+    page = get(client, f'/edit/{editor}?filename=small.pdf').get_data(as_text=True)
+    assert 'data-tile-info-url' not in page
+
+def test_tiles(app):
+    """
+    Test that the tile URLs in the tile info serve tiles cut to the page.
+    """
+    upload(app, 'large.pdf', A0)
+    client = app.test_client()
+
+    info = get(client, '/edit/tiles/large.pdf/1').get_json()
+    level = info['levels'][2]
+    assert (info['width'], info['height']) == A0
+    assert (level['scale'], level['columns'], level['rows']) == (1.0, 10, 14)
+
+    url = info['tile_url'].replace('{level}', '2')
+    first = get(client, url.replace('{column}', '0').replace('{row}', '0'))
+    last = get(client, url.replace('{column}', '9').replace('{row}', '13'))
+    assert first.mimetype == 'image/png'
+    assert Image.open(io.BytesIO(first.data)).size == (TILE_SIZE, TILE_SIZE)
+    assert Image.open(io.BytesIO(last.data)).size == (A0[0] - 9 * TILE_SIZE, A0[1] - 13 * TILE_SIZE)
+    assert get(client, url.replace('{column}', '10').replace('{row}', '0')).status_code == 404
@@ -0,0 +1,74 @@
+"""
+Test the process pool.
+This script checks that tasks run in child processes that are replaced after
+their task limit, and that a slot whose replacement child fails to start is
+kept and started again by the next task.
+"""
+
+import os
+import pytest
+from app.security import process_pool
+from app.security.process_pool import ProcessPool
+
+class FlakyChild(process_pool._Child):
+    """A child process that fails to start when told to."""
+
+    fail = False
+
+    def __init__(self, context):
+        if FlakyChild.fail:
+            FlakyChild.fail = False
+            raise OSError("no more processes")
+        super().__init__(context)
+
+@pytest.fixture
+def pool(monkeypatch):
+    """
+    Get a one-child pool that replaces its child after every task.
+    """
+    monkeypatch.setattr(process_pool, '_Child', FlakyChild)
+    monkeypatch.setattr(FlakyChild, 'fail', False)
+    pool = ProcessPool(size=1, max_tasks_per_child=1)
+    yield pool
+    pool.close()
+
+def test_children_replaced(pool):
+    """
+    Test that each task gets a fresh child once the last one hit its limit.
+    """
+    first = pool.run(os.getpid)
+    second = pool.run(os.getpid)
+
+    assert first != second
+    assert os.getpid() not in (first, second)
+
+def test_failed_replacement_keeps_slot(pool):
+    """
+    Test that a replacement child that fails to start leaves an empty slot
+    that the next task starts a child for.
+    """
+    pool.run(os.getpid)
+
+    FlakyChild.fail = True
+    first = pool.run(os.getpid)
+    assert not FlakyChild.fail
+    assert list(pool._idle.queue) == [None]
+
+    second = pool.run(os.getpid)
+    assert second != first
+    assert pool._started == 1
+
+def test_failed_start_on_empty_slot(pool):
+    """
+    Test that an empty slot stays in the pool if its child fails to start.
+    """
+    pool.run(os.getpid)
+    FlakyChild.fail = True
+    pool.run(os.getpid)
+
+    FlakyChild.fail = True
+    with pytest.raises(OSError):
+        pool.run(os.getpid)
+
+    assert pool.run(os.getpid) != os.getpid()
+    assert pool._started == 1
@@ -0,0 +1,131 @@
+"""
+Test the tool result cache.
+This script checks that a repeated tool call is served from the cache with
+its paths rewritten for the new call, that different inputs or options miss,
+that only enum options are compared without regard to case, and that degraded
+results are never cached.
+"""
+
+import os
+from app.jobs.cache import ResultCache, normalise_params
+
+def write_file(path, data):
+    """
+    Write bytes to a file.
+
+    Args:
+        path (str): Path to the file.
+        data (bytes): Contents of the file.
+    """
+    with open(path, 'wb') as f:
+        f.write(data)
+
+def test_hit_restores_output(tmp_path):
+    """
+    Test that a cached single-file output is copied to the new output path.
+    """
+    cache = ResultCache(os.path.join(tmp_path, 'cache'))
+    write_file(os.path.join(tmp_path, 'a.pdf'), b'%PDF-input')
+    first = {'input_path': os.path.join(tmp_path, 'a.pdf'),
+             'output_path': os.path.join(tmp_path, 'a_compressed.pdf'),
+             'compression_level': 'medium'}
+    write_file(first['output_path'], b'%PDF-compressed')
+
+    key = cache.make_key('compress_pdf', first)
+    assert cache.get(key, 'compress_pdf', first) is None
+    cache.put(key, 'compress_pdf', first, {'output_path': first['output_path'], 'compression_ratio': 12.5})
+
+    # Same content under another name, with the option written differently
+    write_file(os.path.join(tmp_path, 'b.pdf'), b'%PDF-input')
+    second = {'input_path': os.path.join(tmp_path, 'b.pdf'),
+              'output_path': os.path.join(tmp_path, 'b_compressed.pdf'),
+              'compression_level': ' Medium'}
+    assert cache.make_key('compress_pdf', second) == key
+
+    result = cache.get(key, 'compress_pdf', second)
+    assert result == {'output_path': second['output_path'], 'compression_ratio': 12.5}
+    with open(second['output_path'], 'rb') as f:
+        assert f.read() == b'%PDF-compressed'
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores']) == (1, 1, 1)
+
+def test_hit_restores_output_dir(tmp_path):
+    """
+    Test that cached output directories are restored with file names and
+    result paths matching the new input.
+    """
+    cache = ResultCache(os.path.join(tmp_path, 'cache'))
+    write_file(os.path.join(tmp_path, 'report.pdf'), b'%PDF-pages')
+    first = {'input_path': os.path.join(tmp_path, 'report.pdf'),
+             'output_dir': os.path.join(tmp_path, 'first'), 'dpi': 72}
+    os.makedirs(first['output_dir'])
+    page_path = os.path.join(first['output_dir'], 'report_page_1.png')
+    write_file(page_path, b'png')
+
+    key = cache.make_key('convert_pdf_to_images', first)
+    cache.put(key, 'convert_pdf_to_images', first, {'output_files': [page_path]})
+
+    write_file(os.path.join(tmp_path, 'invoice.pdf'), b'%PDF-pages')
+    second = {'input_path': os.path.join(tmp_path, 'invoice.pdf'),
+              'output_dir': os.path.join(tmp_path, 'second'), 'dpi': 72}
+
+    result = cache.get(key, 'convert_pdf_to_images', second)
+    expected = os.path.join(second['output_dir'], 'invoice_page_1.png')
+    assert result == {'output_files': [expected]}
+    assert os.path.isfile(expected)
+
+def test_misses_and_degraded_results(tmp_path):
+    """
+    Test that other inputs and options get other keys, and that results of
+    tools that fell back to the unchanged input are not stored.
+    """
+    cache = ResultCache(os.path.join(tmp_path, 'cache'))
+    input_path = os.path.join(tmp_path, 'a.pdf')
+    output_path = os.path.join(tmp_path, 'a_ocr.pdf')
+    write_file(input_path, b'%PDF-scan')
+    write_file(output_path, b'%PDF-scan')
+    kwargs = {'input_path': input_path, 'output_path': output_path, 'language': 'eng'}
+
+    key = cache.make_key('perform_ocr', kwargs)
+    assert key != cache.make_key('perform_ocr', dict(kwargs, language='deu'))
+    assert key != cache.make_key('perform_ocr', dict(kwargs, language='ENG'))
+    assert cache.make_key('merge_pdfs', kwargs) is None
+
+    cache.put(key, 'perform_ocr', kwargs, {'output_path': output_path, 'tesseract_missing': True})
+    assert cache.get(key, 'perform_ocr', kwargs) is None
+    assert cache.stats()['stores'] == 0
+
+    write_file(input_path, b'%PDF-other-scan')
+    assert cache.make_key('perform_ocr', kwargs) != key
+
+def test_normalise_params():
+    """
+    Test that paths are dropped and only enum options are folded.
+    """
+    kwargs = {'input_path': 'a.pdf', 'image_format': ' PNG', 'pages': '1, 3'}
+
+    assert normalise_params(kwargs) == '{"image_format": " PNG", "pages": "1, 3"}'
+    assert normalise_params(kwargs, ('image_format',)) == '{"image_format": "png", "pages": "1, 3"}'
+
+def test_evict_over_size_limit(tmp_path):
+    """
+    Test that the least recently used entries are evicted once the cache is
+    over its size limit.
+    """
+    cache = ResultCache(os.path.join(tmp_path, 'cache'), max_bytes=2500)
+    keys = []
+    for name in ('a', 'b', 'c'):
+        kwargs = {'input_path': os.path.join(tmp_path, f"{name}.pdf"),
+                  'output_path': os.path.join(tmp_path, f"{name}_repaired.pdf")}
+        write_file(kwargs['input_path'], name.encode())
+        write_file(kwargs['output_path'], b'\0' * 1000)
+        key = cache.make_key('repair_pdf', kwargs)
+        cache.put(key, 'repair_pdf', kwargs, {'output_path': kwargs['output_path']})
+        keys.append((key, kwargs))
+
+    stats = cache.stats()
+    assert stats['entries'] == 2
+    assert stats['evictions'] == 1
+    assert cache.get(keys[0][0], 'repair_pdf', keys[0][1]) is None
+    assert cache.get(keys[2][0], 'repair_pdf', keys[2][1]) is not None
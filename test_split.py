@@ -0,0 +1,74 @@
+"""
+Test PDF splitting.
+This script checks that long splits are written by the worker processes,
+that the parts match a split written in-process, and that splits by size
+respect the size limit.
+"""
+
+import os
+from tools.organize.split import split_pdf
+from pdf_factory import make_pdf, read_page_texts
+
+def read_parts(output_files):
+    """
+    Get the text of each page of each part.
+
+    Args:
+        output_files (list): Paths to the parts.
+
+    Returns:
+        list: For each part, the text of its pages.
+    """
+    return [read_page_texts(path) for path in output_files]
+
+def test_split_pages_with_workers(tmp_path):
+    """
+    Test splitting every page into its own file on several worker processes.
+    """
+    input_path = make_pdf(str(tmp_path / 'input.pdf'), 20)
+
+    parallel = split_pdf(input_path, str(tmp_path / 'parallel'), 'pages', workers=4)
+    serial = split_pdf(input_path, str(tmp_path / 'serial'), 'pages', workers=1)
+
+    assert parallel['output_count'] == 20
+    assert read_parts(parallel['output_files']) == [[f"Page {n}"] for n in range(1, 21)]
+    assert read_parts(parallel['output_files']) == read_parts(serial['output_files'])
+
+def test_split_ranges_with_manifest(tmp_path):
+    """
+    Test splitting by page ranges and writing a manifest.
+    """
+    input_path = make_pdf(str(tmp_path / 'input.pdf'), 6)
+
+    result = split_pdf(input_path, str(tmp_path / 'ranges'), 'range',
+                       page_ranges='1-2,3,4-6', manifest=True)
+
+    assert read_parts(result['output_files']) == [['Page 1', 'Page 2'], ['Page 3'],
+                                                  ['Page 4', 'Page 5', 'Page 6']]
+    assert os.path.exists(result['manifest_file'])
+
+def test_split_by_size(tmp_path):
+    """
+    Test that splitting by size keeps each part under the limit, unless it
+    is a single page larger than the limit, and keeps every page in order.
+    """
+    input_path = make_pdf(str(tmp_path / 'input.pdf'), 60, image_size=(200, 200))
+
+    result = split_pdf(input_path, str(tmp_path / 'size'), 'size', max_size=1)
+
+    parts = read_parts(result['output_files'])
+    assert len(parts) > 1
+    assert [text for part in parts for text in part] == [f"Page {n}" for n in range(1, 61)]
+    for path, part in zip(result['output_files'], parts):
+        assert os.path.getsize(path) <= 1024 * 1024 or len(part) == 1
+
+def test_split_by_size_oversized_pages(tmp_path):
+    """
+    Test that pages larger than the limit each get a part of their own.
+    """
+    input_path = make_pdf(str(tmp_path / 'input.pdf'), 3, image_size=(400, 1000))
+
+    result = split_pdf(input_path, str(tmp_path / 'size'), 'size', max_size=1)
+
+    assert read_parts(result['output_files']) == [['Page 1'], ['Page 2'], ['Page 3']]
+    assert all(os.path.getsize(path) > 1024 * 1024 for path in result['output_files'])
@@ -0,0 +1,122 @@
+"""
+Test the storage sweeper.
+This script checks that artefacts in the upload folder are expired once they
+go unused, that using them keeps them, and that the least recently used ones
+are evicted when storage is over its limit.
+"""
+
+import os
+import time
+import sqlite3
+from app.storage.lifecycle import StorageManager
+
+def make_manager(directory, **kwargs):
+    """
+    Create a storage manager for an upload folder in a temporary directory.
+
+    Args:
+        directory (str): Directory to keep the upload folder and index in.
+        **kwargs: Extra arguments for StorageManager.
+
+    Returns:
+        StorageManager: The storage manager.
+    """
+    upload_dir = os.path.join(directory, 'uploads')
+    os.makedirs(upload_dir)
+    return StorageManager(upload_dir, os.path.join(directory, 'storage', 'artefacts.sqlite3'), **kwargs)
+
+def write_artefact(manager, name, size=1024):
+    """
+    Write a file to the upload folder and register it.
+
+    Args:
+        manager (StorageManager): The storage manager.
+        name (str): Name of the file.
+        size (int, optional): Size of the file in bytes. Defaults to 1024.
+
+    Returns:
+        str: Path to the file.
+    """
+    path = os.path.join(manager.upload_dir, name)
+    with open(path, 'wb') as f:
+        f.write(b'\0' * size)
+    manager.register(path)
+    return path
+
+def set_times(manager, name, created_at, last_access):
+    """
+    Change when an artefact was created and last used.
+
+    Args:
+        manager (StorageManager): The storage manager.
+        name (str): Name of the artefact.
+        created_at (float): Creation time.
+        last_access (float): Time of the last access.
+    """
+    conn = sqlite3.connect(manager.db_path)
+    try:
+        conn.execute("UPDATE artefacts SET created_at = ?, last_access = ? WHERE name = ?",
+                     (created_at, last_access, name))
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_expire_unused_artefacts(tmp_path):
+    """
+    Test that artefacts expire once unused for the TTL, however old they are.
+    """
+    manager = make_manager(tmp_path, ttl=60)
+    old_in_use = write_artefact(manager, 'edited_a.pdf')
+    unused = write_artefact(manager, 'b.pdf')
+    fresh = write_artefact(manager, 'c.pdf')
+
+    long_ago = time.time() - 3600
+    set_times(manager, 'edited_a.pdf', long_ago, long_ago)
+    set_times(manager, 'b.pdf', long_ago, long_ago)
+    manager.touch_paths([old_in_use])
+
+    result = manager.sweep()
+
+    assert result['expired'] == 1
+    assert os.path.exists(old_in_use)
+    assert not os.path.exists(unused)
+    assert os.path.exists(fresh)
+
+def test_touch_paths_inside_artefacts(tmp_path):
+    """
+    Test that touching a file inside a job's output directory keeps the
+    whole directory, and that paths outside the upload folder are ignored.
+    """
+    manager = make_manager(tmp_path, ttl=60)
+    job_dir = os.path.join(manager.upload_dir, 'split_job1')
+    os.makedirs(job_dir)
+    part = os.path.join(job_dir, 'part_1.pdf')
+    with open(part, 'wb') as f:
+        f.write(b'%PDF')
+    manager.register(job_dir)
+
+    long_ago = time.time() - 3600
+    set_times(manager, 'split_job1', long_ago, long_ago)
+    manager.touch_paths([part, os.path.join(tmp_path, 'elsewhere.pdf'), None])
+
+    assert manager.sweep()['expired'] == 0
+    assert os.path.exists(part)
+
+def test_evict_least_recently_used(tmp_path):
+    """
+    Test that eviction removes the least recently used artefacts first.
+    """
+    manager = make_manager(tmp_path, ttl=3600, max_bytes=2500)
+    paths = [write_artefact(manager, f"{name}.pdf") for name in ('a', 'b', 'c')]
+
+    now = time.time()
+    set_times(manager, 'a.pdf', now - 1800, now - 600)
+    set_times(manager, 'b.pdf', now - 1800, now - 1200)
+    set_times(manager, 'c.pdf', now - 1800, now - 900)
+
+    result = manager.sweep()
+
+    assert result['evicted'] == 2
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert not os.path.exists(paths[2])
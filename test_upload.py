@@ -0,0 +1,77 @@
+"""
+Test upload ingestion.
+This script checks that uploads are copied to disk with their hash and type,
+that uploads of a type the tool doesn't take are rejected and removed, and
+that rejected uploads never reach the blob store.
+"""
+
+import io
+import os
+import pytest
+from flask import Flask
+from werkzeug.datastructures import FileStorage
+from app.errors import PDFProcessingError
+from app.security.file_validation import ingest_upload, IMAGE_MIME_TYPES, PDF_MIME_TYPES
+from app.storage.blobs import BlobStore
+from pdf_factory import make_pdf
+
+@pytest.fixture
+def app():
+    """
+    Get an app to ingest uploads in the request context of.
+    """
+    app = Flask(__name__)
+    with app.test_request_context():
+        yield app
+
+def make_upload(data, filename):
+    """
+    Get an uploaded file.
+
+    Args:
+        data (bytes): Content of the file.
+        filename (str): Name the client gave the file.
+
+    Returns:
+        FileStorage: The upload.
+    """
+    return FileStorage(stream=io.BytesIO(data), filename=filename)
+
+def test_ingest_pdf(app, tmp_path):
+    """
+    Test that a PDF is accepted as a PDF and its type recorded.
+    """
+    make_pdf(str(tmp_path / 'input.pdf'))
+    data = (tmp_path / 'input.pdf').read_bytes()
+    dest_path = str(tmp_path / 'upload.pdf')
+
+    info = ingest_upload(make_upload(data, 'input.pdf'), dest_path, allowed_types=PDF_MIME_TYPES)
+
+    assert info['mime_type'] == 'application/pdf'
+    assert info['size'] == len(data)
+    assert (tmp_path / 'upload.pdf').read_bytes() == data
+
+@pytest.mark.parametrize('allowed_types', [PDF_MIME_TYPES, IMAGE_MIME_TYPES])
+def test_reject_other_types(app, tmp_path, allowed_types):
+    """
+    Test that content of another type is rejected, whatever it is called,
+    and that nothing is left behind or stored.
+    """
+    store = BlobStore(str(tmp_path / 'blobs'))
+    dest_path = str(tmp_path / 'upload.pdf')
+
+    with pytest.raises(PDFProcessingError) as error:
+        ingest_upload(make_upload(b'#!/bin/sh\necho not a document\n', 'input.pdf'), dest_path,
+                      store=store, allowed_types=allowed_types)
+
+    assert error.value.status_code == 415
+    assert not os.path.exists(dest_path)
+    assert store.stats()['blobs'] == 0
+
+def test_any_type_without_allowed_types(app, tmp_path):
+    """
+    Test that the type is only recorded when no types are required.
+    """
+    info = ingest_upload(make_upload(b'plain text\n', 'notes.txt'), str(tmp_path / 'notes.txt'))
+
+    assert info['mime_type'] == 'text/plain'
@@ -6,13 +6,20 @@ It uses PyMuPDF (fitz) to render PDF pages as images.
 """
 
 import os
+import sys
+import json
 import logging
+import subprocess
+import io
+import time
+import tempfile
+import tracemalloc
 import fitz  # PyMuPDF
 from PIL import Image
-import io
-import zipfile
 from app.errors import PDFProcessingError
 from tools.organize.split import parse_page_ranges
+from tools.convert_from_pdf.render_worker import render_pages, save_pixmap, FORMAT_MAP
+from tools.utils.worker_reply import parse_worker_reply
 
 # Configure logging
 logging.basicConfig(
@@ -21,7 +28,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, pages='all'):
+# Number of processes used to render a document. Each tool job runs in its own
+# process pool child, so a default of one per CPU would start CPUs squared
+# processes when the pool is busy; a few workers per job is enough
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', 0)) or min(4, os.cpu_count() or 1)
+
+# Documents with fewer pages to render than this are rendered in-process,
+# since starting the workers would cost more than it saves
+PARALLEL_MIN_PAGES = 4
+
+# Maximum time in seconds a render worker may take
+RENDER_TIMEOUT = 600
+
+# Script run by each render worker process
+RENDER_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'render_worker.py')
+
+def render_pages_parallel(input_path, pages, output_dir, base_filename, image_format, dpi, workers):
+    """
+    Render pages of a document on several worker processes.
+
+    Pages are dealt out to the workers in turn, so each gets a share of any
+    heavy run of pages. The workers are plain subprocesses rather than a
+    multiprocessing pool because tools already run in daemonic pool children.
+
+    Args:
+        input_path (str): Path to the PDF file.
+        pages (list): 1-based page numbers to render.
+        output_dir (str): Directory to write the images to.
+        base_filename (str): Name the image filenames start with.
+        image_format (str): 'png', 'jpg' or 'tiff'.
+        dpi (int): Resolution in DPI.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: Paths to the image files, in the order of pages.
+
+    Raises:
+        PDFProcessingError: If a worker fails.
+    """
+    slices = [pages[index::workers] for index in range(workers)]
+    processes = []
+
+    try:
+        for page_slice in slices:
+            job = json.dumps({
+                'input_path': input_path, 'output_dir': output_dir, 'pages': page_slice,
+                'base_filename': base_filename, 'image_format': image_format, 'dpi': dpi
+            })
+            process = subprocess.Popen(
+                [sys.executable, RENDER_WORKER_SCRIPT, job],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            processes.append((page_slice, process))
+
+        rendered = {}
+        deadline = time.monotonic() + RENDER_TIMEOUT
+        for page_slice, process in processes:
+            try:
+                stdout, stderr = process.communicate(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                raise PDFProcessingError("Rendering the pages took too long.")
+
+            reply = parse_worker_reply(stdout, stderr, process.returncode)
+
+            if 'error' in reply:
+                raise PDFProcessingError(f"Failed to render pages: {reply['error']}")
+
+            rendered.update(zip(page_slice, reply['output_files']))
+
+        return [rendered[page_num] for page_num in pages]
+
+    finally:
+        # Stop the other workers if one of them failed
+        for page_slice, process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.communicate()
+
+def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, pages='all', workers=None):
     """
     Convert PDF pages to images.
     
@@ -34,6 +120,8 @@ def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, p
             Defaults to 300.
         pages (str, optional): String specifying which pages to convert, e.g., '1,3,5-7' or 'all'.
             Defaults to 'all'.
+        workers (int, optional): Number of processes to render with. Defaults to
+            RENDER_WORKERS; short documents are always rendered in-process.
     
     Returns:
         dict: A dictionary containing information about the conversion:
@@ -61,14 +149,6 @@ def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, p
         if image_format == 'jpeg':
             image_format = 'jpg'
         
-        # Map format to PIL format string
-        format_map = {
-            'png': 'PNG',
-            'jpg': 'JPEG',
-            'tiff': 'TIFF'
-        }
-        pil_format = format_map[image_format]
-        
         # Validate DPI
         try:
             dpi = int(dpi)
@@ -85,6 +165,7 @@ def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, p
         
         # Get the input page count
         input_page_count = doc.page_count
+        doc.close()
         
         # Determine which pages to convert
         pages_to_convert = []
@@ -107,42 +188,13 @@ def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, p
         base_filename = os.path.splitext(base_filename)[0]
         
         # Convert the specified pages
-        output_files = []
-        for page_num in pages_to_convert:
-            # Page numbers are 1-based in the input, but 0-based in PyMuPDF
-            page = doc[page_num - 1]
-            
-            # Calculate the zoom factor based on DPI
-            # 72 DPI is the base resolution in PyMuPDF
-            zoom = dpi / 72
-            
-            # Create a matrix for rendering at the specified DPI
-            mat = fitz.Matrix(zoom, zoom)
-            
-            # Render the page as a pixmap
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            
-            # Generate output filename
-            output_filename = f"{base_filename}_page_{page_num}.{image_format}"
-            output_path = os.path.join(output_dir, output_filename)
-            
-            # Convert pixmap to PIL Image and save
-            img_data = pix.tobytes("ppm")  # Convert to PPM format
-            img = Image.open(io.BytesIO(img_data))
-            
-            # Save with format-specific options
-            if pil_format == 'JPEG':
-                img.save(output_path, format=pil_format, quality=95)
-            elif pil_format == 'PNG':
-                img.save(output_path, format=pil_format)
-            elif pil_format == 'TIFF':
-                img.save(output_path, format=pil_format, compression='tiff_lzw')
-            
-            # Add to output files list
-            output_files.append(output_path)
-        
-        # Close the document
-        doc.close()
+        workers = min(workers or RENDER_WORKERS, len(pages_to_convert))
+        if workers > 1 and len(pages_to_convert) >= PARALLEL_MIN_PAGES:
+            output_files = render_pages_parallel(input_path, pages_to_convert, output_dir,
+                                                 base_filename, image_format, dpi, workers)
+        else:
+            output_files = render_pages(input_path, pages_to_convert, output_dir,
+                                        base_filename, image_format, dpi)
         
         return {
             'input_page_count': input_page_count,
@@ -161,33 +213,68 @@ def convert_pdf_to_images(input_path, output_dir, image_format='png', dpi=300, p
         raise PDFProcessingError(f"Failed to convert PDF to images: {str(e)}")
 
 
-def create_images_zip(image_paths, output_path):
+def _save_pixmap_via_ppm(pix, output_path, image_format):
+    """Write a rendered page the way it was done before save_pixmap, for comparison."""
+    img = Image.open(io.BytesIO(pix.tobytes("ppm")))
+    if image_format == 'jpg':
+        img.save(output_path, format='JPEG', quality=95)
+    elif image_format == 'tiff':
+        img.save(output_path, format='TIFF', compression='tiff_lzw')
+    else:
+        img.save(output_path, format=FORMAT_MAP[image_format])
+
+
+def benchmark_image_export(input_path, dpis=(300, 600), image_format='png', max_pages=5):
     """
-    Create a ZIP archive containing the specified images.
-    
+    Compare the time and memory taken to write rendered pages through a PPM
+    round-trip with the direct path used by save_pixmap.
+
+    Memory is the peak of Python allocations while writing a page (e.g. the
+    PPM bytes and their BytesIO copy); rendering the page is not counted.
+
     Args:
-        image_paths (list): List of paths to the image files.
-        output_path (str): Path where the ZIP archive will be saved.
-    
+        input_path (str): Path to a PDF file.
+        dpis (tuple, optional): Resolutions to compare. Defaults to 300 and 600.
+        image_format (str, optional): 'png', 'jpg' or 'tiff'. Defaults to 'png'.
+        max_pages (int, optional): Number of pages to use. Defaults to 5.
+
     Returns:
-        str: Path to the ZIP archive.
-    
-    Raises:
-        PDFProcessingError: If the ZIP creation fails.
+        dict: Dictionary mapping each DPI to a dictionary mapping 'ppm' and
+            'direct' to the average 'seconds' and peak 'bytes' per page.
     """
-    try:
-        # Create a ZIP file
-        with zipfile.ZipFile(output_path, 'w') as zipf:
-            # Add each image to the ZIP file
-            for image_path in image_paths:
-                # Get the filename without the path
-                filename = os.path.basename(image_path)
-                
-                # Add the file to the ZIP
-                zipf.write(image_path, filename)
-        
-        return output_path
-    
-    except Exception as e:
-        logger.error(f"Error creating ZIP archive: {str(e)}")
-        raise PDFProcessingError(f"Failed to create ZIP archive: {str(e)}")
+    doc = fitz.open(input_path)
+    results = {}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, f"page.{image_format}")
+
+        for dpi in dpis:
+            zoom = dpi / 72
+            totals = {'ppm': [0.0, 0], 'direct': [0.0, 0]}
+            page_count = min(max_pages, doc.page_count)
+
+            for page_index in range(page_count):
+                pix = doc[page_index].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+                for name, save in (('ppm', lambda: _save_pixmap_via_ppm(pix, output_path, image_format)),
+                                   ('direct', lambda: save_pixmap(pix, output_path, image_format, dpi))):
+                    tracemalloc.start()
+                    start_time = time.perf_counter()
+                    save()
+                    totals[name][0] += time.perf_counter() - start_time
+                    totals[name][1] = max(totals[name][1], tracemalloc.get_traced_memory()[1])
+                    tracemalloc.stop()
+
+            results[dpi] = {
+                name: {'seconds': seconds / page_count if page_count else 0, 'bytes': peak}
+                for name, (seconds, peak) in totals.items()
+            }
+
+    doc.close()
+    return results
+
+
+if __name__ == '__main__':
+    # Usage: python -m tools.convert_from_pdf.pdf_to_image file.pdf [png|jpg|tiff]
+    for dpi, result in benchmark_image_export(sys.argv[1], image_format=(sys.argv[2:3] or ['png'])[0]).items():
+        print(f"{dpi} DPI: {result}")
@@ -2,14 +2,23 @@
 PDF to Panoramic Module
 
 This module provides functionality for creating panoramic images from PDF pages.
-It uses PyMuPDF (fitz) to render PDF pages and PIL to stitch them together.
+It uses PyMuPDF (fitz) to render PDF pages and stitches them together a band
+of rows at a time, so memory use does not grow with the number of pages.
+
+The layout is worked out from the page sizes before anything is rendered.
+Pages are then rendered one at a time and spooled to a temporary file, and
+the panorama is assembled from that file in bands of full-width rows that go
+straight to the image encoder.
 """
 
 import os
+import mmap
+import struct
+import zlib
+import tempfile
 import logging
 import fitz  # PyMuPDF
 from PIL import Image
-import io
 from app.errors import PDFProcessingError
 from tools.organize.split import parse_page_ranges
 
@@ -20,6 +29,273 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of panorama rows assembled and encoded at a time
+BAND_ROWS = 64
+
+# Largest width or height a JPEG can have
+MAX_JPEG_SIZE = 65500
+
+# Background colour around and between pages
+WHITE = b'\xff\xff\xff'
+
+
+class _PNGWriter:
+    """Writes an RGB PNG a band of rows at a time."""
+
+    # Size of compressed data collected before an IDAT chunk is written
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path, width, height, dpi):
+        self.file = open(path, 'wb')
+        self.width = width
+        self.compressor = zlib.compressobj(6)
+        self.pending = []
+        self.pending_size = 0
+
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        pixels_per_metre = int(round(dpi / 0.0254))
+        self._chunk(b'pHYs', struct.pack('>IIB', pixels_per_metre, pixels_per_metre, 1))
+
+    def _chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff))
+
+    def _flush(self):
+        if self.pending:
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def _add(self, data):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+            if self.pending_size >= self.CHUNK_SIZE:
+                self._flush()
+
+    def write_rows(self, band):
+        row_size = self.width * 3
+        for start in range(0, len(band), row_size):
+            # Filter type 0 (none) before each row
+            self._add(self.compressor.compress(b'\x00'))
+            self._add(self.compressor.compress(band[start:start + row_size]))
+
+    def close(self):
+        self._add(self.compressor.flush())
+        self._flush()
+        self._chunk(b'IEND', b'')
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class _TIFFWriter:
+    """Writes an RGB TIFF with one Deflate-compressed strip per band of rows."""
+
+    def __init__(self, path, width, height, dpi):
+        self.file = open(path, 'wb')
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.strip_offsets = []
+        self.strip_byte_counts = []
+
+        # Header; the offset of the directory is filled in on close
+        self.file.write(b'II*\x00\x00\x00\x00\x00')
+
+    def write_rows(self, band):
+        data = zlib.compress(bytes(band), 6)
+        self.strip_offsets.append(self.file.tell())
+        self.strip_byte_counts.append(len(data))
+        self.file.write(data)
+
+    def _write_array(self, fmt, values):
+        """Write values after the image data, returning their offset."""
+        if self.file.tell() % 2:
+            self.file.write(b'\x00')
+        offset = self.file.tell()
+        self.file.write(struct.pack(f'<{len(values)}{fmt}', *values))
+        return offset
+
+    def close(self):
+        strips = len(self.strip_offsets)
+        bits_offset = self._write_array('H', [8, 8, 8])
+        resolution_offset = self._write_array('I', [self.dpi, 1])
+        offsets_offset = self._write_array('I', self.strip_offsets) if strips > 1 else self.strip_offsets[0]
+        counts_offset = self._write_array('I', self.strip_byte_counts) if strips > 1 else self.strip_byte_counts[0]
+
+        if self.file.tell() >= 2 ** 32:
+            raise PDFProcessingError("The panoramic image is too large for TIFF. Try a lower DPI.")
+
+        # (tag, type, count, value or offset); types 3 = SHORT, 4 = LONG, 5 = RATIONAL
+        entries = [
+            (256, 4, 1, self.width),
+            (257, 4, 1, self.height),
+            (258, 3, 3, bits_offset),
+            (259, 3, 1, 8),  # Deflate
+            (262, 3, 1, 2),  # RGB
+            (273, 4, strips, offsets_offset),
+            (277, 3, 1, 3),
+            (278, 4, 1, BAND_ROWS),
+            (279, 4, strips, counts_offset),
+            (282, 5, 1, resolution_offset),
+            (283, 5, 1, resolution_offset),
+            (284, 3, 1, 1),  # Chunky
+            (296, 3, 1, 2),  # Inches
+        ]
+
+        if self.file.tell() % 2:
+            self.file.write(b'\x00')
+        directory_offset = self.file.tell()
+        self.file.write(struct.pack('<H', len(entries)))
+        for tag, value_type, count, value in entries:
+            if value_type == 3 and count == 1:
+                self.file.write(struct.pack('<HHIHH', tag, value_type, count, value, 0))
+            else:
+                self.file.write(struct.pack('<HHII', tag, value_type, count, value))
+        self.file.write(struct.pack('<I', 0))
+
+        self.file.seek(4)
+        self.file.write(struct.pack('<I', directory_offset))
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+
+
+class _JPEGWriter:
+    """
+    Collects the panorama in a memory-mapped temporary file and encodes it
+    as a JPEG on close. The JPEG encoder needs the whole image, but a mapped
+    file is paged by the OS rather than held in process memory.
+    """
+
+    def __init__(self, path, width, height, dpi, temp_dir):
+        if width > MAX_JPEG_SIZE or height > MAX_JPEG_SIZE:
+            raise PDFProcessingError(
+                f"The panoramic image ({width}x{height} pixels) is too large for JPEG. "
+                f"Try PNG or TIFF, or a lower DPI."
+            )
+
+        self.path = path
+        self.width = width
+        self.height = height
+        self.dpi = dpi
+        self.canvas = tempfile.TemporaryFile(dir=temp_dir)
+
+    def write_rows(self, band):
+        # Stored as RGBX, which Pillow can use from the mapped file without copying it
+        rows = len(band) // (self.width * 3)
+        img = Image.frombuffer('RGB', (self.width, rows), band, 'raw', 'RGB', 0, 1)
+        self.canvas.write(img.convert('RGBX').tobytes())
+
+    def close(self):
+        self.canvas.flush()
+        with mmap.mmap(self.canvas.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            img = Image.frombuffer('RGBX', (self.width, self.height), mapped, 'raw', 'RGBX', 0, 1)
+            img.save(self.path, format='JPEG', quality=95, dpi=(self.dpi, self.dpi))
+            del img
+        self.canvas.close()
+
+    def abort(self):
+        self.canvas.close()
+
+
+def layout_pages(doc, pages, zoom, direction, spacing):
+    """
+    Work out where each page goes in the panorama without rendering anything.
+
+    Args:
+        doc (fitz.Document): The open document.
+        pages (list): 1-based page numbers, in panorama order.
+        zoom (float): Render scale.
+        direction (str): 'horizontal' or 'vertical'.
+        spacing (int): Spacing between pages in pixels.
+
+    Returns:
+        tuple: (width, height, boxes), where boxes is a list of
+            (x, y, width, height) in panorama pixels, one per page.
+    """
+    matrix = fitz.Matrix(zoom, zoom)
+    sizes = []
+    for page_num in pages:
+        # Page numbers are 1-based in the input, but 0-based in PyMuPDF
+        irect = (doc[page_num - 1].rect * matrix).irect
+        sizes.append((irect.width, irect.height))
+
+    gaps = spacing * (len(sizes) - 1)
+    boxes = []
+
+    if direction == 'horizontal':
+        width = sum(w for w, h in sizes) + gaps
+        height = max(h for w, h in sizes)
+        x_offset = 0
+        for w, h in sizes:
+            # Center vertically if the page is shorter than the panorama
+            boxes.append((x_offset, (height - h) // 2, w, h))
+            x_offset += w + spacing
+    else:
+        width = max(w for w, h in sizes)
+        height = sum(h for w, h in sizes) + gaps
+        y_offset = 0
+        for w, h in sizes:
+            # Center horizontally if the page is narrower than the panorama
+            boxes.append(((width - w) // 2, y_offset, w, h))
+            y_offset += h + spacing
+
+    return width, height, boxes
+
+
+def _spool_page(pix, width, height, spool):
+    """
+    Append a rendered page to the spool file as packed RGB rows, trimmed or
+    padded with white to the size given by the layout.
+    """
+    row_size = width * 3
+    samples = pix.samples_mv
+    copy_width = min(width, pix.width) * 3
+    padding = WHITE * (width - min(width, pix.width))
+
+    if pix.width == width and pix.stride == row_size and pix.height >= height:
+        spool.write(samples[:row_size * height])
+        return
+
+    for row in range(height):
+        if row < pix.height:
+            start = row * pix.stride
+            spool.write(samples[start:start + copy_width])
+            spool.write(padding)
+        else:
+            spool.write(WHITE * width)
+
+
+def _iter_bands(spool, width, height, boxes, offsets):
+    """Yield the panorama as bands of full-width RGB rows read from the spool."""
+    for band_top in range(0, height, BAND_ROWS):
+        band_rows = min(BAND_ROWS, height - band_top)
+        band = bytearray(WHITE * (width * band_rows))
+
+        for (x, y, w, h), offset in zip(boxes, offsets):
+            first = max(band_top, y)
+            last = min(band_top + band_rows, y + h)
+            if first >= last:
+                continue
+
+            page_row_size = w * 3
+            spool.seek(offset + (first - y) * page_row_size)
+            data = spool.read((last - first) * page_row_size)
+
+            for index in range(last - first):
+                start = ((first - band_top + index) * width + x) * 3
+                band[start:start + page_row_size] = data[index * page_row_size:(index + 1) * page_row_size]
+
+        yield band
+
+
 def create_panoramic_image(input_path, output_path, image_format='jpg', dpi=300, 
                           direction='horizontal', pages='all', spacing=0):
     """
@@ -112,89 +388,51 @@ def create_panoramic_image(input_path, output_path, image_format='jpg', dpi=300,
         # 72 DPI is the base resolution in PyMuPDF
         zoom = dpi / 72
         
-        # Render each page as an image
-        page_images = []
-        for page_num in pages_to_include:
-            # Page numbers are 1-based in the input, but 0-based in PyMuPDF
-            page = doc[page_num - 1]
-            
-            # Get the page dimensions
-            rect = page.rect
-            
-            # Create a matrix for rendering at the specified DPI
-            mat = fitz.Matrix(zoom, zoom)
-            
-            # Render the page as a pixmap
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            
-            # Convert to PIL Image
-            img_data = pix.tobytes("ppm")  # Convert to PPM format
-            img = Image.open(io.BytesIO(img_data))
-            
-            # Add to the list of page images
-            page_images.append(img)
-        
-        # Close the document
-        doc.close()
-        
-        # Create the panoramic image
-        if not page_images:
+        if not pages_to_include:
             raise PDFProcessingError("No pages to include in the panoramic image")
         
-        # Calculate the dimensions of the panoramic image
-        if direction.lower() == 'horizontal':
-            # Horizontal panorama
-            width = sum(img.width for img in page_images) + spacing * (len(page_images) - 1)
-            height = max(img.height for img in page_images)
-            
-            # Create a new image with the calculated dimensions
-            panorama = Image.new('RGB', (width, height), (255, 255, 255))
-            
-            # Paste each page image into the panorama
-            x_offset = 0
-            for img in page_images:
-                # Center vertically if the image is shorter than the panorama
-                y_offset = (height - img.height) // 2
-                
-                # Paste the image
-                panorama.paste(img, (x_offset, y_offset))
-                
-                # Update the offset for the next image
-                x_offset += img.width + spacing
+        # First pass: lay the pages out from their sizes alone
+        direction = direction.lower()
+        width, height, boxes = layout_pages(doc, pages_to_include, zoom, direction, spacing)
         
-        else:
-            # Vertical panorama
-            width = max(img.width for img in page_images)
-            height = sum(img.height for img in page_images) + spacing * (len(page_images) - 1)
+        # Second pass: render each page once, spool it to disk, then encode
+        # the panorama from the spool a band of rows at a time
+        temp_dir = os.path.dirname(os.path.abspath(output_path))
+        with tempfile.TemporaryFile(dir=temp_dir) as spool:
+            offsets = []
+            mat = fitz.Matrix(zoom, zoom)
+            for page_num, (x, y, w, h) in zip(pages_to_include, boxes):
+                offsets.append(spool.tell())
+                pix = doc[page_num - 1].get_pixmap(matrix=mat, alpha=False)
+                _spool_page(pix, w, h, spool)
+                pix = None
             
-            # Create a new image with the calculated dimensions
-            panorama = Image.new('RGB', (width, height), (255, 255, 255))
+            # Close the document
+            doc.close()
             
-            # Paste each page image into the panorama
-            y_offset = 0
-            for img in page_images:
-                # Center horizontally if the image is narrower than the panorama
-                x_offset = (width - img.width) // 2
-                
-                # Paste the image
-                panorama.paste(img, (x_offset, y_offset))
-                
-                # Update the offset for the next image
-                y_offset += img.height + spacing
-        
-        # Save the panoramic image
-        if image_format.lower() == 'jpg':
-            panorama.save(output_path, format='JPEG', quality=95)
-        elif image_format.lower() == 'png':
-            panorama.save(output_path, format='PNG')
-        elif image_format.lower() == 'tiff':
-            panorama.save(output_path, format='TIFF', compression='tiff_lzw')
+            image_format = image_format.lower()
+            if image_format == 'jpg':
+                writer = _JPEGWriter(output_path, width, height, dpi, temp_dir)
+            elif image_format == 'png':
+                writer = _PNGWriter(output_path, width, height, dpi)
+            else:
+                writer = _TIFFWriter(output_path, width, height, dpi)
+            
+            try:
+                for band in _iter_bands(spool, width, height, boxes, offsets):
+                    writer.write_rows(band)
+                writer.close()
+            except Exception:
+                writer.abort()
+                if os.path.exists(output_path):
+                    os.remove(output_path)
+                raise
         
         return {
             'input_page_count': input_page_count,
             'pages_used': pages_to_include,
-            'image_width': panorama.width,
-            'image_height': panorama.height,
+            'image_width': width,
+            'image_height': height,
             'image_format': image_format.upper(),
             'dpi': dpi
         }
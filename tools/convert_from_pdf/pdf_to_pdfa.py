@@ -6,8 +6,10 @@ It uses Ghostscript to perform the conversion to ensure compliance with PDF/A st
 """
 
 import os
+import shutil
 import logging
 from app.errors import PDFProcessingError
+from tools.utils.ghostscript import run_ghostscript, has_ghostscript_capability
 
 # Configure logging
 logging.basicConfig(
@@ -48,17 +50,37 @@ def convert_to_pdfa(input_path, output_path, conformance='1b'):
         # Get input file size
         input_file_size = os.path.getsize(input_path)
 
-        # For now, we'll use a simpler approach - just copy the file
-        # This is a temporary solution until we can properly integrate Ghostscript
-        import shutil
-        shutil.copy2(input_path, output_path)
+        if not has_ghostscript_capability('pdfa'):
+            # Without Ghostscript we can only pass the file through unchanged
+            logger.warning("Ghostscript not available, copying file without PDF/A conversion")
+            shutil.copy2(input_path, output_path)
+        else:
+            gs_args = [
+                '-sDEVICE=pdfwrite',
+                f'-dPDFA={conformance[0]}',
+                '-dPDFACompatibilityPolicy=1',
+                '-sColorConversionStrategy=RGB',
+                '-sProcessColorModel=DeviceRGB',
+                '-dNOPAUSE',
+                '-dQUIET',
+                '-dBATCH',
+                '-dSAFER',
+                f'-sOutputFile={output_path}',
+                input_path
+            ]
+
+            # Run Ghostscript on a pooled worker
+            logger.info(f"Running Ghostscript for PDF/A-{conformance} conversion")
+            result = run_ghostscript(gs_args)
+
+            if result['returncode'] != 0 or not os.path.exists(output_path):
+                error_message = result['stderr'].strip() if result['stderr'] else "Unknown error"
+                logger.error(f"Ghostscript error: {error_message}")
+                raise PDFProcessingError(f"Failed to convert to PDF/A: {error_message}")
 
         # Get output file size
         output_file_size = os.path.getsize(output_path)
 
-        # Log that we're using a simplified approach
-        logger.info("Using simplified PDF/A conversion (file copy) until Ghostscript integration is complete")
-
         return {
             'input_file_size': input_file_size,
             'output_file_size': output_file_size,
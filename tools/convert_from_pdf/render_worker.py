@@ -0,0 +1,132 @@
+"""
+Page Render Worker
+
+This module renders PDF pages to image files. It is used in-process by
+tools.convert_from_pdf.pdf_to_image, and is also the entry point of the
+worker processes that render slices of a long document in parallel. Each
+worker opens the document itself, so nothing but file paths crosses the
+process boundary.
+
+Protocol: the JSON job as the only argument, one JSON reply as the last line
+of stdout.
+    {"input_path": ..., "output_dir": ..., "pages": [1, 3], "base_filename": ...,
+     "image_format": "png", "dpi": 300}
+        -> {"output_files": ["...", "..."]} or {"error": "..."}
+
+It only imports PyMuPDF and Pillow so that starting it stays cheap.
+"""
+
+import os
+import sys
+import json
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Map image formats to PIL format strings
+FORMAT_MAP = {
+    'png': 'PNG',
+    'jpg': 'JPEG',
+    'tiff': 'TIFF'
+}
+
+
+def save_pixmap(pix, output_path, image_format='png', dpi=None):
+    """
+    Write a rendered page to an image file.
+
+    PNG and JPEG are encoded by PyMuPDF straight from the pixmap. TIFF goes
+    through Pillow, which reads the pixmap's samples directly rather than
+    decoding a PPM copy of them.
+
+    Args:
+        pix (fitz.Pixmap): The rendered page, RGB without alpha.
+        output_path (str): Path to write the image to.
+        image_format (str, optional): 'png', 'jpg' or 'tiff'. Defaults to 'png'.
+        dpi (int, optional): Resolution to record in the file.
+    """
+    if dpi:
+        pix.set_dpi(dpi, dpi)
+
+    if image_format == 'png':
+        pix.save(output_path, output='png')
+    elif image_format == 'jpg':
+        pix.save(output_path, output='jpg', jpg_quality=95)
+    else:
+        img = Image.frombuffer('RGB', (pix.width, pix.height), pix.samples_mv, 'raw', 'RGB', pix.stride, 1)
+        save_kwargs = {'dpi': (dpi, dpi)} if dpi else {}
+        img.save(output_path, format=FORMAT_MAP[image_format], compression='tiff_lzw', **save_kwargs)
+
+
+def render_page(doc, page_num, output_dir, base_filename, image_format='png', dpi=300):
+    """
+    Render one page to an image file.
+
+    Args:
+        doc (fitz.Document): The open document.
+        page_num (int): 1-based page number.
+        output_dir (str): Directory to write the image to.
+        base_filename (str): Name the image filename starts with.
+        image_format (str, optional): 'png', 'jpg' or 'tiff'. Defaults to 'png'.
+        dpi (int, optional): Resolution in DPI. Defaults to 300.
+
+    Returns:
+        str: Path to the image file.
+    """
+    # Page numbers are 1-based in the input, but 0-based in PyMuPDF
+    page = doc[page_num - 1]
+
+    # Calculate the zoom factor based on DPI
+    # 72 DPI is the base resolution in PyMuPDF
+    zoom = dpi / 72
+
+    # Render the page as a pixmap
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+    # Generate output filename
+    output_filename = f"{base_filename}_page_{page_num}.{image_format}"
+    output_path = os.path.join(output_dir, output_filename)
+
+    save_pixmap(pix, output_path, image_format, dpi)
+
+    return output_path
+
+
+def render_pages(input_path, pages, output_dir, base_filename, image_format='png', dpi=300):
+    """
+    Render pages of a document to image files.
+
+    Args:
+        input_path (str): Path to the PDF file.
+        pages (list): 1-based page numbers to render.
+        output_dir (str): Directory to write the images to.
+        base_filename (str): Name the image filenames start with.
+        image_format (str, optional): 'png', 'jpg' or 'tiff'. Defaults to 'png'.
+        dpi (int, optional): Resolution in DPI. Defaults to 300.
+
+    Returns:
+        list: Paths to the image files, in the order of pages.
+    """
+    doc = fitz.open(input_path)
+    try:
+        return [render_page(doc, page_num, output_dir, base_filename, image_format, dpi)
+                for page_num in pages]
+    finally:
+        doc.close()
+
+
+def main(argv):
+    """Run the render job given on the command line."""
+    try:
+        job = json.loads(argv[1])
+        output_files = render_pages(job['input_path'], job['pages'], job['output_dir'],
+                                    job['base_filename'], job['image_format'], job['dpi'])
+        reply = {'output_files': output_files}
+    except Exception as e:
+        reply = {'error': str(e)}
+
+    sys.stdout.write(json.dumps(reply) + '\n')
+    return 1 if 'error' in reply else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
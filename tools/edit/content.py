@@ -10,9 +10,10 @@ import logging
 import fitz  # PyMuPDF
 from PIL import Image
 import io
-import base64
 import re
 from app.errors import PDFProcessingError
+from tools.utils.document_cache import open_document
+from tools.edit.journal import EditJournal
 
 # Configure logging
 logging.basicConfig(
@@ -21,12 +22,90 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _get_page(doc, page_number):
+    """
+    Get a page of a document, checking the page number.
+
+    Args:
+        doc (fitz.Document): The open document.
+        page_number (int): Page number (1-based).
+
+    Returns:
+        fitz.Page: The page.
+
+    Raises:
+        PDFProcessingError: If the page number is invalid.
+    """
+    if not isinstance(page_number, int) or page_number < 1:
+        raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
+    if page_number > doc.page_count:
+        raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
+    return doc[page_number - 1]
+
+
+def apply_text(doc, text, page_number, x, y, font_name="helv", font_size=12,
+               color=(0, 0, 0), align="left", rotate=0):
+    """
+    Add text to an open PDF document.
+
+    Args:
+        doc (fitz.Document): The open document.
+        text (str): Text to add to the PDF.
+        page_number (int): Page number where the text will be added (1-based).
+        x (float): X-coordinate for the text position.
+        y (float): Y-coordinate for the text position.
+        font_name (str, optional): Font name. Defaults to "helv".
+        font_size (int, optional): Font size. Defaults to 12.
+        color (tuple, optional): RGB color tuple (0-1 range). Defaults to (0, 0, 0).
+        align (str, optional): Text alignment ("left", "center", "right"). Defaults to "left".
+        rotate (int, optional): Rotation angle in degrees. Defaults to 0.
+
+    Returns:
+        dict: Information about the operation, as returned by add_text_to_pdf.
+
+    Raises:
+        PDFProcessingError: If the page number is invalid.
+    """
+    page = _get_page(doc, page_number)
+
+    # Validate alignment
+    valid_alignments = ["left", "center", "right"]
+    if align not in valid_alignments:
+        align = "left"
+
+    # Add text to the page
+    text_writer = fitz.TextWriter(page.rect)
+
+    # Create a point for text insertion
+    point = fitz.Point(x, y)
+
+    # Get the font
+    font = fitz.Font(font_name)
+
+    # Add text to the TextWriter
+    text_writer.append(point, text, font=font, fontsize=font_size)
+
+    # Apply the text to the page, turned about its origin
+    morph = (point, fitz.Matrix(rotate)) if rotate else None
+    text_writer.write_text(page, color=color, morph=morph)
+
+    return {
+        'input_page_count': doc.page_count,
+        'page_number': page_number,
+        'text': text,
+        'position': (x, y)
+    }
+
+
 def add_text_to_pdf(input_path, output_path, text, page_number, x, y,
                    font_name="helv", font_size=12, color=(0, 0, 0),
                    align="left", rotate=0):
     """
     Add text to a PDF file.
 
+    The text is appended to output_path as an incremental update that can be
+    undone; output_path is created from input_path by the first edit.
+
     Args:
         input_path (str): Path to the input PDF file.
         output_path (str): Path where the edited PDF will be saved.
@@ -59,52 +138,9 @@ def add_text_to_pdf(input_path, output_path, text, page_number, x, y,
         if not isinstance(page_number, int) or page_number < 1:
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
-        # Open the input PDF
-        doc = fitz.open(input_path)
-
-        # Get the input page count
-        input_page_count = doc.page_count
-
-        # Validate page number against page count
-        if page_number > input_page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({input_page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Validate alignment
-        valid_alignments = ["left", "center", "right"]
-        if align not in valid_alignments:
-            align = "left"
-
-        # Add text to the page
-        text_writer = fitz.TextWriter(page.rect)
-
-        # Create a point for text insertion
-        point = fitz.Point(x, y)
-
-        # Get the font
-        font = fitz.Font(font_name)
-
-        # Add text to the TextWriter
-        text_writer.append(point, text, font=font, fontsize=font_size, color=color)
-
-        # Apply the text to the page
-        text_writer.write_text(page, morph=(page.rect.width/2, page.rect.height/2, rotate))
-
-        # Save the document
-        doc.save(output_path)
-
-        # Close the document
-        doc.close()
-
-        return {
-            'input_page_count': input_page_count,
-            'page_number': page_number,
-            'text': text,
-            'position': (x, y)
-        }
+        return EditJournal(output_path, input_path).apply(
+            lambda doc: apply_text(doc, text, page_number, x, y, font_name, font_size, color, align, rotate),
+            f"Add text on page {page_number}")
 
     except PDFProcessingError:
         # Re-raise PDFProcessingError
@@ -115,11 +151,71 @@ def add_text_to_pdf(input_path, output_path, text, page_number, x, y,
         raise PDFProcessingError(f"Failed to add text to PDF: {str(e)}")
 
 
+def apply_image(doc, image_path, page_number, x, y, width=None, height=None, rotate=0):
+    """
+    Add an image to an open PDF document.
+
+    Args:
+        doc (fitz.Document): The open document.
+        image_path (str): Path to the image file to add.
+        page_number (int): Page number where the image will be added (1-based).
+        x (float): X-coordinate for the image position.
+        y (float): Y-coordinate for the image position.
+        width (float, optional): Width of the image. If None, uses the image's natural width.
+        height (float, optional): Height of the image. If None, uses the image's natural height.
+        rotate (int, optional): Rotation angle in degrees. Defaults to 0.
+
+    Returns:
+        dict: Information about the operation, as returned by add_image_to_pdf.
+
+    Raises:
+        PDFProcessingError: If the page number is invalid.
+    """
+    page = _get_page(doc, page_number)
+
+    # Open and process the image
+    img = Image.open(image_path)
+
+    # Get image dimensions
+    img_width, img_height = img.size
+
+    # Calculate dimensions if not provided
+    if width is None and height is None:
+        # Use natural dimensions
+        width = img_width
+        height = img_height
+    elif width is None:
+        # Calculate width based on height to maintain aspect ratio
+        width = img_width * (height / img_height)
+    elif height is None:
+        # Calculate height based on width to maintain aspect ratio
+        height = img_height * (width / img_width)
+
+    # Convert PIL Image to bytes
+    img_bytes = io.BytesIO()
+    img.save(img_bytes, format=img.format)
+    img_bytes.seek(0)
+
+    # Insert the image
+    rect = fitz.Rect(x, y, x + width, y + height)
+    page.insert_image(rect, stream=img_bytes.read(), rotate=rotate)
+
+    return {
+        'input_page_count': doc.page_count,
+        'page_number': page_number,
+        'image_size': (width, height),
+        'position': (x, y)
+    }
+
+
 def add_image_to_pdf(input_path, output_path, image_path, page_number, x, y,
                     width=None, height=None, rotate=0):
     """
     Add an image to a PDF file.
 
+    The image is appended to output_path as an incremental update that can
+    be undone; output_path is created from input_path by the first edit.
+
     Args:
         input_path (str): Path to the input PDF file.
         output_path (str): Path where the edited PDF will be saved.
@@ -154,73 +250,61 @@ def add_image_to_pdf(input_path, output_path, image_path, page_number, x, y,
         if not isinstance(page_number, int) or page_number < 1:
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
-        # Open the input PDF
-        doc = fitz.open(input_path)
-
-        # Get the input page count
-        input_page_count = doc.page_count
-
-        # Validate page number against page count
-        if page_number > input_page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({input_page_count} pages).")
+        return EditJournal(output_path, input_path).apply(
+            lambda doc: apply_image(doc, image_path, page_number, x, y, width, height, rotate),
+            f"Add image on page {page_number}")
 
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Open and process the image
-        img = Image.open(image_path)
+    except PDFProcessingError:
+        # Re-raise PDFProcessingError
+        raise
 
-        # Get image dimensions
-        img_width, img_height = img.size
+    except Exception as e:
+        logger.error(f"Error adding image to PDF: {str(e)}")
+        raise PDFProcessingError(f"Failed to add image to PDF: {str(e)}")
 
-        # Calculate dimensions if not provided
-        if width is None and height is None:
-            # Use natural dimensions
-            width = img_width
-            height = img_height
-        elif width is None:
-            # Calculate width based on height to maintain aspect ratio
-            width = img_width * (height / img_height)
-        elif height is None:
-            # Calculate height based on width to maintain aspect ratio
-            height = img_height * (width / img_width)
 
-        # Convert PIL Image to bytes
-        img_bytes = io.BytesIO()
-        img.save(img_bytes, format=img.format)
-        img_bytes.seek(0)
+def apply_remove_content(doc, page_number, x1, y1, x2, y2):
+    """
+    Remove content from a rectangular area of an open PDF document.
 
-        # Insert the image
-        rect = fitz.Rect(x, y, x + width, y + height)
-        page.insert_image(rect, stream=img_bytes.read(), rotate=rotate)
+    Args:
+        doc (fitz.Document): The open document.
+        page_number (int): Page number where content will be removed (1-based).
+        x1 (float): X-coordinate of the top-left corner of the rectangle.
+        y1 (float): Y-coordinate of the top-left corner of the rectangle.
+        x2 (float): X-coordinate of the bottom-right corner of the rectangle.
+        y2 (float): Y-coordinate of the bottom-right corner of the rectangle.
 
-        # Save the document
-        doc.save(output_path)
+    Returns:
+        dict: Information about the operation, as returned by remove_content_from_pdf.
 
-        # Close the document
-        doc.close()
+    Raises:
+        PDFProcessingError: If the page number is invalid.
+    """
+    page = _get_page(doc, page_number)
 
-        return {
-            'input_page_count': input_page_count,
-            'page_number': page_number,
-            'image_size': (width, height),
-            'position': (x, y)
-        }
+    # Create a rectangle for the area to remove
+    rect = fitz.Rect(x1, y1, x2, y2)
 
-    except PDFProcessingError:
-        # Re-raise PDFProcessingError
-        raise
+    # Add a white rectangle to cover the area with full opacity
+    # Draw multiple times to ensure complete coverage
+    for _ in range(3):  # Draw three times for better coverage
+        page.draw_rect(rect, color=(1, 1, 1), fill=(1, 1, 1), opacity=1.0)
 
-    except Exception as e:
-        logger.error(f"Error adding image to PDF: {str(e)}")
-        raise PDFProcessingError(f"Failed to add image to PDF: {str(e)}")
+    return {
+        'input_page_count': doc.page_count,
+        'page_number': page_number,
+        'area': (x1, y1, x2, y2)
+    }
 
 
 def remove_content_from_pdf(input_path, output_path, page_number, x1, y1, x2, y2):
     """
     Remove content from a rectangular area in a PDF file.
 
+    The change is appended to output_path as an incremental update that can
+    be undone; output_path is created from input_path by the first edit.
+
     Args:
         input_path (str): Path to the input PDF file.
         output_path (str): Path where the edited PDF will be saved.
@@ -248,39 +332,9 @@ def remove_content_from_pdf(input_path, output_path, page_number, x1, y1, x2, y2
         if not isinstance(page_number, int) or page_number < 1:
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
-        # Open the input PDF
-        doc = fitz.open(input_path)
-
-        # Get the input page count
-        input_page_count = doc.page_count
-
-        # Validate page number against page count
-        if page_number > input_page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({input_page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Create a rectangle for the area to remove
-        rect = fitz.Rect(x1, y1, x2, y2)
-
-        # Add a white rectangle to cover the area with full opacity
-        # Draw multiple times to ensure complete coverage
-        for _ in range(3):  # Draw three times for better coverage
-            page.draw_rect(rect, color=(1, 1, 1), fill=(1, 1, 1), opacity=1.0)
-
-        # Save the document
-        doc.save(output_path)
-
-        # Close the document
-        doc.close()
-
-        return {
-            'input_page_count': input_page_count,
-            'page_number': page_number,
-            'area': (x1, y1, x2, y2)
-        }
+        return EditJournal(output_path, input_path).apply(
+            lambda doc: apply_remove_content(doc, page_number, x1, y1, x2, y2),
+            f"Remove content on page {page_number}")
 
     except PDFProcessingError:
         # Re-raise PDFProcessingError
@@ -315,22 +369,17 @@ def get_pdf_dimensions(pdf_path, page_number=1):
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
         # Open the PDF
-        doc = fitz.open(pdf_path)
+        with open_document(pdf_path) as doc:
+            # Validate page number against page count
+            if page_number > doc.page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
 
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
+            # Get the page (0-based index)
+            page = doc[page_number - 1]
 
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Get the page dimensions
-        width = page.rect.width
-        height = page.rect.height
-
-        # Close the document
-        doc.close()
+            # Get the page dimensions
+            width = page.rect.width
+            height = page.rect.height
 
         return (width, height)
 
@@ -343,70 +392,6 @@ def get_pdf_dimensions(pdf_path, page_number=1):
         raise PDFProcessingError(f"Failed to get PDF dimensions: {str(e)}")
 
 
-def get_pdf_preview(pdf_path, page_number=1, dpi=150):
-    """
-    Generate a base64-encoded preview image of a PDF page.
-
-    Args:
-        pdf_path (str): Path to the PDF file.
-        page_number (int, optional): Page number to preview (1-based). Defaults to 1.
-        dpi (int, optional): Resolution of the preview image. Defaults to 150.
-
-    Returns:
-        str: Base64-encoded PNG image of the PDF page.
-
-    Raises:
-        PDFProcessingError: If the operation fails.
-    """
-    try:
-        # Validate input file
-        if not os.path.exists(pdf_path):
-            raise PDFProcessingError(f"PDF file not found: {pdf_path}")
-
-        # Validate page number
-        if not isinstance(page_number, int) or page_number < 1:
-            raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
-
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Calculate zoom factor based on DPI
-        zoom = dpi / 72  # 72 DPI is the base resolution in PyMuPDF
-
-        # Create a matrix for rendering at the specified DPI
-        mat = fitz.Matrix(zoom, zoom)
-
-        # Render the page as a pixmap
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-
-        # Convert to PIL Image
-        img_data = pix.tobytes("png")
-
-        # Encode as base64
-        base64_img = base64.b64encode(img_data).decode('utf-8')
-
-        # Close the document
-        doc.close()
-
-        return base64_img
-
-    except PDFProcessingError:
-        # Re-raise PDFProcessingError
-        raise
-
-    except Exception as e:
-        logger.error(f"Error generating PDF preview: {str(e)}")
-        raise PDFProcessingError(f"Failed to generate PDF preview: {str(e)}")
-
-
 def extract_text_from_area(pdf_path, page_number, x1, y1, x2, y2):
     """
     Extract text from a rectangular area in a PDF file.
@@ -435,24 +420,19 @@ def extract_text_from_area(pdf_path, page_number, x1, y1, x2, y2):
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
         # Open the PDF
-        doc = fitz.open(pdf_path)
+        with open_document(pdf_path) as doc:
+            # Validate page number against page count
+            if page_number > doc.page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
 
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
+            # Get the page (0-based index)
+            page = doc[page_number - 1]
 
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Create a rectangle for the area to extract text from
-        rect = fitz.Rect(x1, y1, x2, y2)
-
-        # Extract text from the specified area
-        text = page.get_text("text", clip=rect)
+            # Create a rectangle for the area to extract text from
+            rect = fitz.Rect(x1, y1, x2, y2)
 
-        # Close the document
-        doc.close()
+            # Extract text from the specified area
+            text = page.get_text("text", clip=rect)
 
         return text
 
@@ -496,85 +476,80 @@ def extract_text_with_attributes(pdf_path, page_number, x1, y1, x2, y2):
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
         # Open the PDF
-        doc = fitz.open(pdf_path)
-
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Get all text on the page with positions
-        all_text_dict = page.get_text("dict")
-
-        # Calculate the center point of the selection rectangle
-        center_x = (x1 + x2) / 2
-        center_y = (y1 + y2) / 2
-
-        # Find the closest text block to the click point
-        closest_blocks = []
-        closest_distance = float('inf')
-        full_text = ""
-
-        # Process all blocks to find the closest one
-        for block in all_text_dict.get("blocks", []):
-            if block.get("type") == 0:  # Text block
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        span_text = span.get("text", "").strip()
-                        if not span_text:  # Skip empty spans
-                            continue
-
-                        # Get the bounding box of the span
-                        bbox = span.get("bbox", [0, 0, 0, 0])
-
-                        # Calculate the center of the span
-                        span_center_x = (bbox[0] + bbox[2]) / 2
-                        span_center_y = (bbox[1] + bbox[3]) / 2
-
-                        # Calculate distance to the click point
-                        distance = ((span_center_x - center_x) ** 2 + (span_center_y - center_y) ** 2) ** 0.5
-
-                        # Check if this span is within or very close to the selection rectangle
-                        is_close = (x1 <= span_center_x <= x2 and y1 <= span_center_y <= y2) or distance < 50
-
-                        if is_close:
-                            # If this is the closest span so far, clear the list and add this one
-                            if distance < closest_distance:
-                                closest_blocks = []
-                                closest_distance = distance
-                                full_text = span_text
-
-                                # Extract span attributes
-                                closest_blocks.append({
-                                    "text": span_text,
-                                    "font": span.get("font", ""),
-                                    "size": span.get("size", 12),
-                                    "color": span.get("color", (0, 0, 0)),
-                                    "bbox": bbox,
-                                    "origin": span.get("origin", [bbox[0], bbox[1]])
-                                })
-
-        # If no close blocks were found, try to get any text in the selection rectangle
-        if not closest_blocks:
-            rect = fitz.Rect(x1, y1, x2, y2)
-            text_in_rect = page.get_text("text", clip=rect).strip()
-
-            if text_in_rect:
-                full_text = text_in_rect
-                closest_blocks.append({
-                    "text": text_in_rect,
-                    "font": "helv",  # Default font
-                    "size": 12,      # Default size
-                    "color": (0, 0, 0),  # Default color (black)
-                    "bbox": [x1, y1, x2, y2],
-                    "origin": [x1, y1]
-                })
-
-        # Close the document
-        doc.close()
+        with open_document(pdf_path) as doc:
+            # Validate page number against page count
+            if page_number > doc.page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
+
+            # Get the page (0-based index)
+            page = doc[page_number - 1]
+
+            # Get all text on the page with positions
+            all_text_dict = page.get_text("dict")
+
+            # Calculate the center point of the selection rectangle
+            center_x = (x1 + x2) / 2
+            center_y = (y1 + y2) / 2
+
+            # Find the closest text block to the click point
+            closest_blocks = []
+            closest_distance = float('inf')
+            full_text = ""
+
+            # Process all blocks to find the closest one
+            for block in all_text_dict.get("blocks", []):
+                if block.get("type") == 0:  # Text block
+                    for line in block.get("lines", []):
+                        for span in line.get("spans", []):
+                            span_text = span.get("text", "").strip()
+                            if not span_text:  # Skip empty spans
+                                continue
+
+                            # Get the bounding box of the span
+                            bbox = span.get("bbox", [0, 0, 0, 0])
+
+                            # Calculate the center of the span
+                            span_center_x = (bbox[0] + bbox[2]) / 2
+                            span_center_y = (bbox[1] + bbox[3]) / 2
+
+                            # Calculate distance to the click point
+                            distance = ((span_center_x - center_x) ** 2 + (span_center_y - center_y) ** 2) ** 0.5
+
+                            # Check if this span is within or very close to the selection rectangle
+                            is_close = (x1 <= span_center_x <= x2 and y1 <= span_center_y <= y2) or distance < 50
+
+                            if is_close:
+                                # If this is the closest span so far, clear the list and add this one
+                                if distance < closest_distance:
+                                    closest_blocks = []
+                                    closest_distance = distance
+                                    full_text = span_text
+
+                                    # Extract span attributes
+                                    closest_blocks.append({
+                                        "text": span_text,
+                                        "font": span.get("font", ""),
+                                        "size": span.get("size", 12),
+                                        "color": span.get("color", (0, 0, 0)),
+                                        "bbox": bbox,
+                                        "origin": span.get("origin", [bbox[0], bbox[1]])
+                                    })
+
+            # If no close blocks were found, try to get any text in the selection rectangle
+            if not closest_blocks:
+                rect = fitz.Rect(x1, y1, x2, y2)
+                text_in_rect = page.get_text("text", clip=rect).strip()
+
+                if text_in_rect:
+                    full_text = text_in_rect
+                    closest_blocks.append({
+                        "text": text_in_rect,
+                        "font": "helv",  # Default font
+                        "size": 12,      # Default size
+                        "color": (0, 0, 0),  # Default color (black)
+                        "bbox": [x1, y1, x2, y2],
+                        "origin": [x1, y1]
+                    })
 
         return {
             'text': full_text,
@@ -615,42 +590,37 @@ def get_all_text_with_positions(pdf_path, page_number):
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
         # Open the PDF
-        doc = fitz.open(pdf_path)
-
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Get all text on the page with positions
-        text_dict = page.get_text("dict")
-
-        # Process the text blocks
-        text_blocks = []
-
-        for block in text_dict.get("blocks", []):
-            if block.get("type") == 0:  # Text block
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        span_text = span.get("text", "").strip()
-                        if not span_text:  # Skip empty spans
-                            continue
-
-                        # Extract span attributes
-                        text_blocks.append({
-                            "text": span_text,
-                            "font": span.get("font", ""),
-                            "size": span.get("size", 12),
-                            "color": span.get("color", (0, 0, 0)),
-                            "bbox": span.get("bbox", [0, 0, 0, 0]),
-                            "origin": span.get("origin", [0, 0])
-                        })
-
-        # Close the document
-        doc.close()
+        with open_document(pdf_path) as doc:
+            # Validate page number against page count
+            if page_number > doc.page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
+
+            # Get the page (0-based index)
+            page = doc[page_number - 1]
+
+            # Get all text on the page with positions
+            text_dict = page.get_text("dict")
+
+            # Process the text blocks
+            text_blocks = []
+
+            for block in text_dict.get("blocks", []):
+                if block.get("type") == 0:  # Text block
+                    for line in block.get("lines", []):
+                        for span in line.get("spans", []):
+                            span_text = span.get("text", "").strip()
+                            if not span_text:  # Skip empty spans
+                                continue
+
+                            # Extract span attributes
+                            text_blocks.append({
+                                "text": span_text,
+                                "font": span.get("font", ""),
+                                "size": span.get("size", 12),
+                                "color": span.get("color", (0, 0, 0)),
+                                "bbox": span.get("bbox", [0, 0, 0, 0]),
+                                "origin": span.get("origin", [0, 0])
+                            })
 
         return {
             'blocks': text_blocks
@@ -665,10 +635,83 @@ def get_all_text_with_positions(pdf_path, page_number):
         raise PDFProcessingError(f"Failed to get text with positions: {str(e)}")
 
 
+def apply_replace_text(doc, page_number, original_rect, new_text, text_attributes=None):
+    """
+    Replace text in an open PDF document while preserving its attributes.
+
+    Args:
+        doc (fitz.Document): The open document.
+        page_number (int): Page number where the text will be replaced (1-based).
+        original_rect (list): Rectangle coordinates [x1, y1, x2, y2] of the original text.
+        new_text (str): New text to replace the original text.
+        text_attributes (dict, optional): Attributes of the original text. If None, will use default attributes.
+            Should contain 'font', 'size', 'color', and 'origin' keys.
+
+    Returns:
+        dict: Information about the operation, as returned by replace_text_preserving_attributes.
+
+    Raises:
+        PDFProcessingError: If the page number is invalid.
+    """
+    page = _get_page(doc, page_number)
+
+    # Parse the rectangle coordinates
+    x1, y1, x2, y2 = original_rect
+    rect = fitz.Rect(x1, y1, x2, y2)
+
+    # First, remove the original text by covering it with a white rectangle
+    # Add padding to ensure complete coverage
+    padding = 2
+    expanded_rect = fitz.Rect(
+        rect.x0 - padding,
+        rect.y0 - padding,
+        rect.x1 + padding,
+        rect.y1 + padding
+    )
+    # Use opacity=1.0 to ensure complete coverage
+    page.draw_rect(expanded_rect, color=(1, 1, 1), fill=(1, 1, 1), opacity=1.0)
+
+    # If text_attributes is provided, use them; otherwise, use defaults
+    if text_attributes:
+        font_name = text_attributes.get('font', 'helv')
+        font_size = text_attributes.get('size', 12)
+        color = text_attributes.get('color', (0, 0, 0))
+        origin = text_attributes.get('origin', [x1, y1])
+    else:
+        font_name = 'helv'
+        font_size = 12
+        color = (0, 0, 0)
+        origin = [x1, y1]
+
+    # Create a text writer
+    text_writer = fitz.TextWriter(page.rect)
+
+    # Create a point for text insertion
+    point = fitz.Point(origin[0], origin[1])
+
+    # Get the font
+    font = fitz.Font(font_name)
+
+    # Add text to the TextWriter
+    text_writer.append(point, new_text, font=font, fontsize=font_size)
+
+    # Apply the text to the page
+    text_writer.write_text(page, color=color)
+
+    return {
+        'page_number': page_number,
+        'original_rect': original_rect,
+        'new_text': new_text
+    }
+
+
 def replace_text_preserving_attributes(input_path, output_path, page_number, original_rect, new_text, text_attributes=None):
     """
     Replace text in a PDF while preserving its attributes.
 
+    The change is appended to output_path as an incremental update that can
+    be undone; output_path is created from input_path by the first edit.
+
     Args:
         input_path (str): Path to the input PDF file.
         output_path (str): Path where the edited PDF will be saved.
@@ -696,71 +739,9 @@ def replace_text_preserving_attributes(input_path, output_path, page_number, ori
         if not isinstance(page_number, int) or page_number < 1:
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
-        # Open the input PDF
-        doc = fitz.open(input_path)
-
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Parse the rectangle coordinates
-        x1, y1, x2, y2 = original_rect
-        rect = fitz.Rect(x1, y1, x2, y2)
-
-        # First, remove the original text by covering it with a white rectangle
-        # Add padding to ensure complete coverage
-        padding = 2
-        expanded_rect = fitz.Rect(
-            rect.x0 - padding,
-            rect.y0 - padding,
-            rect.x1 + padding,
-            rect.y1 + padding
-        )
-        # Use opacity=1.0 to ensure complete coverage
-        page.draw_rect(expanded_rect, color=(1, 1, 1), fill=(1, 1, 1), opacity=1.0)
-
-        # If text_attributes is provided, use them; otherwise, use defaults
-        if text_attributes:
-            font_name = text_attributes.get('font', 'helv')
-            font_size = text_attributes.get('size', 12)
-            color = text_attributes.get('color', (0, 0, 0))
-            origin = text_attributes.get('origin', [x1, y1])
-        else:
-            font_name = 'helv'
-            font_size = 12
-            color = (0, 0, 0)
-            origin = [x1, y1]
-
-        # Create a text writer
-        text_writer = fitz.TextWriter(page.rect)
-
-        # Create a point for text insertion
-        point = fitz.Point(origin[0], origin[1])
-
-        # Get the font
-        font = fitz.Font(font_name)
-
-        # Add text to the TextWriter
-        text_writer.append(point, new_text, font=font, fontsize=font_size, color=color)
-
-        # Apply the text to the page
-        text_writer.write_text(page)
-
-        # Save the document
-        doc.save(output_path)
-
-        # Close the document
-        doc.close()
-
-        return {
-            'page_number': page_number,
-            'original_rect': original_rect,
-            'new_text': new_text
-        }
+        return EditJournal(output_path, input_path).apply(
+            lambda doc: apply_replace_text(doc, page_number, original_rect, new_text, text_attributes),
+            f"Replace text on page {page_number}")
 
     except PDFProcessingError:
         # Re-raise PDFProcessingError
@@ -794,3 +775,181 @@ def get_available_fonts():
 
     # Combine and return
     return standard_fonts + pymupdf_fonts
+
+
+# Operations accepted by apply_operations, with the fields each requires
+OPERATION_FIELDS = {
+    'text': ('text', 'x', 'y'),
+    'image': ('image_path', 'x', 'y'),
+    'redact': ('x1', 'y1', 'x2', 'y2'),
+    'replace': ('rect', 'new_text')
+}
+
+
+def parse_color(value):
+    """
+    Convert a color to an RGB tuple in the 0-1 range.
+
+    Args:
+        value: A hex string such as '#ff0000', or a list of three numbers in
+            the 0-1 range.
+
+    Returns:
+        tuple: The (r, g, b) color.
+
+    Raises:
+        ValueError: If the color can't be parsed.
+    """
+    if isinstance(value, str):
+        hex_value = value.lstrip('#')
+        if len(hex_value) != 6:
+            raise ValueError(f"Invalid color: {value}")
+        return tuple(int(hex_value[i:i+2], 16) / 255 for i in (0, 2, 4))
+
+    if isinstance(value, (list, tuple)) and len(value) == 3:
+        return tuple(float(c) for c in value)
+
+    raise ValueError(f"Invalid color: {value}")
+
+
+def _apply_operation(doc, operation):
+    """Apply one operation of apply_operations to an open document."""
+    op_type = operation['type']
+    page_number = operation['page_number']
+
+    if op_type == 'text':
+        return apply_text(doc, operation['text'], page_number,
+                          float(operation['x']), float(operation['y']),
+                          operation.get('font_name', 'helv'), float(operation.get('font_size', 12)),
+                          parse_color(operation.get('color', '#000000')),
+                          operation.get('align', 'left'), int(operation.get('rotate', 0)))
+
+    if op_type == 'image':
+        width = operation.get('width')
+        height = operation.get('height')
+        return apply_image(doc, operation['image_path'], page_number,
+                           float(operation['x']), float(operation['y']),
+                           float(width) if width else None, float(height) if height else None,
+                           int(operation.get('rotate', 0)))
+
+    if op_type == 'redact':
+        return apply_remove_content(doc, page_number,
+                                    float(operation['x1']), float(operation['y1']),
+                                    float(operation['x2']), float(operation['y2']))
+
+    return apply_replace_text(doc, page_number, [float(c) for c in operation['rect']],
+                              operation['new_text'], operation.get('text_attributes'))
+
+
+def _check_operation(operation, page_count):
+    """
+    Check an operation of apply_operations before anything is applied.
+
+    Returns:
+        str: What is wrong with the operation, or None if it can be applied.
+    """
+    if not isinstance(operation, dict):
+        return "Operation must be an object"
+
+    op_type = operation.get('type')
+    if op_type not in OPERATION_FIELDS:
+        return f"Unknown operation type: {op_type}"
+
+    page_number = operation.get('page_number')
+    if not isinstance(page_number, int) or not 1 <= page_number <= page_count:
+        return f"Invalid page number: {page_number}. The document has {page_count} pages."
+
+    missing = [field for field in OPERATION_FIELDS[op_type] if operation.get(field) in (None, '')]
+    if missing:
+        return f"Missing {', '.join(missing)} for {op_type} operation"
+
+    if op_type == 'image' and not os.path.exists(operation['image_path']):
+        return f"Image file not found: {operation['image_path']}"
+
+    if op_type == 'replace' and len(operation['rect']) != 4:
+        return "rect must be [x1, y1, x2, y2]"
+
+    return None
+
+
+def apply_operations(input_path, output_path, operations):
+    """
+    Apply a list of edit operations to a PDF file in one pass.
+
+    The operations are checked first, then applied page by page to one open
+    document, which is saved once, as a single incremental update that can be
+    undone as a whole. Operations on the same page are applied in the order
+    given. The batch is all or nothing: if any operation is invalid or fails,
+    none of them are applied.
+
+    Args:
+        input_path (str): Path to the input PDF file.
+        output_path (str): Path where the edited PDF will be saved.
+        operations (list): The operations, each a dictionary with a 'type',
+            a 'page_number' (1-based) and the fields of that type:
+            - 'text': 'text', 'x', 'y', and optionally 'font_name',
+              'font_size', 'color', 'align' and 'rotate', as for add_text_to_pdf.
+            - 'image': 'image_path', 'x', 'y', and optionally 'width',
+              'height' and 'rotate', as for add_image_to_pdf.
+            - 'redact': 'x1', 'y1', 'x2', 'y2', as for remove_content_from_pdf.
+            - 'replace': 'rect', 'new_text', and optionally 'text_attributes',
+              as for replace_text_preserving_attributes.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'results': For each operation, in the order given, a dictionary
+              with 'index', 'type', 'success' and 'result'.
+            - 'applied': Number of operations applied.
+            - 'failed': Number of operations that failed (always 0).
+
+    Raises:
+        PDFProcessingError: If the file can't be opened or saved, or an
+            operation is invalid or fails.
+    """
+    try:
+        # Validate input file
+        if not os.path.exists(input_path):
+            raise PDFProcessingError(f"Input file not found: {input_path}")
+
+        if not isinstance(operations, list):
+            raise PDFProcessingError("Operations must be a list.")
+
+        # Check the operations against the current document
+        source_path = output_path if os.path.exists(output_path) else input_path
+        with open_document(source_path) as doc:
+            page_count = doc.page_count
+
+        for index, operation in enumerate(operations):
+            error = _check_operation(operation, page_count)
+            if error:
+                raise PDFProcessingError(f"Edit operation {index} is invalid ({error}). No edits were applied.", 400)
+
+        results = [{'index': index, 'type': operation['type'], 'success': True}
+                   for index, operation in enumerate(operations)]
+
+        def apply_all(doc):
+            # Keep to one page at a time; sorted() keeps the order within a page.
+            # Any failure leaves the journal to drop the whole batch.
+            for index in sorted(range(len(operations)), key=lambda i: operations[i]['page_number']):
+                try:
+                    results[index]['result'] = _apply_operation(doc, operations[index])
+                except Exception as e:
+                    logger.warning(f"Edit operation {index} failed: {str(e)}")
+                    raise PDFProcessingError(f"Edit operation {index} failed: {str(e)}. No edits were applied.") from e
+
+        if operations:
+            EditJournal(output_path, input_path).apply(apply_all, f"Apply {len(operations)} edits")
+
+        return {
+            'results': results,
+            'applied': len(results),
+            'failed': 0
+        }
+
+    except PDFProcessingError:
+        # Re-raise PDFProcessingError
+        raise
+
+    except Exception as e:
+        logger.error(f"Error applying edit operations: {str(e)}")
+        raise PDFProcessingError(f"Failed to apply edit operations: {str(e)}")
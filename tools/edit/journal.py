@@ -0,0 +1,294 @@
+"""
+Edit Journal Module
+
+This module persists editor changes to a PDF as incremental updates. Each
+edit is appended to the end of the output file instead of rewriting the
+whole document, and a journal next to the file records where each edit
+starts, so the last edits can be undone by cutting them off again.
+
+A checkpoint rewrites the file without its update history, compacting it,
+and starts a new journal; edits made before it can no longer be undone.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+import fitz  # PyMuPDF
+from app.errors import PDFProcessingError
+from app.storage import touch_artefacts
+from tools.utils.document_cache import edit_document, invalidate_document
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where journals are only locked within a process
+    fcntl = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Per-journal locks, used where fcntl isn't available
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+def get_journal_path(output_path):
+    """
+    Get the path of the journal of an edited file.
+
+    Args:
+        output_path (str): Path to the edited PDF.
+
+    Returns:
+        str: Path to its journal.
+    """
+    directory, filename = os.path.split(output_path)
+    return os.path.join(directory, f".{filename}.journal")
+
+
+class EditJournal:
+    """Class for applying edits to a PDF as incremental updates that can be undone."""
+
+    def __init__(self, output_path, source_path=None):
+        """
+        Initialize the edit journal of a file.
+
+        Args:
+            output_path: Path to the edited PDF.
+            source_path: Path to the PDF the edits start from, copied to
+                output_path by the first edit. Not needed once output_path exists.
+        """
+        self.output_path = output_path
+        self.source_path = source_path
+        self.journal_path = get_journal_path(output_path)
+
+    def _thread_lock(self):
+        """
+        Get the lock that keeps threads of this process off the journal
+        where fcntl isn't available to lock it.
+
+        Returns:
+            A context manager holding the lock.
+        """
+        if fcntl is not None:
+            return nullcontext()
+
+        with _thread_locks_lock:
+            return _thread_locks.setdefault(os.path.abspath(self.journal_path), threading.Lock())
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the journal exclusively, across threads and processes (only
+        across threads where fcntl isn't available).
+
+        Using the journal also marks the file and its journal as just used,
+        so the storage sweeper doesn't expire a file that is being edited.
+
+        Yields:
+            dict: The journal state, written back when the block exits normally.
+        """
+        with self._thread_lock():
+            fd = os.open(self.journal_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+
+                with os.fdopen(os.dup(fd), 'r+') as f:
+                    try:
+                        state = json.loads(f.read() or '{}')
+                    except ValueError:
+                        logger.warning(f"Discarding unreadable edit journal {self.journal_path}")
+                        state = {}
+
+                    state = self._check(state)
+                    yield state
+
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f)
+            finally:
+                os.close(fd)
+
+        touch_artefacts(self.output_path, self.journal_path)
+
+    def _check(self, state):
+        """
+        Make sure a journal state matches the file.
+
+        If the file was changed without the journal, e.g. by another tool,
+        its edits can't be undone any more and the journal starts over.
+
+        Args:
+            state: The journal state read from disk.
+
+        Returns:
+            dict: A journal state that matches the file.
+        """
+        try:
+            size = os.path.getsize(self.output_path)
+        except OSError:
+            return {'base_size': None, 'entries': []}
+
+        entries = state.get('entries') or []
+        expected = entries[-1]['size'] if entries else state.get('base_size')
+        if expected != size:
+            if expected is not None:
+                logger.info(f"{self.output_path} changed outside its edit journal; starting a new one")
+            return {'base_size': size, 'entries': []}
+        return state
+
+    def _prepare_output(self):
+        """Create the output file, making sure it isn't shared with any other file."""
+        if not os.path.exists(self.output_path):
+            if not self.source_path or not os.path.exists(self.source_path):
+                raise PDFProcessingError(f"Input file not found: {self.source_path or self.output_path}")
+            shutil.copyfile(self.source_path, self.output_path)
+            return
+
+        # Edits are appended in place, which would also change any file
+        # hard-linked to this one, such as a stored upload
+        if os.stat(self.output_path).st_nlink > 1:
+            temp_path = f"{self.output_path}.{os.getpid()}.tmp"
+            shutil.copyfile(self.output_path, temp_path)
+            os.replace(temp_path, self.output_path)
+
+    def apply(self, operation, label):
+        """
+        Apply an edit and append it to the file.
+
+        Args:
+            operation: Function that takes the open fitz.Document, changes it
+                and returns a result. If it raises, nothing is saved.
+            label: Short description of the edit, shown when it is undone.
+
+        Returns:
+            The result of operation.
+
+        Raises:
+            PDFProcessingError: If the file can't be edited.
+        """
+        with self._locked() as state:
+            self._prepare_output()
+            offset = os.path.getsize(self.output_path)
+            incremental = True
+
+            try:
+                with edit_document(self.output_path, self.output_path) as doc:
+                    result = operation(doc)
+
+                    if doc.can_save_incrementally():
+                        doc.saveIncr()
+                    else:
+                        # e.g. a repaired file, which has to be written out in full
+                        incremental = False
+                        self._rewrite(doc)
+            except BaseException:
+                # Cut off anything a failed save appended
+                if os.path.exists(self.output_path) and os.path.getsize(self.output_path) > offset:
+                    invalidate_document(self.output_path)
+                    os.truncate(self.output_path, offset)
+                raise
+
+            size = os.path.getsize(self.output_path)
+            if state['base_size'] is None:
+                state['base_size'] = offset
+            if incremental:
+                state['entries'].append({
+                    'label': label,
+                    'offset': offset,
+                    'size': size,
+                    'time': time.time()
+                })
+            else:
+                # The open document still refers to the replaced file
+                invalidate_document(self.output_path)
+                state['base_size'] = size
+                state['entries'] = []
+
+            return result
+
+    def undo(self):
+        """
+        Undo the last edit.
+
+        Returns:
+            str: The label of the edit that was undone.
+
+        Raises:
+            PDFProcessingError: If there is no edit to undo.
+        """
+        with self._locked() as state:
+            if not state['entries']:
+                raise PDFProcessingError("There are no edits to undo.")
+
+            entry = state['entries'].pop()
+            invalidate_document(self.output_path)
+            os.truncate(self.output_path, entry['offset'])
+            return entry['label']
+
+    def checkpoint(self):
+        """
+        Rewrite the file without its update history.
+
+        Unused objects are dropped and streams compressed, which undoes the
+        growth from incremental updates. The edits so far can no longer be
+        undone.
+
+        Returns:
+            dict: A dictionary containing:
+                - 'size_before': Size of the file before the checkpoint in bytes.
+                - 'size_after': Size of the file after the checkpoint in bytes.
+
+        Raises:
+            PDFProcessingError: If the file doesn't exist or can't be rewritten.
+        """
+        with self._locked() as state:
+            if not os.path.exists(self.output_path):
+                raise PDFProcessingError(f"PDF file not found: {self.output_path}")
+
+            size_before = os.path.getsize(self.output_path)
+            doc = fitz.open(self.output_path)
+            try:
+                self._rewrite(doc)
+            finally:
+                doc.close()
+            invalidate_document(self.output_path)
+
+            size_after = os.path.getsize(self.output_path)
+            state['base_size'] = size_after
+            state['entries'] = []
+
+            return {
+                'size_before': size_before,
+                'size_after': size_after
+            }
+
+    def _rewrite(self, doc):
+        """Write a document over the output file in full."""
+        temp_path = f"{self.output_path}.{os.getpid()}.tmp"
+        try:
+            doc.save(temp_path, garbage=3, deflate=True)
+            os.replace(temp_path, self.output_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def history(self):
+        """
+        Get the edits that can be undone.
+
+        Returns:
+            list: Labels of the edits, oldest first.
+        """
+        with self._locked() as state:
+            return [entry['label'] for entry in state['entries']]
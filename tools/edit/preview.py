@@ -0,0 +1,226 @@
+"""
+Page Preview Module
+
+This module renders PDF pages to PNG images for the editors. It is the one
+place previews are rendered; the web app caches what it returns and serves
+it from a URL rather than inlining it in the page.
+
+Large pages can also be rendered as tiles: square pieces of the page at a
+zoom level, so a viewer only asks for the part of the page on screen.
+"""
+
+import os
+import logging
+import fitz  # PyMuPDF
+from app.errors import PDFProcessingError
+from tools.utils.document_cache import open_document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Default resolution of editor previews
+PREVIEW_DPI = 150
+
+# Range of resolutions previews can be requested at
+MIN_PREVIEW_DPI = 36
+MAX_PREVIEW_DPI = 300
+
+# Rotations a preview can be requested with, in degrees clockwise
+VALID_ROTATIONS = (0, 90, 180, 270)
+
+# Width and height of a tile in pixels
+TILE_SIZE = 256
+
+# Tile zoom levels. Each level doubles the scale; level TILE_BASE_LEVEL
+# renders at 72 DPI, so levels 0-7 go from 18 to 2304 DPI
+TILE_BASE_LEVEL = 2
+MAX_TILE_LEVEL = 7
+
+# Pages whose preview would have more pixels than this are shown as tiles
+# over a low-resolution preview rendered at MIN_PREVIEW_DPI
+TILED_PREVIEW_PIXELS = 4 * 1024 * 1024
+
+
+def render_page_png(pdf_path, page_number=1, dpi=PREVIEW_DPI, rotation=0):
+    """
+    Render a PDF page to a PNG image.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        page_number (int, optional): Page number to render (1-based). Defaults to 1.
+        dpi (int, optional): Resolution of the image. Defaults to 150.
+        rotation (int, optional): Extra rotation in degrees clockwise, on top
+            of the page's own rotation. Defaults to 0.
+
+    Returns:
+        bytes: The PNG image.
+
+    Raises:
+        PDFProcessingError: If the page can't be rendered.
+    """
+    try:
+        # Validate input file
+        if not os.path.exists(pdf_path):
+            raise PDFProcessingError(f"PDF file not found: {pdf_path}")
+
+        # Validate page number
+        if not isinstance(page_number, int) or page_number < 1:
+            raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
+
+        # Validate resolution and rotation
+        if not MIN_PREVIEW_DPI <= dpi <= MAX_PREVIEW_DPI:
+            raise PDFProcessingError(f"Invalid DPI: {dpi}. Valid range: {MIN_PREVIEW_DPI}-{MAX_PREVIEW_DPI}")
+        if rotation not in VALID_ROTATIONS:
+            raise PDFProcessingError(f"Invalid rotation: {rotation}. Must be one of {VALID_ROTATIONS}.")
+
+        # Open the PDF
+        with open_document(pdf_path) as doc:
+            # Validate page number against page count
+            if page_number > doc.page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
+
+            # Calculate zoom factor based on DPI
+            zoom = dpi / 72  # 72 DPI is the base resolution in PyMuPDF
+
+            # Render the page as a PNG
+            mat = fitz.Matrix(zoom, zoom).prerotate(rotation)
+            pix = doc[page_number - 1].get_pixmap(matrix=mat, alpha=False)
+            return pix.tobytes("png")
+
+    except PDFProcessingError:
+        # Re-raise PDFProcessingError
+        raise
+
+    except Exception as e:
+        logger.error(f"Error generating PDF preview: {str(e)}")
+        raise PDFProcessingError(f"Failed to generate PDF preview: {str(e)}")
+
+
+def needs_tiles(width, height, dpi=PREVIEW_DPI):
+    """
+    Check whether a page is too large to preview as a single image.
+
+    Args:
+        width (float): Page width in points.
+        height (float): Page height in points.
+        dpi (int, optional): Resolution of the preview. Defaults to 150.
+
+    Returns:
+        bool: True if the page should be shown as tiles.
+    """
+    scale = dpi / 72
+    return width * scale * height * scale > TILED_PREVIEW_PIXELS
+
+
+def get_tile_scale(level):
+    """
+    Get the render scale of a tile zoom level.
+
+    Args:
+        level (int): The zoom level.
+
+    Returns:
+        float: Pixels per PDF point.
+    """
+    return 2.0 ** (level - TILE_BASE_LEVEL)
+
+
+def get_tile_info(pdf_path, page_number=1):
+    """
+    Describe the tiles of a PDF page.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        page_number (int, optional): Page number (1-based). Defaults to 1.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'width', 'height': Page size in points.
+            - 'tile_size': Tile width and height in pixels.
+            - 'min_level', 'max_level': Available zoom levels.
+            - 'levels': For each level, its 'scale' and the number of
+              tile 'columns' and 'rows'.
+
+    Raises:
+        PDFProcessingError: If the page can't be read.
+    """
+    try:
+        with open_document(pdf_path) as doc:
+            if not isinstance(page_number, int) or not 1 <= page_number <= doc.page_count:
+                raise PDFProcessingError(f"Invalid page number: {page_number}.")
+            rect = doc[page_number - 1].rect
+
+    except PDFProcessingError:
+        raise
+
+    except Exception as e:
+        logger.error(f"Error reading PDF page size: {str(e)}")
+        raise PDFProcessingError(f"Failed to read PDF page: {str(e)}")
+
+    levels = []
+    for level in range(MAX_TILE_LEVEL + 1):
+        scale = get_tile_scale(level)
+        levels.append({
+            'scale': scale,
+            'columns': max(1, -(-int(round(rect.width * scale)) // TILE_SIZE)),
+            'rows': max(1, -(-int(round(rect.height * scale)) // TILE_SIZE))
+        })
+
+    return {
+        'width': rect.width,
+        'height': rect.height,
+        'tile_size': TILE_SIZE,
+        'min_level': 0,
+        'max_level': MAX_TILE_LEVEL,
+        'levels': levels
+    }
+
+
+def render_tile_png(pdf_path, page_number, level, column, row):
+    """
+    Render one tile of a PDF page to a PNG image.
+
+    Only the part of the page under the tile is rendered, so the cost does
+    not depend on how large the whole page is at that zoom level. Tiles on
+    the right and bottom edges are cut to the page.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        page_number (int): Page number (1-based).
+        level (int): Zoom level, from 0 to MAX_TILE_LEVEL.
+        column (int): Tile column, from 0 at the left.
+        row (int): Tile row, from 0 at the top.
+
+    Returns:
+        bytes: The PNG image.
+
+    Raises:
+        PDFProcessingError: If the tile is outside the page or can't be rendered.
+    """
+    if not 0 <= level <= MAX_TILE_LEVEL:
+        raise PDFProcessingError(f"Invalid zoom level: {level}. Valid range: 0-{MAX_TILE_LEVEL}")
+
+    try:
+        with open_document(pdf_path) as doc:
+            if not isinstance(page_number, int) or not 1 <= page_number <= doc.page_count:
+                raise PDFProcessingError(f"Invalid page number: {page_number}.")
+            page = doc[page_number - 1]
+
+            # The tile's area in page coordinates
+            scale = get_tile_scale(level)
+            span = TILE_SIZE / scale
+            page_rect = page.rect
+            clip = fitz.Rect(page_rect.x0 + column * span, page_rect.y0 + row * span,
+                             page_rect.x0 + (column + 1) * span, page_rect.y0 + (row + 1) * span) & page_rect
+            if column < 0 or row < 0 or clip.is_empty:
+                raise PDFProcessingError(f"Tile {column},{row} is outside the page at zoom level {level}.")
+
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+            return pix.tobytes("png")
+
+    except PDFProcessingError:
+        raise
+
+    except Exception as e:
+        logger.error(f"Error rendering PDF tile: {str(e)}")
+        raise PDFProcessingError(f"Failed to render PDF tile: {str(e)}")
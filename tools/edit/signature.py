@@ -14,6 +14,7 @@ import base64
 import re
 import tempfile
 from app.errors import PDFProcessingError
+from tools.utils.document_cache import open_document, edit_document
 
 # Configure logging
 logging.basicConfig(
@@ -62,57 +63,52 @@ def add_signature_to_pdf(input_path, output_path, signature_path, page_number, x
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
         # Open the input PDF
-        doc = fitz.open(input_path)
+        with edit_document(input_path, output_path) as doc:
+            # Get the input page count
+            input_page_count = doc.page_count
 
-        # Get the input page count
-        input_page_count = doc.page_count
+            # Validate page number against page count
+            if page_number > input_page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({input_page_count} pages).")
 
-        # Validate page number against page count
-        if page_number > input_page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({input_page_count} pages).")
+            # Get the page (0-based index)
+            page = doc[page_number - 1]
 
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
+            # Open and process the signature image
+            img = Image.open(signature_path)
 
-        # Open and process the signature image
-        img = Image.open(signature_path)
+            # Get image dimensions
+            img_width, img_height = img.size
 
-        # Get image dimensions
-        img_width, img_height = img.size
+            # Calculate dimensions if not provided
+            if width is None and height is None:
+                # Use natural dimensions
+                width = img_width
+                height = img_height
+            elif width is None:
+                # Calculate width based on height to maintain aspect ratio
+                width = img_width * (height / img_height)
+            elif height is None:
+                # Calculate height based on width to maintain aspect ratio
+                height = img_height * (width / img_width)
 
-        # Calculate dimensions if not provided
-        if width is None and height is None:
-            # Use natural dimensions
-            width = img_width
-            height = img_height
-        elif width is None:
-            # Calculate width based on height to maintain aspect ratio
-            width = img_width * (height / img_height)
-        elif height is None:
-            # Calculate height based on width to maintain aspect ratio
-            height = img_height * (width / img_width)
+            # Convert PIL Image to bytes
+            img_bytes = io.BytesIO()
 
-        # Convert PIL Image to bytes
-        img_bytes = io.BytesIO()
+            # If the image has transparency (PNG), preserve it
+            if 'A' in img.getbands():
+                img.save(img_bytes, format='PNG')
+            else:
+                img.save(img_bytes, format=img.format if img.format else 'JPEG')
 
-        # If the image has transparency (PNG), preserve it
-        if 'A' in img.getbands():
-            img.save(img_bytes, format='PNG')
-        else:
-            img.save(img_bytes, format=img.format if img.format else 'JPEG')
+            img_bytes.seek(0)
 
-        img_bytes.seek(0)
+            # Insert the signature image
+            rect = fitz.Rect(x, y, x + width, y + height)
+            page.insert_image(rect, stream=img_bytes.read(), rotate=rotate)
 
-        # Insert the signature image
-        rect = fitz.Rect(x, y, x + width, y + height)
-        page.insert_image(rect, stream=img_bytes.read(), rotate=rotate)
-
-        # Save the document
-        doc.save(output_path)
-
-        # Close the document
-        doc.close()
+            # Save the document
+            doc.save(output_path)
 
         return {
             'input_page_count': input_page_count,
@@ -205,70 +201,6 @@ def add_signature_from_data_url(input_path, output_path, data_url, page_number,
         raise PDFProcessingError(f"Failed to add signature from data URL: {str(e)}")
 
 
-def get_pdf_preview(pdf_path, page_number=1, dpi=150):
-    """
-    Generate a base64-encoded preview image of a PDF page.
-
-    Args:
-        pdf_path (str): Path to the PDF file.
-        page_number (int, optional): Page number to preview (1-based). Defaults to 1.
-        dpi (int, optional): Resolution of the preview image. Defaults to 150.
-
-    Returns:
-        str: Base64-encoded PNG image of the PDF page.
-
-    Raises:
-        PDFProcessingError: If the operation fails.
-    """
-    try:
-        # Validate input file
-        if not os.path.exists(pdf_path):
-            raise PDFProcessingError(f"PDF file not found: {pdf_path}")
-
-        # Validate page number
-        if not isinstance(page_number, int) or page_number < 1:
-            raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
-
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
-
-        # Calculate zoom factor based on DPI
-        zoom = dpi / 72  # 72 DPI is the base resolution in PyMuPDF
-
-        # Create a matrix for rendering at the specified DPI
-        mat = fitz.Matrix(zoom, zoom)
-
-        # Render the page as a pixmap
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-
-        # Convert to PNG bytes
-        img_bytes = pix.tobytes("png")
-
-        # Encode as base64
-        base64_img = base64.b64encode(img_bytes).decode('utf-8')
-
-        # Close the document
-        doc.close()
-
-        return base64_img
-
-    except PDFProcessingError:
-        # Re-raise PDFProcessingError
-        raise
-
-    except Exception as e:
-        logger.error(f"Error generating PDF preview: {str(e)}")
-        raise PDFProcessingError(f"Failed to generate PDF preview: {str(e)}")
-
-
 def get_pdf_dimensions(pdf_path, page_number=1):
     """
     Get the dimensions of a PDF page.
@@ -293,22 +225,17 @@ def get_pdf_dimensions(pdf_path, page_number=1):
             raise PDFProcessingError(f"Invalid page number: {page_number}. Must be a positive integer.")
 
         # Open the PDF
-        doc = fitz.open(pdf_path)
-
-        # Validate page number against page count
-        if page_number > doc.page_count:
-            doc.close()
-            raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
-
-        # Get the page (0-based index)
-        page = doc[page_number - 1]
+        with open_document(pdf_path) as doc:
+            # Validate page number against page count
+            if page_number > doc.page_count:
+                raise PDFProcessingError(f"Page number {page_number} exceeds document length ({doc.page_count} pages).")
 
-        # Get the page dimensions
-        width = page.rect.width
-        height = page.rect.height
+            # Get the page (0-based index)
+            page = doc[page_number - 1]
 
-        # Close the document
-        doc.close()
+            # Get the page dimensions
+            width = page.rect.width
+            height = page.rect.height
 
         return (width, height)
 
@@ -9,8 +9,8 @@ import os
 import subprocess
 import tempfile
 import logging
-import platform
 from app.errors import PDFProcessingError
+from tools.utils.ghostscript import run_ghostscript
 
 # Configure logging
 logging.basicConfig(
@@ -19,67 +19,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_ghostscript_path():
-    """
-    Get the path to the Ghostscript executable.
-
-    Returns:
-        str: Path to the Ghostscript executable.
-
-    Raises:
-        PDFProcessingError: If Ghostscript is not found.
-    """
-    # First, try to use the local Ghostscript installation
-    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    gs_dir = os.path.join(base_dir, 'ghostscript')
-
-    # Check if we have a local Ghostscript installation
-    if os.path.exists(gs_dir):
-        # Find the Ghostscript directory (it might have a version suffix)
-        gs_dirs = [d for d in os.listdir(gs_dir) if d.startswith('ghostscript-')]
-
-        if gs_dirs:
-            # Use the first directory found (should be only one)
-            gs_version_dir = os.path.join(gs_dir, gs_dirs[0])
-
-            # Determine the executable name based on the platform
-            if platform.system() == 'Windows':
-                # On Windows, look for gswin64c.exe or gswin32c.exe in the bin directory
-                for exe_name in ['gswin64c.exe', 'gswin32c.exe']:
-                    exe_path = os.path.join(gs_version_dir, 'bin', exe_name)
-                    if os.path.exists(exe_path):
-                        return exe_path
-
-                # If not found in bin, check the root directory
-                for exe_name in ['gswin64c.exe', 'gswin32c.exe']:
-                    exe_path = os.path.join(gs_version_dir, exe_name)
-                    if os.path.exists(exe_path):
-                        return exe_path
-            else:
-                # On Unix-like systems, look for gs in the bin directory
-                exe_path = os.path.join(gs_version_dir, 'bin', 'gs')
-                if os.path.exists(exe_path):
-                    return exe_path
-
-    # If local installation not found or executable not found, try system Ghostscript
-    try:
-        # Try to find Ghostscript in the system PATH
-        if platform.system() == 'Windows':
-            # On Windows, look for gswin64c.exe or gswin32c.exe
-            for gs_name in ['gswin64c', 'gswin32c', 'gs']:
-                try:
-                    gs_path = subprocess.check_output(['where', gs_name], text=True).strip().split('\n')[0]
-                    return gs_path
-                except subprocess.CalledProcessError:
-                    continue
-        else:
-            # On Unix-like systems, look for gs
-            return subprocess.check_output(['which', 'gs'], text=True).strip()
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # If Ghostscript is not found in the system PATH, raise an error
-        raise PDFProcessingError("Ghostscript not found. Please install Ghostscript or check your PATH.")
-
-
 def compress_pdf(input_path, output_path, compression_level='ebook'):
     """
     Compress a PDF file using Ghostscript.
@@ -106,6 +45,7 @@ def compress_pdf(input_path, output_path, compression_level='ebook'):
             raise PDFProcessingError(f"Input file not found: {input_path}")
 
         # Validate compression level
+        compression_level = compression_level.strip().lower()
         valid_levels = ['screen', 'ebook', 'printer', 'prepress', 'default']
         if compression_level not in valid_levels:
             logger.warning(f"Invalid compression level: {compression_level}. Using 'ebook' instead.")
@@ -116,16 +56,8 @@ def compress_pdf(input_path, output_path, compression_level='ebook'):
 
         # Create a temporary directory for processing
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Get the Ghostscript executable path
-            try:
-                gs_path = get_ghostscript_path()
-            except PDFProcessingError as e:
-                logger.error(f"Failed to find Ghostscript: {str(e)}")
-                raise
-
-            # Set up Ghostscript command
-            gs_command = [
-                gs_path,
+            # Set up Ghostscript arguments
+            gs_args = [
                 '-sDEVICE=pdfwrite',
                 f'-dPDFSETTINGS=/{compression_level}',
                 '-dCompatibilityLevel=1.4',
@@ -136,13 +68,13 @@ def compress_pdf(input_path, output_path, compression_level='ebook'):
                 input_path
             ]
 
-            # Run Ghostscript
+            # Run Ghostscript on a pooled worker
             logger.info(f"Running Ghostscript with compression level: {compression_level}")
-            result = subprocess.run(gs_command, capture_output=True, text=True)
+            result = run_ghostscript(gs_args)
 
             # Check if the command was successful
-            if result.returncode != 0:
-                error_message = result.stderr.strip() if result.stderr else "Unknown error"
+            if result['returncode'] != 0:
+                error_message = result['stderr'].strip() if result['stderr'] else "Unknown error"
                 logger.error(f"Ghostscript error: {error_message}")
                 raise PDFProcessingError(f"Failed to compress PDF: {error_message}")
 
@@ -8,13 +8,16 @@ and then overlays the recognized text back onto the PDF.
 
 import os
 import subprocess
-import tempfile
 import logging
 import platform
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import fitz  # PyMuPDF
 from PIL import Image
 import pytesseract
 from app.errors import PDFProcessingError
+from tools.optimize.ocr_backends import get_ocr_backend
 
 # Import the Tesseract setup script
 import sys
@@ -29,6 +32,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of pages recognised at once (defaults to one per CPU)
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 0)) or os.cpu_count() or 1
+
+# Zoom factor used when rendering pages for OCR (2 = 144 DPI)
+OCR_ZOOM = 2
+
+# Languages written with the built-in CJK font instead of Helvetica
+CJK_LANGUAGES = {'chi_sim', 'chi_tra', 'jpn', 'kor'}
+
+# Page classes found by the pre-scan
+PAGE_VECTOR_TEXT = 'vector-text'
+PAGE_SCANNED = 'scanned'
+PAGE_MIXED = 'mixed'
+
+# Fraction of a text page that images must cover before it is OCR'd as mixed
+MIXED_IMAGE_COVERAGE = 0.1
+
+# Fraction of image area already under text for images to count as searchable
+SEARCHABLE_IMAGE_TEXT_COVERAGE = 0.5
+
+_executor = None
+_executor_lock = threading.Lock()
+
 def get_tesseract_path():
     """
     Get the path to the Tesseract executable.
@@ -126,7 +152,7 @@ def set_tesseract_path():
         return False
 
 
-def perform_ocr(input_path, output_path, language='eng'):
+def perform_ocr(input_path, output_path, language='eng', ocr_backend=None):
     """
     Perform OCR on a PDF file.
 
@@ -134,12 +160,17 @@ def perform_ocr(input_path, output_path, language='eng'):
         input_path (str): Path to the input PDF file.
         output_path (str): Path where the OCR'd PDF will be saved.
         language (str, optional): Language for OCR. Defaults to 'eng'.
+        ocr_backend (str, optional): Name of the OCR backend to use.
+            Defaults to the first available backend.
 
     Returns:
         dict: A dictionary containing information about the OCR:
             - 'page_count': Number of pages processed.
             - 'text_found': Boolean indicating if text was found.
             - 'languages': List of languages used for OCR.
+            - 'ocr_backend': Name of the OCR backend used.
+            - 'page_classes': Number of pages of each class found by the pre-scan.
+            - 'ocr_pages': Page numbers (1-based) that were sent to OCR.
 
     Raises:
         PDFProcessingError: If the OCR fails.
@@ -149,9 +180,9 @@ def perform_ocr(input_path, output_path, language='eng'):
         if not os.path.exists(input_path):
             raise PDFProcessingError(f"Input file not found: {input_path}")
 
-        # Try to set Tesseract path
-        tesseract_available = set_tesseract_path()
-        if not tesseract_available:
+        # Get the OCR engine
+        backend = get_ocr_backend(ocr_backend)
+        if backend is None:
             # If Tesseract is not installed, create a copy of the PDF and return a message
             logger.warning("Tesseract not found. Creating a copy of the PDF.")
             import shutil
@@ -176,115 +207,77 @@ def perform_ocr(input_path, output_path, language='eng'):
             logger.warning(f"Invalid language: {language}. Using 'eng' instead.")
             language = 'eng'
 
-        # Create a temporary directory for processing
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # Open the input PDF
-            input_doc = fitz.open(input_path)
-
-            # Create a new PDF for output
-            output_doc = fitz.open()
-
-            # Process each page
-            text_found = False
-            for page_num in range(input_doc.page_count):
-                # Get the page
-                page = input_doc[page_num]
-
-                # Check if the page already has text
-                text = page.get_text("text")
-                if text.strip():
-                    # Page already has text, just copy it to the output
-                    output_doc.insert_pdf(input_doc, from_page=page_num, to_page=page_num)
-                    continue
-
-                # Page doesn't have text, extract images and perform OCR
-                text_found = True
-
-                # Create a new page in the output document
-                output_page = output_doc.new_page(width=page.rect.width, height=page.rect.height)
-
-                # Copy the visual content from the input page to the output page
-                output_page.show_pdf_page(output_page.rect, input_doc, page_num)
-
-                # Instead of extracting images, render the page to an image and perform OCR on that
-                try:
-                    # Render the page to an image with higher resolution for better OCR
-                    pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # 2x zoom for better resolution
-
-                    # Save the image to a temporary file
-                    img_path = os.path.join(temp_dir, f"page_{page_num}.png")
-                    pix.save(img_path)
-
-                    # Perform OCR on the image
-                    img = Image.open(img_path)
-                    ocr_text = pytesseract.image_to_string(img, lang=language)
-
-                    if ocr_text.strip():
-                        # Add the OCR text as an invisible text layer
-                        output_page.insert_text(
-                            fitz.Point(50, 50),  # Position at the top of the page
-                            ocr_text,
-                            fontsize=12,
-                            color=(0, 0, 0)
-                            # Note: opacity parameter removed as it's not supported in this version
-                        )
-                        text_found = True
-                except Exception as e:
-                    logger.warning(f"OCR failed for page {page_num}: {str(e)}")
-
-                # Also try to extract individual images as a fallback
-                try:
-                    image_list = page.get_images(full=True)
-
-                    for img_index, img_info in enumerate(image_list):
-                        try:
-                            xref = img_info[0]  # Get the image reference
-                            base_image = input_doc.extract_image(xref)
-
-                            if base_image and "image" in base_image:
-                                image_bytes = base_image["image"]
-
-                                # Save the image to a temporary file
-                                img_path = os.path.join(temp_dir, f"page_{page_num}_img_{img_index}.png")
-                                with open(img_path, "wb") as img_file:
-                                    img_file.write(image_bytes)
-
-                                # Perform OCR on the image
-                                img = Image.open(img_path)
-                                ocr_text = pytesseract.image_to_string(img, lang=language)
-
-                                if ocr_text.strip():
-                                    # Get the image position on the page
-                                    for img_rect in page.get_image_rects(xref):
-                                        # Add the OCR text as an invisible text layer
-                                        output_page.insert_text(
-                                            img_rect.tl,  # Top-left point of the image
-                                            ocr_text,
-                                            fontsize=12,
-                                            color=(0, 0, 0)
-                                            # Note: opacity parameter removed as it's not supported in this version
-                                        )
-                                        text_found = True
-                        except Exception as e:
-                            logger.warning(f"OCR failed for image {img_index} on page {page_num}: {str(e)}")
-                except Exception as e:
-                    logger.warning(f"Failed to extract images from page {page_num}: {str(e)}")
-
-            # Get the page count before closing
-            page_count = input_doc.page_count
-
-            # Save the output document
-            output_doc.save(output_path)
-
-            # Close the documents
-            input_doc.close()
-            output_doc.close()
+        # Open the input PDF and copy it as the base of the output
+        input_doc = fitz.open(input_path)
+        output_doc = fitz.open()
+        output_doc.insert_pdf(input_doc)
+
+        executor = get_ocr_executor()
+        pending = deque()
+        window = OCR_WORKERS * 2
+        text_found = False
+
+        # Decide which pages need OCR before doing any recognition
+        plan = plan_ocr(input_doc)
+        ocr_entries = [entry for entry in plan if entry['class'] != PAGE_VECTOR_TEXT]
+        logger.info(f"OCR plan: {len(ocr_entries)} of {len(plan)} pages need recognition")
+
+        def apply_oldest():
+            # Results are applied in page order as they complete
+            entry, future = pending.popleft()
+            page_num = entry['page']
+            try:
+                words = future.result()
+            except Exception as e:
+                logger.warning(f"OCR failed for page {page_num}: {str(e)}")
+                return False
 
-            return {
-                'page_count': page_count,
-                'text_found': text_found,
-                'languages': [language]
-            }
+            # Mixed pages keep their own text; only add what's new
+            if entry['class'] == PAGE_MIXED:
+                words = drop_existing_words(input_doc[page_num], words)
+
+            return add_ocr_text(output_doc[page_num], words, language=language)
+
+        # Render pages on this thread (PyMuPDF is not thread-safe) and
+        # recognise them on the OCR workers
+        for entry in ocr_entries:
+            page = input_doc[entry['page']]
+
+            try:
+                pix = page.get_pixmap(matrix=fitz.Matrix(OCR_ZOOM, OCR_ZOOM), colorspace=fitz.csGRAY, alpha=False)
+                future = executor.submit(recognise_page, backend, pix.samples, pix.width, pix.height, language)
+                pending.append((entry, future))
+            except Exception as e:
+                logger.warning(f"Failed to render page {entry['page']} for OCR: {str(e)}")
+
+            # Bound the number of rendered pages held in memory
+            while len(pending) >= window:
+                text_found = apply_oldest() or text_found
+
+        while pending:
+            text_found = apply_oldest() or text_found
+
+        # Get the page count before closing
+        page_count = input_doc.page_count
+
+        # Save the output document
+        output_doc.save(output_path)
+
+        # Close the documents
+        input_doc.close()
+        output_doc.close()
+
+        return {
+            'page_count': page_count,
+            'text_found': text_found,
+            'languages': [language],
+            'ocr_backend': backend.name,
+            'page_classes': {
+                page_class: sum(1 for entry in plan if entry['class'] == page_class)
+                for page_class in (PAGE_VECTOR_TEXT, PAGE_SCANNED, PAGE_MIXED)
+            },
+            'ocr_pages': [entry['page'] + 1 for entry in ocr_entries]
+        }
 
     except fitz.FileDataError as e:
         logger.error(f"PDF file error: {str(e)}")
@@ -318,6 +311,175 @@ def perform_ocr(input_path, output_path, language='eng'):
             raise PDFProcessingError(f"Failed to perform OCR: {str(e)}")
 
 
+def get_ocr_executor():
+    """
+    Get the process-wide pool of OCR worker threads.
+
+    Recognition runs outside the GIL (in the Tesseract process or library),
+    so threads give one page per core without the cost of extra processes.
+
+    Returns:
+        ThreadPoolExecutor: The OCR executor.
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix='ocr')
+        return _executor
+
+
+def classify_page(page):
+    """
+    Classify a page as vector text, scanned or mixed.
+
+    Only text and image placement boxes are read, so this is cheap compared
+    with rendering or recognising the page.
+
+    Args:
+        page (fitz.Page): The page.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'page': The page number (0-based).
+            - 'class': One of PAGE_VECTOR_TEXT, PAGE_SCANNED or PAGE_MIXED.
+            - 'text_coverage': Fraction of the page covered by text blocks.
+            - 'image_coverage': Fraction of the page covered by images.
+    """
+    page_rect = page.rect * page.derotation_matrix
+    page_area = abs(page_rect) or 1
+
+    text_rects = [fitz.Rect(block[:4]) & page_rect
+                  for block in page.get_text("blocks")
+                  if block[6] == 0 and block[4].strip()]
+    image_rects = [fitz.Rect(info['bbox']) & page_rect for info in page.get_image_info()]
+
+    text_area = sum(abs(rect) for rect in text_rects)
+    image_area = sum(abs(rect) for rect in image_rects)
+    text_coverage = min(text_area / page_area, 1.0)
+    image_coverage = min(image_area / page_area, 1.0)
+
+    if not text_rects:
+        page_class = PAGE_SCANNED
+    elif image_coverage < MIXED_IMAGE_COVERAGE:
+        page_class = PAGE_VECTOR_TEXT
+    else:
+        # Images already under a text layer (e.g. an earlier OCR) are searchable
+        covered = sum(abs(text_rect & image_rect) for image_rect in image_rects for text_rect in text_rects)
+        if image_area and covered / image_area >= SEARCHABLE_IMAGE_TEXT_COVERAGE:
+            page_class = PAGE_VECTOR_TEXT
+        else:
+            page_class = PAGE_MIXED
+
+    return {
+        'page': page.number,
+        'class': page_class,
+        'text_coverage': round(text_coverage, 3),
+        'image_coverage': round(image_coverage, 3)
+    }
+
+
+def plan_ocr(doc):
+    """
+    Classify every page of a document ahead of OCR.
+
+    Args:
+        doc (fitz.Document): The document.
+
+    Returns:
+        list: One classify_page() result per page, in page order.
+    """
+    return [classify_page(page) for page in doc]
+
+
+def drop_existing_words(page, words, zoom=OCR_ZOOM):
+    """
+    Remove recognised words that fall on text the page already has.
+
+    Args:
+        page (fitz.Page): The input page.
+        words (list): A list of (x0, y0, x1, y1, word) tuples in rendered pixels.
+        zoom (float, optional): Zoom factor the page was rendered at.
+
+    Returns:
+        list: The words that are not already on the page.
+    """
+    existing = [fitz.Rect(word[:4]) * page.rotation_matrix for word in page.get_text("words")]
+    if not existing:
+        return words
+
+    new_words = []
+    for word in words:
+        center = fitz.Rect(word[:4]) * (1 / zoom)
+        center = (center.tl + center.br) / 2
+        if not any(center in rect for rect in existing):
+            new_words.append(word)
+    return new_words
+
+
+def recognise_page(backend, samples, width, height, language):
+    """
+    Recognise the words of a rendered page.
+
+    Args:
+        backend (OCRBackend): The OCR engine.
+        samples (bytes): Grayscale pixel data of the rendered page.
+        width (int): Width of the rendered page in pixels.
+        height (int): Height of the rendered page in pixels.
+        language (str): Language for OCR.
+
+    Returns:
+        list: A list of (x0, y0, x1, y1, word) tuples in rendered pixels.
+    """
+    img = Image.frombytes('L', (width, height), samples)
+    return backend.image_to_words(img, language)
+
+
+def add_ocr_text(output_page, words, zoom=OCR_ZOOM, language='eng'):
+    """
+    Add recognised words to a page as an invisible, positioned text layer.
+
+    All words are written with a single TextWriter in render mode 3
+    (invisible), so the page can be searched, copied and redacted by
+    position without changing how it looks.
+
+    Args:
+        output_page (fitz.Page): The page to write to.
+        words (list): A list of (x0, y0, x1, y1, word) tuples in rendered pixels.
+        zoom (float, optional): Zoom factor the page was rendered at.
+        language (str, optional): Language the words were recognised in.
+
+    Returns:
+        bool: True if any text was added.
+    """
+    if not words:
+        return False
+
+    font = fitz.Font('cjk' if language in CJK_LANGUAGES else 'helv')
+    writer = fitz.TextWriter(output_page.rect)
+
+    for x0, y0, x1, y1, word in words:
+        box_width = (x1 - x0) / zoom
+        box_height = (y1 - y0) / zoom
+        text_width = font.text_length(word, fontsize=1)
+        if box_width <= 0 or box_height <= 0 or text_width <= 0:
+            continue
+
+        # Size the word to fill its box so selections line up with the image
+        fontsize = min(box_width / text_width, box_height * 1.2)
+        writer.append(fitz.Point(x0 / zoom, y1 / zoom), word, font=font, fontsize=fontsize)
+
+    # Word boxes are in the rotated (displayed) page space. Derotate the
+    # whole layer, origins and glyph direction alike, in the writer's own
+    # coordinates so the words land on the unrotated page.
+    matrix = None
+    if output_page.rotation:
+        matrix = ~writer.ictm * output_page.derotation_matrix * writer.ictm
+
+    writer.write_text(output_page, render_mode=3, matrix=matrix)
+    return True
+
+
 def get_language_name(language_code):
     """
     Get the full name of a language from its code.
@@ -0,0 +1,276 @@
+"""
+OCR Backends Module
+
+This module provides the OCR engines used by tools.optimize.ocr behind a
+common interface, so the engine can be swapped and the engines compared.
+
+- 'tesserocr' drives libtesseract in-process and keeps one recogniser per
+  worker thread and language, so language models are loaded once and reused
+  across pages and jobs.
+- 'pytesseract' runs the tesseract executable once per image. It is the
+  fallback when tesserocr is not installed.
+"""
+
+import os
+import time
+import logging
+import threading
+from PIL import Image
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Backends in order of preference
+DEFAULT_BACKEND_ORDER = ['tesserocr', 'pytesseract']
+
+
+class OCRBackend:
+    """Base class for OCR engines."""
+
+    name = None
+
+    def is_available(self):
+        """
+        Check whether the engine can be used.
+
+        Returns:
+            bool: True if the engine is available.
+        """
+        raise NotImplementedError
+
+    def image_to_string(self, image, language='eng'):
+        """
+        Recognise the text in an image.
+
+        Args:
+            image (PIL.Image.Image): The image.
+            language (str, optional): Tesseract language code. Defaults to 'eng'.
+
+        Returns:
+            str: The recognised text.
+        """
+        raise NotImplementedError
+
+    def image_to_words(self, image, language='eng'):
+        """
+        Recognise the words in an image with their bounding boxes.
+
+        Args:
+            image (PIL.Image.Image): The image.
+            language (str, optional): Tesseract language code. Defaults to 'eng'.
+
+        Returns:
+            list: A list of (x0, y0, x1, y1, word) tuples in image pixels,
+                in reading order.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the engine."""
+        pass
+
+
+class TesserocrBackend(OCRBackend):
+    """OCR engine using the libtesseract API through tesserocr."""
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        return tesserocr is not None
+
+    def _get_api(self, language):
+        """
+        Get this thread's recogniser for a language, creating it if needed.
+
+        Args:
+            language (str): Tesseract language code.
+
+        Returns:
+            tesserocr.PyTessBaseAPI: The recogniser.
+        """
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+
+        api = apis.get(language)
+        if api is None:
+            tessdata = os.environ.get('TESSDATA_PREFIX')
+            if tessdata:
+                api = tesserocr.PyTessBaseAPI(path=tessdata, lang=language)
+            else:
+                api = tesserocr.PyTessBaseAPI(lang=language)
+            apis[language] = api
+            with self._lock:
+                self._apis.append(api)
+            logger.info(f"Loaded tesserocr model '{language}' on {threading.current_thread().name}")
+
+        return api
+
+    def image_to_string(self, image, language='eng'):
+        api = self._get_api(language)
+        api.SetImage(image)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def image_to_words(self, image, language='eng'):
+        api = self._get_api(language)
+        api.SetImage(image)
+        try:
+            api.Recognize()
+            words = []
+            level = tesserocr.RIL.WORD
+            for result in tesserocr.iterate_level(api.GetIterator(), level):
+                word = result.GetUTF8Text(level)
+                box = result.BoundingBox(level)
+                if word and word.strip() and box:
+                    words.append((box[0], box[1], box[2], box[3], word.strip()))
+            return words
+        finally:
+            api.Clear()
+
+    def close(self):
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+        self._local = threading.local()
+
+
+class PytesseractBackend(OCRBackend):
+    """OCR engine running the tesseract executable through pytesseract."""
+
+    name = 'pytesseract'
+
+    def is_available(self):
+        # Imported here to avoid a circular import with the OCR module
+        from tools.optimize.ocr import set_tesseract_path
+        return set_tesseract_path()
+
+    def image_to_string(self, image, language='eng'):
+        return pytesseract.image_to_string(image, lang=language)
+
+    def image_to_words(self, image, language='eng'):
+        data = pytesseract.image_to_data(image, lang=language, output_type=pytesseract.Output.DICT)
+        words = []
+        for index, word in enumerate(data['text']):
+            # Level 5 rows are words; a confidence of -1 marks layout rows
+            if data['level'][index] != 5 or float(data['conf'][index]) < 0 or not word.strip():
+                continue
+            left, top = data['left'][index], data['top'][index]
+            words.append((left, top, left + data['width'][index], top + data['height'][index], word.strip()))
+        return words
+
+
+# Dictionary mapping backend names to their classes
+OCR_BACKENDS = {
+    TesserocrBackend.name: TesserocrBackend,
+    PytesseractBackend.name: PytesseractBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_ocr_backend(name=None):
+    """
+    Get an OCR backend, reusing the process-wide instance if there is one.
+
+    Args:
+        name (str, optional): Backend name. Defaults to the OCR_BACKEND
+            environment variable, or the first available backend.
+
+    Returns:
+        OCRBackend: The backend, or None if no requested backend is available.
+    """
+    name = name or os.environ.get('OCR_BACKEND')
+    candidates = [name] if name else DEFAULT_BACKEND_ORDER
+
+    with _backends_lock:
+        for candidate in candidates:
+            if candidate in _backends:
+                return _backends[candidate]
+
+            backend_class = OCR_BACKENDS.get(candidate)
+            if backend_class is None:
+                logger.warning(f"Unknown OCR backend: {candidate}")
+                continue
+
+            backend = backend_class()
+            if backend.is_available():
+                _backends[candidate] = backend
+                logger.info(f"Using OCR backend: {candidate}")
+                return backend
+
+    return None
+
+
+def benchmark_ocr_backends(images, language='eng', names=None):
+    """
+    Time the available OCR backends on the same images.
+
+    Args:
+        images (list): PIL images to recognise.
+        language (str, optional): Tesseract language code. Defaults to 'eng'.
+        names (list, optional): Backend names to compare. Defaults to all.
+
+    Returns:
+        dict: Dictionary mapping each backend name to a dictionary with
+            'available', 'seconds', 'images_per_second' and 'characters'.
+    """
+    results = {}
+
+    for name in names or list(OCR_BACKENDS):
+        backend = get_ocr_backend(name)
+        if backend is None:
+            results[name] = {'available': False}
+            continue
+
+        # Warm up so model loading isn't counted
+        if images:
+            backend.image_to_string(images[0], language)
+
+        start_time = time.perf_counter()
+        characters = sum(len(backend.image_to_string(image, language)) for image in images)
+        seconds = time.perf_counter() - start_time
+
+        results[name] = {
+            'available': True,
+            'seconds': seconds,
+            'images_per_second': len(images) / seconds if seconds > 0 else 0,
+            'characters': characters
+        }
+
+    return results
+
+
+if __name__ == '__main__':
+    # Usage: python -m tools.optimize.ocr_backends file.pdf [language]
+    import sys
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(sys.argv[1])
+    pages = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2), colorspace=fitz.csGRAY, alpha=False)
+        pages.append(Image.frombytes('L', (pix.width, pix.height), pix.samples))
+    doc.close()
+
+    for backend_name, result in benchmark_ocr_backends(pages, *sys.argv[2:3]).items():
+        print(f"{backend_name}: {result}")
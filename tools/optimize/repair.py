@@ -12,7 +12,7 @@ import logging
 import platform
 import fitz  # PyMuPDF
 from app.errors import PDFProcessingError
-from tools.optimize.compress import get_ghostscript_path
+from tools.utils.ghostscript import run_ghostscript
 
 # Configure logging
 logging.basicConfig(
@@ -136,13 +136,9 @@ def repair_with_ghostscript(input_path, output_path):
         PDFProcessingError: If the repair fails.
     """
     try:
-        # Get the Ghostscript executable path
-        gs_path = get_ghostscript_path()
-        
-        # Set up Ghostscript command for repair
+        # Set up Ghostscript arguments for repair
         # We use the pdfwrite device which will reinterpret and rebuild the PDF
-        gs_command = [
-            gs_path,
+        gs_args = [
             '-sDEVICE=pdfwrite',
             '-dPDFSETTINGS=/prepress',  # Use prepress quality to preserve as much as possible
             '-dDetectDuplicateImages=true',
@@ -161,13 +157,13 @@ def repair_with_ghostscript(input_path, output_path):
             input_path
         ]
         
-        # Run Ghostscript
+        # Run Ghostscript on a pooled worker
         logger.info("Running Ghostscript for PDF repair")
-        result = subprocess.run(gs_command, capture_output=True, text=True)
+        result = run_ghostscript(gs_args)
         
         # Check if the command was successful
-        if result.returncode != 0:
-            error_message = result.stderr.strip() if result.stderr else "Unknown error"
+        if result['returncode'] != 0:
+            error_message = result['stderr'].strip() if result['stderr'] else "Unknown error"
             logger.error(f"Ghostscript error: {error_message}")
             raise PDFProcessingError(f"Failed to repair PDF with Ghostscript: {error_message}")
         
@@ -2,13 +2,25 @@
 PDF Merge Module
 
 This module provides functionality for merging multiple PDF files into a single PDF.
-It uses PyMuPDF (fitz) to combine PDFs while preserving their content and structure.
+Merging uses pikepdf (qpdf), which copies the structure of each page and
+only reads stream data, such as page images, when the output is written, so
+large batches of scans are merged without holding their content in memory.
+
+Fonts and images that are identical across inputs are written once. Inputs
+are opened, checked and copied in a single pass; every MERGE_CHUNK_FILES
+inputs the result so far is written to disk and the inputs closed, which
+bounds the number of files open at once.
+
+Page information is read with PyMuPDF (fitz).
 """
 
 import os
+import hashlib
 import logging
 import fitz  # PyMuPDF
+import pikepdf
 from app.errors import PDFProcessingError
+from app.security.process_pool import report_progress
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +29,124 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of inputs kept open before the result so far is written to disk
+MERGE_CHUNK_FILES = int(os.environ.get('MERGE_CHUNK_FILES', 64))
+
+# Page resources that are shared between inputs when identical
+SHARED_RESOURCES = ('/Font', '/XObject')
+
+
+class _ResourceDeduplicator:
+    """
+    Class for sharing identical fonts and images between the merged pages.
+
+    Resources are compared by content: their stream data and dictionaries,
+    including the objects they refer to, such as font files and image masks.
+    The first copy of each resource is kept and later copies are pointed at
+    it; qpdf doesn't write the copies that are no longer referenced.
+    """
+
+    def __init__(self, pdf):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            pdf: The pikepdf.Pdf being merged into.
+        """
+        self.pdf = pdf
+        # Content hash -> where the first copy is, as (page index, category, name).
+        # Locations stay valid when the merged PDF is written and reopened.
+        self._first = {}
+        # Object number -> content hash, for objects already hashed
+        self._hashes = {}
+        self.shared = 0
+
+    def reopened(self, pdf):
+        """Continue with the merged PDF reopened from disk, which renumbers its objects."""
+        self.pdf = pdf
+        self._hashes = {}
+
+    def _hash(self, obj, active=()):
+        """Get the content hash of an object and everything it refers to."""
+        if not isinstance(obj, pikepdf.Object):
+            # Numbers, strings and booleans come back as Python values
+            return hashlib.sha256(f"{type(obj).__name__}:{obj!r}".encode('utf-8')).hexdigest()
+
+        objgen = obj.objgen if obj.is_indirect else None
+        if objgen in self._hashes:
+            return self._hashes[objgen]
+        if objgen is not None and objgen in active:
+            # Back reference, e.g. a font's /Parent; its content is hashed already
+            return 'cycle'
+        if objgen is not None:
+            active = active + (objgen,)
+
+        digest = hashlib.sha256()
+        if isinstance(obj, pikepdf.Stream):
+            digest.update(b'stream')
+            digest.update(obj.read_raw_bytes())
+            items = ((key, value) for key, value in obj.stream_dict.items() if key != '/Length')
+        elif isinstance(obj, pikepdf.Dictionary):
+            items = obj.items()
+        elif isinstance(obj, pikepdf.Array):
+            items = enumerate(obj)
+        else:
+            digest.update(repr(obj).encode('utf-8'))
+            items = ()
+
+        for key, value in sorted(items, key=lambda item: str(item[0])):
+            digest.update(str(key).encode('utf-8'))
+            digest.update(self._hash(value, active).encode('ascii'))
+
+        result = digest.hexdigest()
+        if objgen is not None:
+            self._hashes[objgen] = result
+        return result
+
+    def _is_shared(self, category, obj):
+        """Check whether a resource is one that is shared: a font or an image."""
+        if not obj.is_indirect:
+            return False
+        if category == '/XObject':
+            return obj.get('/Subtype') == pikepdf.Name.Image
+        return True
+
+    def add_pages(self, start):
+        """
+        Share the resources of the pages from start on with earlier pages.
+
+        Args:
+            start: Index of the first page to process.
+        """
+        pages = self.pdf.pages
+        for index in range(start, len(pages)):
+            resources = pages[index].obj.get('/Resources')
+            if resources is None:
+                continue
+
+            for category in SHARED_RESOURCES:
+                entries = resources.get(category)
+                if not isinstance(entries, pikepdf.Dictionary):
+                    continue
+
+                for name in list(entries.keys()):
+                    obj = entries[name]
+                    if not self._is_shared(category, obj):
+                        continue
+
+                    key = self._hash(obj)
+                    location = self._first.get(key)
+                    if location is None:
+                        self._first[key] = (index, category, name)
+                        continue
+
+                    first_index, first_category, first_name = location
+                    first = pages[first_index].obj.Resources[first_category][first_name]
+                    if first.objgen != obj.objgen:
+                        entries[name] = first
+                        self.shared += 1
+
+
 def merge_pdfs(input_paths, output_path, toc=True):
     """
     Merge multiple PDF files into a single PDF.
@@ -32,10 +162,18 @@ def merge_pdfs(input_paths, output_path, toc=True):
             - 'total_pages': Total number of pages in the merged PDF.
             - 'file_sizes': Dictionary mapping input file paths to their sizes in bytes.
             - 'output_size': Size of the output file in bytes.
+            - 'shared_resources': Number of font and image references
+              pointed at an identical copy from an earlier page.
     
     Raises:
         PDFProcessingError: If the merge fails.
     """
+    # Intermediate results, written alternately so the open one is never overwritten
+    temp_paths = [f"{output_path}.{os.getpid()}.{n}.tmp" for n in range(2)]
+    checkpoints = 0
+    merged = None
+    sources = []
+
     try:
         # Validate input files
         if not input_paths:
@@ -44,16 +182,9 @@ def merge_pdfs(input_paths, output_path, toc=True):
         for path in input_paths:
             if not os.path.exists(path):
                 raise PDFProcessingError(f"Input file not found: {path}")
-            
-            # Check if the file is a valid PDF
-            try:
-                doc = fitz.open(path)
-                doc.close()
-            except Exception as e:
-                raise PDFProcessingError(f"Invalid PDF file: {path} - {str(e)}")
         
-        # Create a new PDF document
-        merged_doc = fitz.open()
+        merged = pikepdf.Pdf.new()
+        dedup = _ResourceDeduplicator(merged)
         
         # Track file sizes and total pages
         file_sizes = {}
@@ -61,48 +192,73 @@ def merge_pdfs(input_paths, output_path, toc=True):
         toc_entries = []
         
         # Process each input file
-        for path in input_paths:
+        for done, path in enumerate(input_paths, 1):
             # Get file size
             file_sizes[path] = os.path.getsize(path)
             
-            # Open the PDF
-            doc = fitz.open(path)
+            # Opening the PDF is what checks that it is valid
+            try:
+                source = pikepdf.open(path)
+            except Exception as e:
+                raise PDFProcessingError(f"Invalid PDF file: {path} - {str(e)}")
+            sources.append(source)
             
             # Get the filename without extension for TOC
             filename = os.path.basename(path)
             filename = os.path.splitext(filename)[0]
             
+            page_count = len(source.pages)
+            
             # Add TOC entry for this file
-            if toc and doc.page_count > 0:
-                toc_entries.append([1, filename, total_pages + 1])
+            if toc and page_count > 0:
+                toc_entries.append((filename, total_pages))
             
-            # Add pages from this document to the merged document
-            merged_doc.insert_pdf(doc, from_page=0, to_page=doc.page_count-1)
+            # Add pages from this document to the merged document. Only
+            # their structure is copied; stream data is read when it is written.
+            merged.pages.extend(source.pages)
+            dedup.add_pages(total_pages)
             
             # Update total pages
-            total_pages += doc.page_count
+            total_pages += page_count
             
-            # Close the document
-            doc.close()
+            # Write out what has been merged so far and let go of the inputs
+            if len(sources) >= MERGE_CHUNK_FILES and done < len(input_paths):
+                temp_path = temp_paths[checkpoints % 2]
+                merged.save(temp_path)
+                merged.close()
+                merged = None
+                for source in sources:
+                    source.close()
+                sources = []
+                
+                merged = pikepdf.open(temp_path)
+                dedup.reopened(merged)
+                checkpoints += 1
+                logger.info(f"Merge checkpoint after {done} of {len(input_paths)} files ({total_pages} pages)")
+            
+            report_progress({'files_done': done, 'files_total': len(input_paths), 'pages': total_pages})
         
         # Set the table of contents if requested
         if toc and toc_entries:
-            merged_doc.set_toc(toc_entries)
+            with merged.open_outline() as outline:
+                outline.root.extend(pikepdf.OutlineItem(title, page) for title, page in toc_entries)
         
-        # Save the merged document
-        merged_doc.save(output_path)
+        # Save the merged document, compressing any uncompressed streams
+        merged.save(output_path, compress_streams=True,
+                    object_stream_mode=pikepdf.ObjectStreamMode.generate)
         
         # Get output file size
         output_size = os.path.getsize(output_path)
         
-        # Close the merged document
-        merged_doc.close()
+        if dedup.shared:
+            logger.info(f"Merge shared {dedup.shared} duplicate fonts and images")
         
         return {
             'input_count': len(input_paths),
             'total_pages': total_pages,
             'file_sizes': file_sizes,
-            'output_size': output_size
+            'output_size': output_size,
+            'shared_resources': dedup.shared
         }
     
     except PDFProcessingError:
@@ -112,6 +268,16 @@ def merge_pdfs(input_paths, output_path, toc=True):
     except Exception as e:
         logger.error(f"Error merging PDFs: {str(e)}")
         raise PDFProcessingError(f"Failed to merge PDFs: {str(e)}")
+    
+    finally:
+        # Close the documents and remove the intermediate results
+        if merged is not None:
+            merged.close()
+        for source in sources:
+            source.close()
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
 
 def get_pdf_info(pdf_path):
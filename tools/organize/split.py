@@ -6,9 +6,16 @@ It supports splitting by individual pages, page ranges, or file size.
 """
 
 import os
+import re
+import sys
+import json
+import time
 import logging
+import subprocess
 import fitz  # PyMuPDF
 from app.errors import PDFProcessingError
+from tools.organize.split_worker import write_parts, SAVE_OPTIONS
+from tools.utils.worker_reply import parse_worker_reply
 
 # Configure logging
 logging.basicConfig(
@@ -17,7 +24,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def split_pdf(input_path, output_dir, split_method='pages', page_ranges=None, max_size=None):
+# Number of processes used to write the parts of a document. Each tool job runs in its own
+# process pool child, so a default of one per CPU would start CPUs squared
+# processes when the pool is busy; a few workers per job is enough
+SPLIT_WORKERS = int(os.environ.get('SPLIT_WORKERS', 0)) or min(4, os.cpu_count() or 1)
+
+# Splits into fewer parts than this are written in-process, since starting
+# the workers would cost more than it saves
+PARALLEL_MIN_PARTS = 16
+
+# Maximum time in seconds a split worker may take
+SPLIT_TIMEOUT = 600
+
+# Script run by each split worker process
+SPLIT_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'split_worker.py')
+
+# Bytes a part needs whatever its pages: header, catalog, page tree, xref table and trailer
+PART_OVERHEAD = 1024
+
+# Bytes an object needs besides its dictionary: "N 0 obj", "endobj" and its xref entry
+OBJECT_OVERHEAD = 40
+
+# Bytes a stream needs besides its data: "stream" and "endstream"
+STREAM_OVERHEAD = 20
+
+# References that lead away from a page rather than to what it uses
+BACK_REFERENCE = re.compile(r'/(?:Parent|P)\s+\d+\s+\d+\s+R')
+
+# Indirect object references
+REFERENCE = re.compile(r'(\d+)\s+\d+\s+R')
+
+def split_pdf(input_path, output_dir, split_method='pages', page_ranges=None, max_size=None,
+              manifest=False, workers=None):
     """
     Split a PDF file into multiple PDFs.
     
@@ -33,12 +71,18 @@ def split_pdf(input_path, output_dir, split_method='pages', page_ranges=None, ma
             Required if split_method is 'range'.
         max_size (int, optional): Maximum size in MB for each split PDF.
             Required if split_method is 'size'.
+        manifest (bool, optional): Whether to also write a JSON manifest
+            listing each output PDF with its pages and size. Defaults to False.
+        workers (int, optional): Maximum number of processes to write the
+            output PDFs on. Defaults to SPLIT_WORKERS; splits into few parts
+            are always written in-process.
     
     Returns:
         dict: A dictionary containing information about the split:
             - 'input_page_count': Number of pages in the input PDF.
             - 'output_count': Number of output PDFs created.
             - 'output_files': List of paths to the output PDFs.
+            - 'manifest_file': Path to the manifest, if one was written.
     
     Raises:
         PDFProcessingError: If the split fails.
@@ -79,112 +123,63 @@ def split_pdf(input_path, output_dir, split_method='pages', page_ranges=None, ma
         output_files = []
         
         # Split the PDF based on the specified method
+        # Each part is (first page, last page, output path), 0-based
+        parts = []
         if split_method == 'pages':
             # Split into individual pages
             for page_num in range(input_page_count):
-                # Create a new PDF document
-                new_doc = fitz.open()
-                
-                # Insert the page
-                new_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-                
-                # Generate output filename
                 output_filename = f"{base_filename}_page_{page_num + 1}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # Save the new document
-                new_doc.save(output_path)
-                
-                # Add to output files list
-                output_files.append(output_path)
-                
-                # Close the new document
-                new_doc.close()
-        
+                parts.append((page_num, page_num, os.path.join(output_dir, output_filename)))
+
         elif split_method == 'range':
             # Parse page ranges
             ranges = parse_page_ranges(page_ranges, input_page_count)
-            
+
             # Split by page ranges
-            for i, page_range in enumerate(ranges):
-                # Create a new PDF document
-                new_doc = fitz.open()
-                
-                # Get start and end page numbers (0-based)
-                start_page = page_range[0] - 1
-                end_page = page_range[1] - 1
-                
-                # Insert the pages
-                new_doc.insert_pdf(doc, from_page=start_page, to_page=end_page)
-                
-                # Generate output filename
+            for page_range in ranges:
                 output_filename = f"{base_filename}_pages_{page_range[0]}-{page_range[1]}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
-                
-                # Save the new document
-                new_doc.save(output_path)
-                
-                # Add to output files list
-                output_files.append(output_path)
-                
-                # Close the new document
-                new_doc.close()
-        
+                parts.append((page_range[0] - 1, page_range[1] - 1, os.path.join(output_dir, output_filename)))
+
         elif split_method == 'size':
             # Convert max size from MB to bytes
             max_bytes = max_size * 1024 * 1024
-            
+
             # Split by file size
-            current_doc = fitz.open()
-            current_size = 0
-            part_num = 1
-            
-            for page_num in range(input_page_count):
-                # Create a temporary document with just this page
-                temp_doc = fitz.open()
-                temp_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-                
-                # Save to a temporary file to get its size
-                temp_path = os.path.join(output_dir, "_temp.pdf")
-                temp_doc.save(temp_path)
-                temp_size = os.path.getsize(temp_path)
-                os.remove(temp_path)
-                temp_doc.close()
-                
-                # Check if adding this page would exceed the max size
-                if current_size + temp_size > max_bytes and current_doc.page_count > 0:
-                    # Save the current document
-                    output_filename = f"{base_filename}_part_{part_num}.pdf"
-                    output_path = os.path.join(output_dir, output_filename)
-                    current_doc.save(output_path)
-                    output_files.append(output_path)
-                    
-                    # Start a new document
-                    current_doc.close()
-                    current_doc = fitz.open()
-                    current_size = 0
-                    part_num += 1
-                
-                # Add the page to the current document
-                current_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
-                current_size += temp_size
-            
-            # Save the last document if it has any pages
-            if current_doc.page_count > 0:
+            start = 0
+            for part_num, (end, data) in enumerate(split_by_size(doc, max_bytes), start=1):
                 output_filename = f"{base_filename}_part_{part_num}.pdf"
                 output_path = os.path.join(output_dir, output_filename)
-                current_doc.save(output_path)
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                parts.append((start, end, output_path))
                 output_files.append(output_path)
-                current_doc.close()
-        
-        # Close the input document
-        doc.close()
-        
-        return {
+                start = end + 1
+
+        if split_method != 'size':
+            workers = min(workers or SPLIT_WORKERS, len(parts))
+            if workers > 1 and len(parts) >= PARALLEL_MIN_PARTS:
+                # The workers open the document themselves
+                doc.close()
+                doc = None
+                output_files = write_parts_parallel(input_path, parts, workers)
+            else:
+                output_files = write_parts(doc, parts)
+
+        result = {
             'input_page_count': input_page_count,
             'output_count': len(output_files),
             'output_files': output_files
         }
+
+        if manifest:
+            result['manifest_file'] = write_manifest(input_path, output_dir, base_filename,
+                                                     split_method, input_page_count, parts)
+
+        # Close the input document
+        if doc is not None:
+            doc.close()
+        
+        return result
     
     except PDFProcessingError:
         # Re-raise PDFProcessingError
@@ -251,3 +246,265 @@ def parse_page_ranges(page_ranges_str, max_pages):
     except Exception as e:
         logger.error(f"Error parsing page ranges: {str(e)}")
         raise PDFProcessingError(f"Failed to parse page ranges: {str(e)}")
+
+
+class _SizeEstimator:
+    """Estimates what the pages of a document add to the size of a part made from them."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._sizes = {}
+        self._children = {}
+        self._pages = {}
+
+    def object_size(self, xref):
+        """Get the estimated number of bytes an object takes in a saved file."""
+        size = self._sizes.get(xref)
+        if size is None:
+            size = len(self.doc.xref_object(xref, compressed=True)) + OBJECT_OVERHEAD
+            if self.doc.xref_is_stream(xref):
+                size += self._stream_length(xref) + STREAM_OVERHEAD
+            self._sizes[xref] = size
+        return size
+
+    def _stream_length(self, xref):
+        """Get the length of a stream's data as stored, without reading it."""
+        value_type, value = self.doc.xref_get_key(xref, 'Length')
+        if value_type == 'xref':
+            value = self.doc.xref_object(int(value.split()[0]), compressed=True)
+        try:
+            return int(value)
+        except ValueError:
+            return len(self.doc.xref_stream_raw(xref) or b'')
+
+    def _references(self, xref):
+        """Get the objects an object refers to, leaving out other pages and its parents."""
+        children = self._children.get(xref)
+        if children is None:
+            source = BACK_REFERENCE.sub('', self.doc.xref_object(xref, compressed=True))
+            children = []
+            for match in REFERENCE.finditer(source):
+                child = int(match.group(1))
+                if not 0 < child < self.doc.xref_length():
+                    continue
+                # Links to other pages are not copied with this one
+                if child not in self._pages and self.doc.xref_get_key(child, 'Type')[1] not in ('/Page', '/Pages'):
+                    children.append(child)
+            self._children[xref] = children
+        return children
+
+    def _inherited_resources(self, page_xref):
+        """Get the objects referenced by resources a page inherits from the page tree."""
+        xref = page_xref
+        while self.doc.xref_get_key(xref, 'Resources')[0] == 'null':
+            value_type, value = self.doc.xref_get_key(xref, 'Parent')
+            if value_type != 'xref':
+                return []
+            xref = int(value.split()[0])
+            value_type, value = self.doc.xref_get_key(xref, 'Resources')
+            if value_type == 'xref':
+                return [int(value.split()[0])]
+            if value_type == 'dict':
+                return [int(match.group(1)) for match in REFERENCE.finditer(value)]
+        return []
+
+    def page_objects(self, page_num):
+        """
+        Get the objects a page needs, with their estimated sizes.
+
+        Args:
+            page_num (int): 0-based page number.
+
+        Returns:
+            dict: Estimated size in bytes of each object, by xref.
+        """
+        if not self._pages:
+            for number in range(self.doc.page_count):
+                self._pages[self.doc.page_xref(number)] = number
+
+        page_xref = self.doc.page_xref(page_num)
+        objects = {}
+        pending = [page_xref] + self._inherited_resources(page_xref)
+        while pending:
+            xref = pending.pop()
+            if xref in objects:
+                continue
+            objects[xref] = self.object_size(xref)
+            pending.extend(child for child in self._references(xref) if child not in objects)
+        return objects
+
+
+def _part_bytes(doc, start, end):
+    """Build the part with pages start to end (0-based, inclusive) in memory."""
+    part = fitz.open()
+    try:
+        # One insert copies resources the pages share only once
+        part.insert_pdf(doc, from_page=start, to_page=end)
+        return part.tobytes(**SAVE_OPTIONS)
+    finally:
+        part.close()
+
+
+def split_by_size(doc, max_bytes):
+    """
+    Split a document into parts of consecutive pages of at most max_bytes.
+
+    Each page's cost is estimated from the objects it references, counting
+    objects that pages share, such as fonts and images, once per part.
+    Each part is then built once in memory; if it turns out too large after
+    all, a binary search finds how many of its pages do fit. A single page
+    larger than max_bytes becomes a part of its own.
+
+    Args:
+        doc (fitz.Document): The document to split.
+        max_bytes (int): Maximum size of a part in bytes.
+
+    Yields:
+        tuple: (last page of the part (0-based), the part as PDF bytes).
+    """
+    estimator = _SizeEstimator(doc)
+    # How the real sizes compare to the estimates, learnt from each part
+    correction = 1.0
+    start = 0
+
+    while start < doc.page_count:
+        # Add pages while the estimate stays under the limit
+        objects = {}
+        estimate = PART_OVERHEAD
+        end = start
+        for page_num in range(start, doc.page_count):
+            new_objects = {xref: size for xref, size in estimator.page_objects(page_num).items()
+                           if xref not in objects}
+            added = sum(new_objects.values())
+            if page_num > start and (estimate + added) * correction > max_bytes:
+                break
+            objects.update(new_objects)
+            estimate += added
+            end = page_num
+
+        data = _part_bytes(doc, start, end)
+        correction = len(data) / estimate
+
+        if len(data) > max_bytes and end > start:
+            # Find the most pages from start that fit
+            logger.info(f"Part from page {start + 1} is {len(data)} bytes, over {max_bytes}; searching")
+            low, high = start, end - 1
+            data = None
+            while low <= high:
+                middle = (low + high) // 2
+                candidate = _part_bytes(doc, start, middle)
+                if len(candidate) <= max_bytes:
+                    end, data = middle, candidate
+                    low = middle + 1
+                else:
+                    high = middle - 1
+            if data is None:
+                end = start
+                data = _part_bytes(doc, start, end)
+
+        if len(data) > max_bytes:
+            logger.warning(f"Page {start + 1} alone is {len(data)} bytes, over the limit of {max_bytes}")
+
+        yield end, data
+        start = end + 1
+
+
+def write_parts_parallel(input_path, parts, workers):
+    """
+    Write the parts of a split on several worker processes.
+
+    Each worker gets a run of consecutive parts, so pages that share fonts
+    and images stay in one process. The workers are plain subprocesses
+    rather than a multiprocessing pool because tools already run in daemonic
+    pool children.
+
+    Args:
+        input_path (str): Path to the PDF file.
+        parts (list): (start, end, output_path) of each part, 0-based pages.
+        workers (int): Number of worker processes.
+
+    Returns:
+        list: Paths to the parts, in the order of parts.
+
+    Raises:
+        PDFProcessingError: If a worker fails.
+    """
+    # Give each worker about the same number of pages
+    total_pages = sum(end - start + 1 for start, end, output_path in parts)
+    slices = [[] for _ in range(workers)]
+    pages_before = 0
+    for part in parts:
+        slices[min(pages_before * workers // total_pages, workers - 1)].append(part)
+        pages_before += part[1] - part[0] + 1
+    slices = [part_slice for part_slice in slices if part_slice]
+
+    processes = []
+
+    try:
+        for part_slice in slices:
+            job = json.dumps({'input_path': input_path, 'parts': part_slice})
+            process = subprocess.Popen(
+                [sys.executable, SPLIT_WORKER_SCRIPT, job],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            processes.append(process)
+
+        output_files = []
+        deadline = time.monotonic() + SPLIT_TIMEOUT
+        for process in processes:
+            try:
+                stdout, stderr = process.communicate(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                raise PDFProcessingError("Splitting the PDF took too long.")
+
+            reply = parse_worker_reply(stdout, stderr, process.returncode)
+
+            if 'error' in reply:
+                raise PDFProcessingError(f"Failed to write split PDFs: {reply['error']}")
+
+            output_files.extend(reply['output_files'])
+
+        return output_files
+
+    finally:
+        # Stop the other workers if one of them failed
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.communicate()
+
+
+def write_manifest(input_path, output_dir, base_filename, split_method, page_count, parts):
+    """
+    Write a JSON manifest of the parts of a split.
+
+    Args:
+        input_path (str): Path to the PDF that was split.
+        output_dir (str): Directory the parts were written to.
+        base_filename (str): Name the part filenames start with.
+        split_method (str): How the PDF was split.
+        page_count (int): Number of pages in the PDF that was split.
+        parts (list): (start, end, output_path) of each part, 0-based pages.
+
+    Returns:
+        str: Path to the manifest.
+    """
+    manifest = {
+        'source': os.path.basename(input_path),
+        'split_method': split_method,
+        'page_count': page_count,
+        'parts': [{
+            'file': os.path.basename(output_path),
+            'first_page': start + 1,
+            'last_page': end + 1,
+            'size': os.path.getsize(output_path)
+        } for start, end, output_path in parts]
+    }
+
+    manifest_path = os.path.join(output_dir, f"{base_filename}_manifest.json")
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
@@ -0,0 +1,85 @@
+"""
+PDF Split Worker
+
+This module writes the parts of a split PDF. It is used in-process by
+tools.organize.split, and is also the entry point of the worker processes
+that write the parts of a long document in parallel. Each worker opens the
+document once for all of its parts, so nothing but file paths crosses the
+process boundary.
+
+Protocol: the JSON job as the only argument, one JSON reply as the last line
+of stdout.
+    {"input_path": ..., "parts": [[0, 0, "/out/doc_page_1.pdf"], ...]}
+        -> {"output_files": ["...", "..."]} or {"error": "..."}
+
+Part page numbers are 0-based and inclusive. It only imports PyMuPDF so that
+starting it stays cheap.
+"""
+
+import sys
+import json
+import fitz  # PyMuPDF
+
+# Options every part is saved with: drop unused and duplicate objects and
+# compress streams, so a part only carries what its pages use
+SAVE_OPTIONS = {'garbage': 3, 'deflate': True}
+
+
+def write_part(doc, start, end, output_path):
+    """
+    Write pages of a document to a new PDF file.
+
+    The pages are copied with one insert, which brings only the objects they
+    reference, so the cost depends on the part rather than on the size of
+    the whole document.
+
+    Args:
+        doc (fitz.Document): The open document.
+        start (int): First page (0-based).
+        end (int): Last page (0-based, inclusive).
+        output_path (str): Path to write the part to.
+
+    Returns:
+        str: output_path.
+    """
+    part = fitz.open()
+    try:
+        part.insert_pdf(doc, from_page=start, to_page=end)
+        part.save(output_path, **SAVE_OPTIONS)
+    finally:
+        part.close()
+    return output_path
+
+
+def write_parts(doc, parts):
+    """
+    Write parts of a document to PDF files.
+
+    Args:
+        doc (fitz.Document): The open document.
+        parts (list): (start, end, output_path) of each part.
+
+    Returns:
+        list: Paths to the parts, in the order given.
+    """
+    return [write_part(doc, start, end, output_path) for start, end, output_path in parts]
+
+
+def main(argv):
+    """Run the split job given on the command line."""
+    try:
+        job = json.loads(argv[1])
+        doc = fitz.open(job['input_path'])
+        try:
+            reply = {'output_files': write_parts(doc, job['parts'])}
+        finally:
+            doc.close()
+    except Exception as e:
+        reply = {'error': str(e)}
+
+    sys.stdout.write(json.dumps(reply) + '\n')
+    return 1 if 'error' in reply else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
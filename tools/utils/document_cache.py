@@ -0,0 +1,252 @@
+"""
+Open Document Cache Module
+
+This module keeps recently used PDF documents open in each process, so that
+the editors' interactive calls don't open and parse the same file over and
+over while a user works on it.
+
+Documents are keyed by path, modification time and size, so a file that has
+been rewritten is never served from a stale document. Edits check a document
+out of the cache and close it once it has been saved. It can't go back in:
+one saved to another file is still bound to its input, and PyMuPDF writes a
+second incremental save of a document at the end of the file as it was when
+opened, over the first one, which would break the edit journal's offsets.
+
+PyMuPDF documents are not safe to use from several threads at once, so a
+document is only ever used by one caller at a time.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import fitz  # PyMuPDF
+from app.errors import PDFProcessingError
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Maximum number of documents kept open per process
+DOCUMENT_CACHE_SIZE = int(os.environ.get('DOCUMENT_CACHE_SIZE', 8))
+
+# Maximum total file size of the documents kept open per process
+DOCUMENT_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+
+
+def _file_key(path):
+    """Get the cache key of a file as it is on disk now."""
+    info = os.stat(path)
+    return (os.path.abspath(path), info.st_mtime_ns, info.st_size)
+
+
+class _Entry:
+    """An open document and its bookkeeping."""
+
+    def __init__(self, key, doc):
+        self.key = key
+        self.doc = doc
+        self.size = key[2]
+        self.lock = threading.Lock()
+        self.users = 0
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.doc.close()
+
+
+class DocumentCache:
+    """Class for keeping recently used documents open, least recently used first out."""
+
+    def __init__(self, max_documents=DOCUMENT_CACHE_SIZE, max_bytes=DOCUMENT_CACHE_MAX_BYTES):
+        """
+        Initialize the document cache.
+
+        Args:
+            max_documents: Maximum number of documents kept open.
+            max_bytes: Maximum total file size of the documents kept open.
+        """
+        self.max_documents = max_documents
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _discard(self, entry):
+        """Drop an entry, closing its document once nobody is using it. Call with the lock held."""
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+            self._size -= entry.size
+        if entry.users == 0:
+            entry.close()
+
+    def _add(self, entry):
+        """Add an entry, evicting the least recently used ones. Call with the lock held."""
+        old = self._entries.get(entry.key)
+        if old is not None:
+            self._discard(old)
+        self._entries[entry.key] = entry
+        self._size += entry.size
+
+        while len(self._entries) > self.max_documents or (self._size > self.max_bytes and len(self._entries) > 1):
+            oldest = next(iter(self._entries.values()))
+            if oldest is entry:
+                break
+            self._discard(oldest)
+
+    def _forget_path(self, path):
+        """Drop every entry of a path. Call with the lock held."""
+        path = os.path.abspath(path)
+        for entry in [e for key, e in self._entries.items() if key[0] == path]:
+            self._discard(entry)
+
+    @contextmanager
+    def open(self, path):
+        """
+        Use a document for reading.
+
+        The document must not be modified; use edit() for that.
+
+        Args:
+            path: Path to the PDF file.
+
+        Yields:
+            fitz.Document: The open document.
+        """
+        key = _file_key(path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Older versions of the file are of no use any more
+                self._forget_path(path)
+            else:
+                self._entries.move_to_end(key)
+                entry.users += 1
+
+        if entry is None:
+            entry = _Entry(key, fitz.open(path))
+            with self._lock:
+                # If another caller opened it meanwhile, ours is used uncached
+                if key not in self._entries:
+                    self._add(entry)
+                entry.users += 1
+
+        try:
+            with entry.lock:
+                yield entry.doc
+        finally:
+            with self._lock:
+                entry.users -= 1
+                if entry.users == 0 and self._entries.get(key) is not entry:
+                    entry.close()
+
+    @contextmanager
+    def edit(self, input_path, output_path):
+        """
+        Use a document for an edit that is saved to another file.
+
+        The document is taken out of the cache for the edit. The caller must
+        save it to output_path before leaving the block, after which it is
+        closed; the next use of the file opens it again.
+
+        Args:
+            input_path: Path to the PDF file to edit.
+            output_path: Path the edited document is saved to.
+
+        Yields:
+            fitz.Document: The open document.
+        """
+        key = _file_key(input_path)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.users == 0:
+                # Take it out so no reader sees the edit in progress
+                del self._entries[key]
+                self._size -= entry.size
+            else:
+                entry = None
+            self._forget_path(output_path)
+
+        doc = entry.doc if entry is not None else fitz.open(input_path)
+
+        try:
+            yield doc
+        finally:
+            doc.close()
+
+    def invalidate(self, path):
+        """
+        Close the cached documents of a file, e.g. after it was written.
+
+        Args:
+            path: Path to the PDF file.
+        """
+        with self._lock:
+            self._forget_path(path)
+
+    def clear(self):
+        """Close all cached documents."""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._discard(entry)
+
+
+# Documents kept open in this process
+_cache = DocumentCache()
+
+
+def open_document(path):
+    """
+    Use a cached, open document for reading.
+
+    Args:
+        path (str): Path to the PDF file.
+
+    Returns:
+        A context manager yielding the fitz.Document.
+
+    Raises:
+        PDFProcessingError: If the file doesn't exist.
+    """
+    if not os.path.exists(path):
+        raise PDFProcessingError(f"PDF file not found: {path}")
+    return _cache.open(path)
+
+
+def edit_document(input_path, output_path):
+    """
+    Use a cached, open document for an edit saved to output_path. The
+    document is closed afterwards.
+
+    Args:
+        input_path (str): Path to the PDF file to edit.
+        output_path (str): Path the edited document is saved to.
+
+    Returns:
+        A context manager yielding the fitz.Document.
+
+    Raises:
+        PDFProcessingError: If the input file doesn't exist.
+    """
+    if not os.path.exists(input_path):
+        raise PDFProcessingError(f"Input file not found: {input_path}")
+    return _cache.edit(input_path, output_path)
+
+
+def invalidate_document(path):
+    """
+    Close the cached documents of a file that was written outside the cache.
+
+    Args:
+        path (str): Path to the PDF file.
+    """
+    _cache.invalidate(path)
@@ -5,10 +5,20 @@ This module provides utility functions for working with Ghostscript.
 """
 
 import os
+import re
+import sys
+import json
+import shutil
+import time
+import queue
+import select
 import platform
 import subprocess
+import threading
 import logging
 import glob
+import ctypes
+import ctypes.util
 from app.errors import PDFProcessingError
 
 # Configure logging
@@ -18,6 +28,27 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Default number of persistent Ghostscript workers per process
+DEFAULT_POOL_SIZE = int(os.environ.get('GHOSTSCRIPT_POOL_SIZE', 2))
+
+# Default number of jobs a worker runs before it is replaced
+DEFAULT_MAX_JOBS_PER_WORKER = 50
+
+# Time in seconds a worker may sit idle before it is pinged on checkout
+HEALTH_CHECK_INTERVAL = 60
+
+# Time in seconds a worker has to answer a ping
+HEALTH_CHECK_TIMEOUT = 5
+
+# Default time in seconds a single Ghostscript job may run
+DEFAULT_JOB_TIMEOUT = 600
+
+# Ghostscript installation bundled with the project
+PROJECT_GHOSTSCRIPT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'ghostscript'))
+
+# Script run by each persistent worker
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gs_worker.py')
+
 def get_ghostscript_path():
     """
     Get the path to the Ghostscript executable.
@@ -25,28 +56,140 @@ def get_ghostscript_path():
     Returns:
         str: Path to the Ghostscript executable, or None if not found.
     """
-    # Check if Ghostscript is in the project directory
-    project_gs_path = get_project_ghostscript_path()
-    if project_gs_path:
-        return project_gs_path
-    
-    # Check if Ghostscript is installed on the system
-    system_gs_path = get_system_ghostscript_path()
-    if system_gs_path:
-        return system_gs_path
-    
-    return None
+    return discover_ghostscript()['path']
+
+
+def has_ghostscript_capability(name):
+    """
+    Check whether the discovered Ghostscript supports a capability.
+
+    This only reads the cached discovery, so it is cheap enough to call from
+    a route before accepting an upload.
+
+    Args:
+        name (str): One of 'executable', 'gsapi', 'pdfwrite' or 'pdfa'.
+
+    Returns:
+        bool: True if the capability is available.
+    """
+    return bool(discover_ghostscript()['capabilities'].get(name))
+
+
+_discovery = None
+_discovery_lock = threading.Lock()
+
+
+def discover_ghostscript(refresh=False):
+    """
+    Resolve the Ghostscript executable, library, version and capabilities.
+
+    The result is cached for the life of the process. GHOSTSCRIPT_PATH may
+    name the executable itself or an installation directory to search.
+
+    Args:
+        refresh (bool, optional): Resolve again instead of using the cache.
+
+    Returns:
+        dict: A dictionary containing:
+            - 'path': Path to the executable, or None.
+            - 'library_path': Path to the shared library, or None.
+            - 'version': Version string, or None.
+            - 'devices': List of output devices, or None if unknown.
+            - 'capabilities': Dictionary of capability name to bool.
+    """
+    global _discovery
+
+    with _discovery_lock:
+        if _discovery is not None and not refresh:
+            return _discovery
+
+        configured = os.environ.get('GHOSTSCRIPT_PATH')
+        gs_path = None
+        base_dir = None
+
+        if configured and os.path.isfile(configured):
+            gs_path = configured
+        elif configured and os.path.isdir(configured):
+            base_dir = configured
+            gs_path = get_project_ghostscript_path(base_dir)
+
+        if not gs_path:
+            if configured:
+                logger.warning(f"No Ghostscript executable at GHOSTSCRIPT_PATH={configured}, searching elsewhere")
+            gs_path = get_project_ghostscript_path() or get_system_ghostscript_path()
+
+        library_path = get_ghostscript_library_path(base_dir)
+
+        version = None
+        devices = None
+        if gs_path:
+            version, devices = _probe_executable(gs_path)
+        if library_path and not version:
+            version = _probe_library(library_path)
+
+        if devices is not None:
+            pdfwrite = 'pdfwrite' in devices
+        else:
+            # The library doesn't list its devices; standard builds include pdfwrite
+            pdfwrite = bool(gs_path or library_path)
+
+        _discovery = {
+            'path': gs_path,
+            'library_path': library_path,
+            'version': version,
+            'devices': devices,
+            'capabilities': {
+                'executable': bool(gs_path),
+                'gsapi': bool(library_path),
+                'pdfwrite': pdfwrite,
+                'pdfa': pdfwrite,
+            }
+        }
+
+        if gs_path or library_path:
+            logger.info(f"Ghostscript {version or 'unknown version'} found "
+                        f"(executable: {gs_path}, library: {library_path})")
+        else:
+            logger.warning("Ghostscript not found")
+
+        return _discovery
 
 
-def get_project_ghostscript_path():
+def init_ghostscript(app):
     """
-    Get the path to the Ghostscript executable in the project directory.
+    Resolve Ghostscript once at application start.
+
+    GHOSTSCRIPT_PATH from the app config is exported to the environment so
+    that tool processes started later resolve the same installation.
+
+    Args:
+        app: The Flask application.
+
+    Returns:
+        dict: The discovery result.
+    """
+    configured = app.config.get('GHOSTSCRIPT_PATH')
+    if configured:
+        os.environ['GHOSTSCRIPT_PATH'] = configured
+
+    info = discover_ghostscript(refresh=True)
+    app.ghostscript = info
+    return info
+
+
+def get_project_ghostscript_path(base_dir=None):
+    """
+    Get the path to the Ghostscript executable in an installation directory.
+    
+    Args:
+        base_dir (str, optional): Directory to search. Defaults to the
+            ghostscript directory of the project.
     
     Returns:
         str: Path to the Ghostscript executable, or None if not found.
     """
-    # Base directory for Ghostscript
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'ghostscript'))
+    if base_dir is None:
+        base_dir = PROJECT_GHOSTSCRIPT_DIR
     
     if not os.path.exists(base_dir):
         return None
@@ -71,7 +214,7 @@ def get_project_ghostscript_path():
             return gs_path
         
         # If not found in bin, search in all subdirectories
-        for gs_path in glob.glob(os.path.join(base_dir, '**', 'gs'), recursive=True):
+        for gs_path in glob.glob(os.path.join(base_dir, '**', 'bin', 'gs'), recursive=True):
             return gs_path
     
     return None
@@ -84,45 +227,28 @@ def get_system_ghostscript_path():
     Returns:
         str: Path to the Ghostscript executable, or None if not found.
     """
-    try:
-        # Try to find Ghostscript in the system path
-        if platform.system() == 'Windows':
-            # Check for gswin64c.exe or gswin32c.exe
-            for gs_name in ['gswin64c', 'gswin32c']:
-                try:
-                    result = subprocess.run(['where', gs_name], 
-                                           stdout=subprocess.PIPE, 
-                                           stderr=subprocess.PIPE, 
-                                           text=True, 
-                                           check=False)
-                    if result.returncode == 0 and result.stdout.strip():
-                        return result.stdout.strip().split('\n')[0]
-                except:
-                    pass
-            
-            # Check common installation paths
-            program_files = os.environ.get('ProgramFiles', 'C:\\Program Files')
-            program_files_x86 = os.environ.get('ProgramFiles(x86)', 'C:\\Program Files (x86)')
-            
-            for root_dir in [program_files, program_files_x86]:
-                for gs_dir in glob.glob(os.path.join(root_dir, 'gs', '*')):
-                    for bit in ['64', '32']:
-                        gs_path = os.path.join(gs_dir, 'bin', f'gswin{bit}c.exe')
-                        if os.path.exists(gs_path):
-                            return gs_path
+    if platform.system() == 'Windows':
+        names = ['gswin64c', 'gswin32c', 'gs']
+    else:
+        names = ['gs']
+
+    # Check the system path
+    for gs_name in names:
+        gs_path = shutil.which(gs_name)
+        if gs_path:
+            return gs_path
+
+    if platform.system() == 'Windows':
+        # Check common installation paths
+        program_files = os.environ.get('ProgramFiles', 'C:\\Program Files')
+        program_files_x86 = os.environ.get('ProgramFiles(x86)', 'C:\\Program Files (x86)')
         
-        elif platform.system() == 'Linux' or platform.system() == 'Darwin':
-            # Check for gs in the system path
-            result = subprocess.run(['which', 'gs'], 
-                                   stdout=subprocess.PIPE, 
-                                   stderr=subprocess.PIPE, 
-                                   text=True, 
-                                   check=False)
-            if result.returncode == 0 and result.stdout.strip():
-                return result.stdout.strip()
-    
-    except Exception as e:
-        logger.warning(f"Error finding system Ghostscript: {str(e)}")
+        for root_dir in [program_files, program_files_x86]:
+            for gs_dir in glob.glob(os.path.join(root_dir, 'gs', '*')):
+                for bit in ['64', '32']:
+                    gs_path = os.path.join(gs_dir, 'bin', f'gswin{bit}c.exe')
+                    if os.path.exists(gs_path):
+                        return gs_path
     
     return None
 
@@ -150,3 +276,359 @@ def check_ghostscript_version(gs_path):
         logger.warning(f"Error checking Ghostscript version: {str(e)}")
     
     return None
+
+
+def _probe_executable(gs_path):
+    """
+    Get the version and output devices of a Ghostscript executable.
+
+    Args:
+        gs_path (str): Path to the Ghostscript executable.
+
+    Returns:
+        tuple: (version, devices); either may be None if they can't be read.
+    """
+    try:
+        result = subprocess.run([gs_path, '-h'], capture_output=True, text=True,
+                                timeout=HEALTH_CHECK_TIMEOUT, check=False)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Error probing Ghostscript: {str(e)}")
+        return None, None
+
+    match = re.search(r'Ghostscript\s+(\d+\.\d+(?:\.\d+)?)', result.stdout)
+    version = match.group(1) if match else None
+
+    devices = None
+    lines = result.stdout.splitlines()
+    for index, line in enumerate(lines):
+        if line.strip() == 'Available devices:':
+            devices = []
+            for device_line in lines[index + 1:]:
+                if not device_line[:1].isspace():
+                    break
+                devices.extend(device_line.split())
+            break
+
+    return version, devices
+
+
+class _GsapiRevision(ctypes.Structure):
+    _fields_ = [
+        ('product', ctypes.c_char_p),
+        ('copyright', ctypes.c_char_p),
+        ('revision', ctypes.c_long),
+        ('revisiondate', ctypes.c_long),
+    ]
+
+
+def _probe_library(library_path):
+    """
+    Get the version of the Ghostscript shared library.
+
+    Args:
+        library_path (str): Path to the Ghostscript shared library.
+
+    Returns:
+        str: Version string, or None if it can't be read.
+    """
+    try:
+        lib = ctypes.WinDLL(library_path) if platform.system() == 'Windows' else ctypes.CDLL(library_path)
+        revision = _GsapiRevision()
+        if lib.gsapi_revision(ctypes.byref(revision), ctypes.sizeof(revision)) != 0:
+            return None
+    except (OSError, AttributeError) as e:
+        logger.warning(f"Error probing Ghostscript library: {str(e)}")
+        return None
+
+    # e.g. 10021 -> 10.02.1
+    major, rest = divmod(revision.revision, 1000)
+    return f"{major}.{rest // 10:02d}.{rest % 10}"
+
+
+def get_ghostscript_library_path(base_dir=None):
+    """
+    Get the path to the Ghostscript shared library (libgs / gsdll).
+
+    Args:
+        base_dir (str, optional): Installation directory to search. Defaults
+            to the ghostscript directory of the project.
+
+    Returns:
+        str: Path or loadable name of the library, or None if not found.
+    """
+    env_path = os.environ.get('GHOSTSCRIPT_LIBRARY')
+    if env_path and os.path.exists(env_path):
+        return env_path
+
+    if base_dir is None:
+        base_dir = PROJECT_GHOSTSCRIPT_DIR
+
+    if platform.system() == 'Windows':
+        patterns = ['gsdll64.dll', 'gsdll32.dll']
+        names = ['gsdll64', 'gsdll32']
+    elif platform.system() == 'Darwin':
+        patterns = ['libgs.dylib', 'libgs.*.dylib']
+        names = ['gs']
+    else:
+        patterns = ['libgs.so', 'libgs.so.*']
+        names = ['gs']
+
+    # Check the installation directory first
+    if os.path.exists(base_dir):
+        for pattern in patterns:
+            for lib_path in glob.glob(os.path.join(base_dir, '**', pattern), recursive=True):
+                return lib_path
+
+    # Then the system library path
+    for name in names:
+        lib_path = ctypes.util.find_library(name)
+        if lib_path:
+            return lib_path
+
+    return None
+
+
+class GhostscriptWorker:
+    """A persistent worker process with the Ghostscript library loaded."""
+
+    def __init__(self, library_path):
+        """
+        Start the worker.
+
+        Args:
+            library_path (str): Path to the Ghostscript shared library.
+        """
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, library_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        self.jobs_done = 0
+        self.last_used = time.time()
+        self.timed_out = False
+
+    def is_alive(self):
+        """Check whether the worker process is still running."""
+        return self.process.poll() is None
+
+    def request(self, message, timeout):
+        """
+        Send a request to the worker and wait for its reply.
+
+        Args:
+            message (dict): The request.
+            timeout (float): Maximum time to wait for the reply in seconds.
+
+        Returns:
+            dict: The reply, or None if the worker died or timed out.
+        """
+        try:
+            self.process.stdin.write(json.dumps(message) + '\n')
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            return None
+
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            self.timed_out = True
+            return None
+
+        line = self.process.stdout.readline()
+        if not line:
+            return None
+
+        self.last_used = time.time()
+        return json.loads(line)
+
+    def ping(self):
+        """
+        Check that the worker answers requests.
+
+        Returns:
+            bool: True if the worker is healthy.
+        """
+        if not self.is_alive():
+            return False
+        reply = self.request({'ping': True}, HEALTH_CHECK_TIMEOUT)
+        return bool(reply and reply.get('ok'))
+
+    def kill(self):
+        """Kill the worker immediately."""
+        try:
+            self.process.kill()
+            self.process.wait(5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    def shutdown(self):
+        """Ask the worker to exit by closing its input."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class GhostscriptPool:
+    """
+    Class for running Ghostscript jobs on persistent worker processes.
+
+    Workers are started on demand up to the pool size, pinged before reuse
+    when they have been idle, and replaced after a fixed number of jobs or
+    whenever a job crashes or times out.
+    """
+
+    def __init__(self, library_path, size=DEFAULT_POOL_SIZE,
+                 max_jobs_per_worker=DEFAULT_MAX_JOBS_PER_WORKER):
+        """
+        Initialize the pool.
+
+        Args:
+            library_path (str): Path to the Ghostscript shared library.
+            size (int): Maximum number of worker processes.
+            max_jobs_per_worker (int): Number of jobs a worker runs before it is replaced.
+        """
+        self.library_path = library_path
+        self.size = max(1, size)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._idle = queue.Queue()
+        self._slots = threading.Semaphore(self.size)
+        self._closed = False
+
+    def _checkout(self):
+        """Get a healthy worker, starting a new one if none is idle."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return GhostscriptWorker(self.library_path)
+
+            if time.time() - worker.last_used < HEALTH_CHECK_INTERVAL and worker.is_alive():
+                return worker
+            if worker.ping():
+                return worker
+
+            logger.warning(f"Ghostscript worker {worker.process.pid} failed its health check, replacing it")
+            worker.kill()
+
+    def run(self, args, timeout=DEFAULT_JOB_TIMEOUT):
+        """
+        Run a Ghostscript command line on a pooled worker.
+
+        Args:
+            args (list): Ghostscript arguments, without the executable name.
+            timeout (float): Maximum time the job may run in seconds.
+
+        Returns:
+            dict: 'returncode', 'stdout' and 'stderr' of the run.
+
+        Raises:
+            PDFProcessingError: If the worker crashed or the job timed out.
+        """
+        if self._closed:
+            raise PDFProcessingError("Ghostscript pool is closed")
+
+        with self._slots:
+            worker = self._checkout()
+            keep = False
+
+            try:
+                # The CPU limit is set by the worker, since one inherited
+                # from this process would count the CPU time of earlier jobs
+                reply = worker.request({'args': list(args), 'cpu_time': timeout}, timeout)
+                if reply is None:
+                    if worker.timed_out:
+                        logger.error(f"Ghostscript job timed out after {timeout} seconds, killing worker {worker.process.pid}")
+                        raise PDFProcessingError(f"Ghostscript timed out after {timeout} seconds")
+                    logger.error(f"Ghostscript worker {worker.process.pid} died while processing a job")
+                    raise PDFProcessingError("Ghostscript crashed while processing the file")
+
+                worker.jobs_done += 1
+                keep = worker.jobs_done < self.max_jobs_per_worker
+                return reply
+
+            finally:
+                if keep and not self._closed:
+                    self._idle.put(worker)
+                elif keep:
+                    worker.shutdown()
+                else:
+                    worker.kill()
+
+    def close(self):
+        """Shut down all idle workers."""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.shutdown()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ghostscript_pool():
+    """
+    Get the process-wide Ghostscript pool.
+
+    Returns:
+        GhostscriptPool: The pool, or None if the Ghostscript library is not
+        available or persistent workers are not supported on this platform.
+    """
+    global _pool
+
+    # Workers are read with select(), which only supports pipes on POSIX
+    if platform.system() == 'Windows' or DEFAULT_POOL_SIZE <= 0:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            library_path = discover_ghostscript()['library_path']
+            if not library_path:
+                return None
+            _pool = GhostscriptPool(library_path)
+            logger.info(f"Ghostscript pool using library: {library_path}")
+        return _pool
+
+
+def run_ghostscript(args, timeout=DEFAULT_JOB_TIMEOUT):
+    """
+    Run Ghostscript with the given arguments.
+
+    The job runs on a persistent worker when the Ghostscript library is
+    available, and in a new gs process otherwise.
+
+    Args:
+        args (list): Ghostscript arguments, without the executable name.
+        timeout (float, optional): Maximum time the job may run in seconds.
+
+    Returns:
+        dict: 'returncode', 'stdout' and 'stderr' of the run.
+
+    Raises:
+        PDFProcessingError: If Ghostscript is not available, crashed or timed out.
+    """
+    pool = get_ghostscript_pool()
+    if pool is not None:
+        return pool.run(args, timeout=timeout)
+
+    gs_path = get_ghostscript_path()
+    if not gs_path:
+        raise PDFProcessingError("Ghostscript not found. Please install Ghostscript or check your PATH.")
+
+    try:
+        result = subprocess.run([gs_path] + list(args), capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise PDFProcessingError(f"Ghostscript timed out after {timeout} seconds")
+
+    return {
+        'returncode': result.returncode,
+        'stdout': result.stdout,
+        'stderr': result.stderr
+    }
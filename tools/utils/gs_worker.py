@@ -0,0 +1,529 @@
+"""
+Ghostscript Worker Process
+
+This module is the entry point of a long-lived Ghostscript worker. It loads
+the Ghostscript shared library once and then runs jobs sent to it by the
+pool in tools.utils.ghostscript, so callers don't pay process and library
+start-up costs on every document.
+
+Protocol: one JSON object per line on stdin, one JSON reply per line on stdout.
+    {"ping": true}            -> {"ok": true}
+    {"args": ["-sDEVICE=..."], "cpu_time": 600}
+                              -> {"returncode": 0, "stdout": "...", "stderr": "..."}
+
+Each worker keeps one initialised gsapi instance (a session) and reuses it
+for every job it can express in PostScript. That covers the tools' pdfwrite
+command lines: one input, one -sOutputFile and -d/-s device parameters. A
+job runs inside save/restore on a copy of the output device, which is closed
+at the end of the job so the output is complete. Inputs and outputs are
+permitted per job with gsapi_add_control_path. Any other command line, a
+library without control paths (before 9.50) and any failed or incomplete
+session job fall back to a new instance per job, the way every job used to
+run. After a failure the worker stops using its session, since the
+interpreter may have been left in an unknown state. Compare the two paths
+on a host with the library:
+
+    python tools/utils/gs_worker.py <libgs path> --benchmark 20
+
+A worker is started from a process pool child and inherits that child's
+RLIMIT_CPU. The pool sets the limit as an absolute total for the child, and
+the worker outlives the task that started it. So before each job the worker
+sets its own limit to "CPU used so far + cpu_time", the same way the pool
+does for its tasks.
+
+It only uses the standard library so that starting it stays cheap.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import ctypes
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where jobs only get the pool's timeout
+    resource = None
+
+# gsapi return code meaning the interpreter quit normally (e.g. after -dBATCH)
+GS_ERROR_QUIT = -101
+
+# gsapi_set_arg_encoding value for UTF-8 arguments
+GS_ARG_ENCODING_UTF8 = 1
+
+# gsapi_add_control_path types
+GS_PERMIT_FILE_READING = 0
+GS_PERMIT_FILE_WRITING = 1
+
+# Arguments a session's instance is started with
+SESSION_ARGS = ['-dNOPAUSE', '-dQUIET', '-dSAFER', '-dNODISPLAY']
+
+# Switches a session already applies to every job
+SESSION_SWITCHES = {'-dNOPAUSE', '-dBATCH', '-dQUIET', '-q', '-dSAFER'}
+
+# Output devices a session can run jobs for
+SESSION_DEVICES = {'pdfwrite'}
+
+# -d values that are single PostScript tokens (numbers, booleans and names)
+_PS_TOKEN = re.compile(r'^(-?\d+(\.\d+)?|true|false|/[A-Za-z0-9_.-]+)$')
+
+# Names allowed as device parameter keys
+_PS_NAME = re.compile(r'^[A-Za-z][A-Za-z0-9_]*$')
+
+_STDIO_CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int)
+
+
+def load_library(library_path):
+    """
+    Load the Ghostscript shared library and declare the gsapi functions.
+
+    Args:
+        library_path (str): Path or name of the Ghostscript shared library.
+
+    Returns:
+        ctypes.CDLL: The loaded library.
+    """
+    if sys.platform == 'win32':
+        lib = ctypes.WinDLL(library_path)
+    else:
+        lib = ctypes.CDLL(library_path)
+
+    lib.gsapi_new_instance.argtypes = [ctypes.POINTER(ctypes.c_void_p), ctypes.c_void_p]
+    lib.gsapi_new_instance.restype = ctypes.c_int
+    lib.gsapi_set_stdio.argtypes = [ctypes.c_void_p, _STDIO_CALLBACK, _STDIO_CALLBACK, _STDIO_CALLBACK]
+    lib.gsapi_set_stdio.restype = ctypes.c_int
+    lib.gsapi_set_arg_encoding.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    lib.gsapi_set_arg_encoding.restype = ctypes.c_int
+    lib.gsapi_init_with_args.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.POINTER(ctypes.c_char_p)]
+    lib.gsapi_init_with_args.restype = ctypes.c_int
+    lib.gsapi_exit.argtypes = [ctypes.c_void_p]
+    lib.gsapi_exit.restype = ctypes.c_int
+    lib.gsapi_delete_instance.argtypes = [ctypes.c_void_p]
+    lib.gsapi_delete_instance.restype = None
+    lib.gsapi_run_string.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+    lib.gsapi_run_string.restype = ctypes.c_int
+
+    # Control paths were added in 9.50; sessions need them to permit files
+    try:
+        for name in ('gsapi_add_control_path', 'gsapi_remove_control_path'):
+            function = getattr(lib, name)
+            function.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_char_p]
+            function.restype = ctypes.c_int
+    except AttributeError:
+        pass
+
+    return lib
+
+
+def limit_cpu_time(seconds):
+    """
+    Limit the CPU time of the next job.
+
+    Only the soft limit is changed, relative to the CPU time this worker has
+    used so far, so each job gets the same allowance.
+
+    Args:
+        seconds (int): CPU time the job may use.
+    """
+    if resource is None:
+        return
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    value = int(usage.ru_utime + usage.ru_stime) + int(seconds)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (value, hard))
+
+
+def benchmark(lib, runs):
+    """
+    Measure the per-job overhead of a new instance and of a session.
+
+    Each instance run creates an instance, starts the interpreter without
+    doing any work and deletes it again. Each session run is an empty job on
+    one reused instance.
+
+    Args:
+        lib (ctypes.CDLL): The loaded Ghostscript library.
+        runs (int): Number of runs.
+
+    Returns:
+        dict: Mean time of a run in milliseconds for 'instance' and
+            'session' ('session' is None if the library can't run sessions).
+    """
+    args = ['-dNODISPLAY', '-dBATCH', '-dNOPAUSE', '-dQUIET', '-dSAFER']
+    start = time.perf_counter()
+    for _ in range(runs):
+        reply = run_job(lib, args)
+        if reply['returncode'] != 0:
+            raise RuntimeError(reply['stderr'] or f"Ghostscript returned {reply['returncode']}")
+    result = {'instance': (time.perf_counter() - start) * 1000 / runs, 'session': None}
+
+    session = open_session(lib)
+    if session is not None:
+        try:
+            start = time.perf_counter()
+            for _ in range(runs):
+                session.run_string('save nulldevice restore')
+            result['session'] = (time.perf_counter() - start) * 1000 / runs
+        finally:
+            session.close()
+
+    return result
+
+
+def run_job(lib, args):
+    """
+    Run one Ghostscript command line through gsapi.
+
+    Args:
+        lib (ctypes.CDLL): The loaded Ghostscript library.
+        args (list): Ghostscript arguments, without the executable name.
+
+    Returns:
+        dict: 'returncode', 'stdout' and 'stderr' of the run.
+    """
+    stdout_chunks = []
+    stderr_chunks = []
+
+    def make_writer(chunks):
+        def write(caller_handle, buf, length):
+            chunks.append(ctypes.string_at(buf, length))
+            return length
+        return _STDIO_CALLBACK(write)
+
+    def read_stdin(caller_handle, buf, length):
+        return 0
+
+    stdin_fn = _STDIO_CALLBACK(read_stdin)
+    stdout_fn = make_writer(stdout_chunks)
+    stderr_fn = make_writer(stderr_chunks)
+
+    instance = ctypes.c_void_p()
+    code = lib.gsapi_new_instance(ctypes.byref(instance), None)
+    if code < 0:
+        return {'returncode': code, 'stdout': '', 'stderr': 'Failed to create Ghostscript instance'}
+
+    try:
+        lib.gsapi_set_stdio(instance, stdin_fn, stdout_fn, stderr_fn)
+        lib.gsapi_set_arg_encoding(instance, GS_ARG_ENCODING_UTF8)
+
+        encoded = [b'gs'] + [arg.encode('utf-8') for arg in args]
+        argv = (ctypes.c_char_p * len(encoded))(*encoded)
+
+        code = lib.gsapi_init_with_args(instance, len(encoded), argv)
+        exit_code = lib.gsapi_exit(instance)
+        if code in (0, GS_ERROR_QUIT):
+            code = exit_code
+    finally:
+        lib.gsapi_delete_instance(instance)
+
+    return {
+        'returncode': 0 if code in (0, GS_ERROR_QUIT) else code,
+        'stdout': b''.join(stdout_chunks).decode('utf-8', 'replace'),
+        'stderr': b''.join(stderr_chunks).decode('utf-8', 'replace'),
+    }
+
+
+def ps_string(value):
+    """
+    Quote a value as a PostScript string.
+
+    Args:
+        value (str): The value.
+
+    Returns:
+        str: The PostScript string literal.
+    """
+    escaped = value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    return f"({escaped})"
+
+
+def translate_args(args):
+    """
+    Turn a Ghostscript command line into a job a session can run.
+
+    Args:
+        args (list): Ghostscript arguments, without the executable name.
+
+    Returns:
+        dict: 'program' (the PostScript to run), 'input_path' and
+            'output_path', or None if the command line can't run in a session.
+    """
+    device = None
+    output_path = None
+    input_path = None
+    params = []
+
+    for arg in args:
+        if arg in SESSION_SWITCHES:
+            continue
+        if arg.startswith('-sDEVICE='):
+            device = arg[len('-sDEVICE='):]
+        elif arg.startswith('-sOutputFile='):
+            output_path = arg[len('-sOutputFile='):]
+        elif arg.startswith('-s') and '=' in arg:
+            key, value = arg[2:].split('=', 1)
+            if not _PS_NAME.match(key):
+                return None
+            params.append(f"/{key} {ps_string(value)}")
+        elif arg.startswith('-d'):
+            key, _, value = arg[2:].partition('=')
+            value = value or 'true'
+            if not _PS_NAME.match(key) or not _PS_TOKEN.match(value):
+                return None
+            params.append(f"/{key} {value}")
+        elif arg.startswith('-') or input_path is not None:
+            # Other switches, or more than one input
+            return None
+        else:
+            input_path = arg
+
+    if device not in SESSION_DEVICES or not output_path or not input_path or '%' in output_path:
+        return None
+
+    props = ' '.join([f"/OutputFile {ps_string(output_path)}"] + params)
+    program = (
+        f"save "
+        f"mark {props} {ps_string(device)} finddevice copydevice putdeviceprops setdevice "
+        f"{ps_string(input_path)} run "
+        f"nulldevice restore"
+    )
+    return {'program': program, 'input_path': input_path, 'output_path': output_path}
+
+
+def is_complete_pdf(path):
+    """
+    Check that a PDF was written to the end.
+
+    Args:
+        path (str): Path to the PDF.
+
+    Returns:
+        bool: True if the file ends with an end-of-file marker.
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 1024))
+            return b'%%EOF' in f.read()
+    except OSError:
+        return False
+
+
+class GhostscriptSession:
+    """A gsapi instance started once and reused for many jobs."""
+
+    def __init__(self, lib):
+        """
+        Create and start the instance.
+
+        Args:
+            lib (ctypes.CDLL): The loaded Ghostscript library.
+
+        Raises:
+            RuntimeError: If the instance can't be started.
+        """
+        self.lib = lib
+        self._stdout = []
+        self._stderr = []
+
+        def write_stdout(caller_handle, buf, length):
+            self._stdout.append(ctypes.string_at(buf, length))
+            return length
+
+        def write_stderr(caller_handle, buf, length):
+            self._stderr.append(ctypes.string_at(buf, length))
+            return length
+
+        def read_stdin(caller_handle, buf, length):
+            return 0
+
+        # The library keeps pointers to the callbacks, so they must stay alive
+        self._callbacks = (_STDIO_CALLBACK(read_stdin), _STDIO_CALLBACK(write_stdout),
+                           _STDIO_CALLBACK(write_stderr))
+
+        self.instance = ctypes.c_void_p()
+        code = lib.gsapi_new_instance(ctypes.byref(self.instance), None)
+        if code < 0:
+            self.instance = None
+            raise RuntimeError(f"Failed to create Ghostscript instance ({code})")
+
+        lib.gsapi_set_stdio(self.instance, *self._callbacks)
+        lib.gsapi_set_arg_encoding(self.instance, GS_ARG_ENCODING_UTF8)
+
+        encoded = [b'gs'] + [arg.encode('utf-8') for arg in SESSION_ARGS]
+        argv = (ctypes.c_char_p * len(encoded))(*encoded)
+        code = lib.gsapi_init_with_args(self.instance, len(encoded), argv)
+        if code < 0:
+            stderr = b''.join(self._stderr).decode('utf-8', 'replace')
+            self.close()
+            raise RuntimeError(f"Failed to start Ghostscript ({code}): {stderr}")
+
+    def run_string(self, program):
+        """
+        Run PostScript on the instance.
+
+        Args:
+            program (str): The PostScript.
+
+        Returns:
+            int: The gsapi return code.
+        """
+        exit_code = ctypes.c_int()
+        return self.lib.gsapi_run_string(self.instance, program.encode('utf-8'), 0, ctypes.byref(exit_code))
+
+    def run(self, args):
+        """
+        Run a Ghostscript command line on the instance.
+
+        Args:
+            args (list): Ghostscript arguments, without the executable name.
+
+        Returns:
+            dict: 'returncode', 'stdout' and 'stderr' of the run, or None if
+                the command line can't run in a session.
+
+        Raises:
+            RuntimeError: If the job failed or its output is incomplete. The
+                session can't be used after that.
+        """
+        job = translate_args(args)
+        if job is None:
+            return None
+
+        self._stdout = []
+        self._stderr = []
+        paths = [(GS_PERMIT_FILE_READING, job['input_path'].encode('utf-8')),
+                 (GS_PERMIT_FILE_WRITING, job['output_path'].encode('utf-8'))]
+
+        for permit, path in paths:
+            self.lib.gsapi_add_control_path(self.instance, permit, path)
+        try:
+            code = self.run_string(job['program'])
+        finally:
+            for permit, path in paths:
+                self.lib.gsapi_remove_control_path(self.instance, permit, path)
+
+        stderr = b''.join(self._stderr).decode('utf-8', 'replace')
+        if code < 0:
+            raise RuntimeError(f"Ghostscript session job failed ({code}): {stderr}")
+        if not is_complete_pdf(job['output_path']):
+            raise RuntimeError("Ghostscript session job left an incomplete output file")
+
+        return {
+            'returncode': 0,
+            'stdout': b''.join(self._stdout).decode('utf-8', 'replace'),
+            'stderr': stderr,
+        }
+
+    def close(self):
+        """Stop and delete the instance."""
+        if self.instance is not None:
+            self.lib.gsapi_exit(self.instance)
+            self.lib.gsapi_delete_instance(self.instance)
+            self.instance = None
+
+
+def open_session(lib):
+    """
+    Start a session if the library supports them.
+
+    Args:
+        lib (ctypes.CDLL): The loaded Ghostscript library.
+
+    Returns:
+        GhostscriptSession: The session, or None if it can't be used.
+    """
+    if not hasattr(lib, 'gsapi_add_control_path'):
+        return None
+    try:
+        return GhostscriptSession(lib)
+    except Exception as e:
+        sys.stderr.write(f"Ghostscript session unavailable, using an instance per job: {str(e)}\n")
+        return None
+
+
+def run_request(lib, session, args):
+    """
+    Run a job on the session if it can, and on a new instance otherwise.
+
+    Args:
+        lib (ctypes.CDLL): The loaded Ghostscript library.
+        session (GhostscriptSession): The worker's session, or None.
+        args (list): Ghostscript arguments, without the executable name.
+
+    Returns:
+        tuple: The reply and the session to use for the next job (None
+            once the session has failed).
+    """
+    if session is not None:
+        try:
+            reply = session.run(args)
+            if reply is not None:
+                return reply, session
+        except Exception as e:
+            sys.stderr.write(f"{str(e)}; running the job on a new instance\n")
+            session.close()
+            session = None
+
+    return run_job(lib, args), session
+
+
+def main(argv):
+    """
+    Serve Ghostscript jobs until stdin is closed.
+
+    Args:
+        argv (list): Command-line arguments; argv[1] is the library path.
+
+    Returns:
+        int: Exit code.
+    """
+    if len(argv) < 2:
+        sys.stderr.write("usage: gs_worker.py <libgs path> [--benchmark RUNS]\n")
+        return 2
+
+    lib = load_library(argv[1])
+
+    if len(argv) > 3 and argv[2] == '--benchmark':
+        runs = int(argv[3])
+        result = benchmark(lib, runs)
+        print(f"{result['instance']:.1f} ms per gsapi instance ({runs} runs)")
+        if result['session'] is None:
+            print("Sessions are not supported by this library")
+        else:
+            print(f"{result['session']:.1f} ms per session job ({runs} runs)")
+        return 0
+
+    session = open_session(lib)
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+            if request.get('ping'):
+                reply = {'ok': True}
+            else:
+                if request.get('cpu_time'):
+                    limit_cpu_time(request['cpu_time'])
+                reply, session = run_request(lib, session, request['args'])
+        except Exception as e:
+            reply = {'returncode': -1, 'stdout': '', 'stderr': f"Worker error: {str(e)}"}
+
+        sys.stdout.write(json.dumps(reply) + '\n')
+        sys.stdout.flush()
+
+    if session is not None:
+        session.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
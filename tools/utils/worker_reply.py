@@ -0,0 +1,35 @@
+"""
+Worker Reply Module
+
+This module reads the replies of the worker subprocesses that render and
+split long documents. A worker writes one JSON reply as the last line of its
+stdout. Libraries it imports may print to stdout before that, e.g. PyMuPDF's
+warning that the `fitz` name is deprecated, so only the last line is parsed.
+"""
+
+import json
+
+
+def parse_worker_reply(stdout, stderr, returncode):
+    """
+    Get the reply of a finished worker process.
+
+    Args:
+        stdout (str): What the worker wrote to stdout.
+        stderr (str): What the worker wrote to stderr.
+        returncode (int): The worker's exit code.
+
+    Returns:
+        dict: The reply. If the worker didn't send one, a dictionary with
+            an 'error' describing why.
+    """
+    lines = [line for line in (stdout or '').splitlines() if line.strip()]
+    if lines:
+        try:
+            reply = json.loads(lines[-1])
+        except ValueError:
+            reply = None
+        if isinstance(reply, dict):
+            return reply
+
+    return {'error': (stderr or '').strip() or f"exit code {returncode}"}
@@ -0,0 +1,90 @@
+"""
+ZIP Streaming Utilities Module
+
+This module provides a generator that builds a ZIP archive on the fly, so an
+archive of files on disk can be sent to the client as it is written, without
+holding it in memory or writing a copy of it to disk.
+"""
+
+import os
+import zipfile
+import logging
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Size of the chunks read from each file
+ZIP_CHUNK_SIZE = 64 * 1024
+
+# Formats that are already compressed, so deflating them only costs CPU
+STORED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tif', '.tiff', '.zip'}
+
+
+class _StreamBuffer:
+    """Write-only file object that hands what has been written to the caller."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def take(self):
+        """Get and clear everything written since the last call."""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(paths, chunk_size=ZIP_CHUNK_SIZE):
+    """
+    Build a ZIP archive of files, yielding it piece by piece.
+
+    The archive is written with data descriptors, so no seeking is needed
+    and memory use stays at about one chunk whatever the size of the files.
+    Files that are already compressed are stored rather than deflated.
+
+    Args:
+        paths (list): Paths of the files to add. Each is stored under its
+            base name.
+        chunk_size (int, optional): Size of the chunks read from each file.
+
+    Yields:
+        bytes: The next part of the archive.
+    """
+    buffer = _StreamBuffer()
+
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for path in paths:
+            info = zipfile.ZipInfo.from_file(path, os.path.basename(path))
+            if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+
+            with open(path, 'rb') as source, archive.open(info, 'w') as target:
+                for chunk in iter(lambda: source.read(chunk_size), b''):
+                    target.write(chunk)
+                    data = buffer.take()
+                    if data:
+                        yield data
+
+            data = buffer.take()
+            if data:
+                yield data
+
+    # The central directory is written when the archive is closed
+    yield buffer.take()